@@ -17,7 +17,7 @@
 # Beside the WIFI_SSID and WIFI_PASSWORD
 # the file 'clock_mod_secrets.py should also contain:
 # COUNTRY = "PT"  # or "USA"
-# TZ_OFFSET = 0   # offset from utc in hours.
+# TZ_OFFSET = 0   # offset from utc in hours (e.g. 5.5), if there is no time zone table (TZ_FILE).
 # NTP_SERVER = "0.pt.pool.ntp.org" # or your favorite NTP server.
 # In function sync_time() we will set: 'ntptime.host = NTP_SERVER'.
 # If we don't set ntptime.host it will default to "pool.ntp.org"
@@ -38,7 +38,7 @@
 # Global variable 'classic' :
 # - if True: the classic clock algorithm is used
 # - if False: the mmodified (@PaulskPt) algorithm is used
-#             and loads the character definitions in digits.py
+#             and loads the character definitions of clock_mod_digits.bin (or clock_mod_digits.py)
 # Note:
 # When the hour or minute has been changed, the global flag 'do_sync' will be set to False
 # because we don't want this change of hour/minute be overruled by a next NTP sync.
@@ -50,11 +50,11 @@
 # If False, the displayed foreground color starts with red. After a NTP sync the color will change to
 # one of the seven other defined colors. See color_dict.
 # Added global variable 'use_sound'. If True a double tone will be played at NTP_sync.
+# Added global variable 'use_chimes'. If True (and 'use_sound') the quarters are chimed and the hours struck.
 # Added global variable 'vol'. Default vol = 10 which inhibits sound. After the user pressed button 'Vol +' and vol > 10,
 # then a sound will be played at the NTP_sync interval events.
 ##############
 import time, sys, os
-import math
 import machine
 import network
 import ntptime
@@ -75,6 +75,7 @@ id = '{:02x}{:02x}{:02x}{:02x}'.format(id0[0], id0[1], id0[2], id0[3])
 
 # used in main()
 country = COUNTRY.upper()
+DECIMAL_SEP = ',' if country == "PT" else '.'  # of the percentage in the status table
 
 # Classic means: the original Pimoroni clock script version for the Galactic Universe device
 classic = False
@@ -84,14 +85,44 @@ do_sync = True # Built-in RTC will be updated at intervals by NTP datetime
 # NTP synchronizes the time to UTC, this allows you to adjust the displayed time
 # by one hour increments from UTC by pressing the volume up/down buttons
 utc_offset = TZ_OFFSET
+
+# The time zone table of tools/tz_compile.py (the changes to and from summer time), looked up
+# like a module; without it the local time is UTC plus utc_offset hours (see clock_mod_tz.py)
+TZ_FILE = 'clock_mod_tz.bin'
+from clock_mod_tz import TimeZone, BASE
+from clock_mod_ntp import set_rtc
+tz = TimeZone(int(utc_offset * 3600), TZ_FILE, BASE)  # the seconds since BASE: small integers
 ntp_server = NTP_SERVER
 
-img_dict = {} # to prevent error. dictionary will be loaded from digits.py
+# If True the RTC is synced by the NTP client of clock_mod_ntp.py: it asks all of ntp_servers
+# at once (non-blocking UDP), compensates the round trip, rejects the servers that disagree with
+# the others and sets the RTC, with the fraction of the second, at a second boundary. Its clock
+# is edge_clock (the RTC to the us from the ticks); on the rp2 port, whose RTC only counts whole
+# seconds, it sets whole seconds at a second of the RTC and the drift model makes up the rest.
+# If False ntptime.settime() asks ntp_server only and sets whole seconds.
+use_ntp_client = True
+ntp_servers = (ntp_server, "1.pool.ntp.org", "2.pool.ntp.org")
+NTP_POLL_MS = 2   # the main loop picks up the NTP replies this often
 
 use_sound = True
-
+use_chimes = False  # the Westminster quarters and the strokes of the hour (see clock_mod_audio.py)
+
+# The characters of the modified clock: the binary font compiled from clock_mod_digits.py
+# by tools/font_compiler.py. Its glyphs are read when first used (see clock_mod_font.py).
+# Without the font file the character definitions of clock_mod_digits.py are compiled
+# at start (see clock_mod_glyphs.py).
+FONT_FILE = 'clock_mod_digits.bin'
+from clock_mod_glyphs import G_WIDTH, G_BLINK_SPANS
+glyphs = {}
 if not classic:
-    from clock_mod_digits import *
+    try:
+        from clock_mod_font import BinFont
+        glyphs = BinFont(FONT_FILE)
+    except (OSError, ValueError) as e:
+        print(f"font {FONT_FILE}: {e}. Using clock_mod_digits.py")
+        from clock_mod_glyphs import compile_font
+        from clock_mod_digits import img_dict
+        glyphs = compile_font(img_dict)
 
 use_fixed_color = False
 
@@ -108,35 +139,86 @@ MIDNIGHT_SATURATION = 1.0
 MIDDAY_VALUE = 0.8
 MIDNIGHT_VALUE = 0.3
 
-wlan = None
+# The background gradient is cached per 1/BG_STEPS of the percentage-to-midday
+# (a step lasts ~27 seconds around 06h and 18h, ~14 minutes around midnight and midday).
+# See draw_background() and clock_mod_bgcache.py
+BG_STEPS = 1024
+BG_CACHE_SIZE = 4
+
+from clock_mod_bgcache import BackgroundCache
+bg_cache = BackgroundCache(BG_CACHE_SIZE)
+
+# The background colours are computed with integers from two tables (see clock_mod_hsv.py):
+# hsv_tab, the colours of HSV_STEPS hues from the lowest to the highest hue of the gradient,
+# and day_phases, the percentage-to-midday of each minute of the day.
+HSV_STEPS = 512
+from clock_mod_hsv import HsvTable, day_phase_table, day_phase, DAY_PHASE_ONE
+hsv_tab = HsvTable(min(MIDNIGHT_HUE, MIDDAY_HUE) + min(0.0, HUE_OFFSET),
+                   max(MIDNIGHT_HUE, MIDDAY_HUE) + max(0.0, HUE_OFFSET), HSV_STEPS)
+day_phases = day_phase_table()
+I_MIDNIGHT = hsv_tab.index(MIDNIGHT_HUE)
+I_MIDDAY = hsv_tab.index(MIDDAY_HUE)
+I_OFFSET = hsv_tab.steps(HUE_OFFSET)
+S_MIDNIGHT = int(MIDNIGHT_SATURATION * 255 + 0.5)
+S_MIDDAY = int(MIDDAY_SATURATION * 255 + 0.5)
+V_MIDNIGHT = int(MIDNIGHT_VALUE * 255 + 0.5)
+V_MIDDAY = int(MIDDAY_VALUE * 255 + 0.5)
+
+from clock_mod_sync import SyncMachine, SYNC_WAITING, SYNC_CONNECTED, SYNC_TIMEOUT, SYNC_SYNCED, \
+     SYNC_ERROR, SYNC_OFF_TIMEOUT, SYNC_DONE, SYNC_BACKOFF
+from clock_mod_wlan import WlanManager, POLICY_PERSISTENT, POLICY_DUTY
+
+# WiFi policy (see clock_mod_wlan.py):
+# POLICY_DUTY:       connect for each NTP sync and disconnect after it (saves power)
+# POLICY_PERSISTENT: keep the WiFi connection up and reuse it for the next syncs
+wlan_policy = POLICY_DUTY
 
 # create galactic object and graphics surface for drawing
 gu = GalacticUnicorn()
 #gr = PicoGraphics(DISPLAY)
 gr = PicoGraphics(display=DISPLAY)
 
-button_a = machine.Pin(gu.SWITCH_A, machine.Pin.IN, machine.Pin.PULL_UP)
-button_b = machine.Pin(gu.SWITCH_B, machine.Pin.IN, machine.Pin.PULL_UP)
-button_c = machine.Pin(gu.SWITCH_C, machine.Pin.IN, machine.Pin.PULL_UP)
-button_d = machine.Pin(gu.SWITCH_D, machine.Pin.IN, machine.Pin.PULL_UP)
-vol_up_button = machine.Pin(gu.SWITCH_VOLUME_UP, machine.Pin.IN, machine.Pin.PULL_UP)
-vol_down_button = machine.Pin(gu.SWITCH_VOLUME_DOWN, machine.Pin.IN, machine.Pin.PULL_UP)
+# All buttons are handled by the input event queue of clock_mod_input.py:
+# their IRQs queue the edges, poll_buttons() handles the debounced events.
+# Button numbers (index into the list of pins given to Input):
+BTN_A = 0
+BTN_B = 1
+BTN_C = 2
+BTN_D = 3
+BTN_VOL_UP = 4
+BTN_VOL_DN = 5
+BTN_LUX_UP = 6
+BTN_LUX_DN = 7
+BTN_SLEEP = 8
+from clock_mod_input import Input, EV_PRESS, EV_REPEAT, EV_CHORD, EV_TAP
+inp = Input(machine, [gu.SWITCH_A, gu.SWITCH_B, gu.SWITCH_C, gu.SWITCH_D,
+                      gu.SWITCH_VOLUME_UP, gu.SWITCH_VOLUME_DOWN,
+                      gu.SWITCH_BRIGHTNESS_UP, gu.SWITCH_BRIGHTNESS_DOWN,
+                      gu.SWITCH_SLEEP], modifier=BTN_SLEEP)
+# Holding a button repeats it: A ... D after 600 ms, every 200 ms; volume and brightness every 50 ms
+for b in (BTN_A, BTN_B, BTN_C, BTN_D):
+    inp.set_repeat(b, 600, 200)
+for b in (BTN_VOL_UP, BTN_VOL_DN, BTN_LUX_UP, BTN_LUX_DN):
+    inp.set_repeat(b, 50, 50)
+LUX_STEP = 0.05  # brightness step per press/repeat
+VOL_STEP = 50    # volume step per press/repeat
 
 # create the rtc object
 rtc = machine.RTC()
 
 year, month, day, wd, hour, minute, second, _ = rtc.datetime()
 last_second = second
-clock = ''
+last_tm = -1   # epoch() of the last redraw_display_if_reqd() that read the time
+last_day = -1  # its day number: the date is read with time.localtime() when it changes
+clock = bytearray(b'00:00:00')  # the clock text, changed in place by set_clock()
 
-ptm = 0.0 # percentage-to-midday
+ptm = 0 # percentage-to-midday (0 ... DAY_PHASE_ONE)
 
 width = gu.WIDTH
 height = gu.HEIGHT
 
 # See: https://www.rapidtables.com/web/color/index.html
 # set up some pens to use later
-BLACK = gr.create_pen(0, 0, 0)
 red_ = 0
 green_ = 1
 blue_ = 2
@@ -167,6 +249,44 @@ clr_dict_rev = {
     white_: 'WHITE',
     black_: 'BLACK'
 }
+# All pens are created and cached by the palette manager (see clock_mod_palette.py)
+from clock_mod_palette import Palette
+palette = Palette(gr, clr_dict)
+BLACK = palette.pen(black_)
+
+# Each frame is composed in the buffer of the compositor and shown with one gu.update()
+# by fb.present(), only when it changed (see clock_mod_fb.py)
+from clock_mod_fb import FrameBuffer
+fb = FrameBuffer(gr, width, height)
+
+# Layout of the clock text (see clock_mod_layout.py), computed once instead of every second.
+# The modified clock: with tabular_digits the characters are drawn in the fixed cells of
+# CLOCK_TEMPLATE, centred, each digit in a cell as wide as the widest one (the narrow '1'
+# is centred in its cell), so the clock doesn't shift when a '1' shows up. If False they
+# are placed side by side from column CLOCK_X.
+# The classic clock: the widths of the characters of the PicoGraphics font, measured once.
+tabular_digits = True
+CLOCK_X = 9
+CLOCK_TEMPLATE = "00:00:00"
+from clock_mod_layout import Layout
+lay = Layout(width, lambda c: glyphs[c][G_WIDTH], spacing=1, tabular=tabular_digits)
+if glyphs:
+    lay.template(CLOCK_TEMPLATE)
+gr.set_font("bitmap8")
+lay_gr = Layout(width, lambda c: gr.measure_text(c, 1))
+
+# The outlined text (classic clock, messages) is drawn from the masks of the characters of
+# the PicoGraphics font and their outlines, read from gr once (see clock_mod_outline.py)
+from clock_mod_outline import Outline
+outline = Outline(gr, width, height)
+
+# Messages (volume, reset, date) are shown by the marquee of clock_mod_marquee.py:
+# rendered once (in chunks if very long), then scrolled at MARQUEE_SPEED columns per second if wider than the display.
+# The clock is not redrawn while a message is showing. See show_message()
+MARQUEE_SPEED = 20
+from clock_mod_marquee import Marquee
+marquee = Marquee(fb, BLACK, MARQUEE_SPEED)
+
 #-----------------+
 clr_idx = pink_ # | <<<=== Set here the fixed color
 #-----------------+
@@ -175,56 +295,112 @@ max_clr_idx = len(clr_dict)-1
 time_chgd = False
 dev_dict = {}
 
+#----------------------------------+
+interval_secs = 600 # 10 minutes # | <<<=== Set here the (initial) time_sync interval
+#----------------------------------+
+# The sync interval adapts to the drift of the built-in RTC (see clock_mod_drift.py):
+# it grows while the drift stays predictable within drift_tolerance_ms, and shrinks when it doesn't.
+sync_interval_min = interval_secs
+sync_interval_max = 6 * 3600
+drift_tolerance_ms = 1000  # ntptime.settime() sets whole seconds
+
+from clock_mod_drift import DriftModel
+drift = DriftModel(sync_interval_min, sync_interval_max, drift_tolerance_ms)
+
+# If True main() runs the uasyncio runtime of clock_mod_async.py:
+# separate tasks for rendering, buttons, NTP sync and REPL status output,
+# instead of the 10 ms polling loop.
+use_asyncio = False
+
+# The main loop sleeps until the next deadline of its jobs (see schedule() and clock_mod_sched.py).
+# If use_lightsleep is True it sleeps with machine.lightsleep() (a button IRQ wakes it);
+# else with time.sleep_ms() in slices of SCHED_SLICE_MS, checking for button edges in between
+# (a button IRQ doesn't end time.sleep_ms(): the CPU wakes every slice).
+use_lightsleep = False
+SCHED_SLICE_MS = 20
+SECOND_MARGIN_MS = 2   # wake this long after the second boundary
+SYNC_STEP_MS = 50      # step interval of a running NTP sync (as the button task of clock_mod_async.py)
+sched = None
+
+# If True (and use_asyncio is False) the display is drawn by a worker thread on the second core
+# (see clock_mod_render.py). The main loop keeps the buttons, the NTP sync, the sound and the
+# REPL output, so a blocking NTP query doesn't delay the clock. On the main loop, whatever
+# changes the frame (messages, marquee, status LED, time and colour changes) holds frame_lock.
+use_render_worker = False
+from clock_mod_render import RenderWorker, NoLock
+frame_lock = NoLock()
+render = None   # the RenderWorker, started by main() if use_render_worker
+
+# The clock follows when the seconds of the RTC start, in time.ticks_us() (see clock_mod_edge.py):
+# epoch() and the sleep to the next second come from the ticks, the RTC is only read to find
+# (and every EDGE_CHECK_S check) the start of its seconds within EDGE_TOL_US.
+# If use_edge_align is True (and neither use_asyncio nor use_render_worker) the main loop draws
+# each second EDGE_LEAD_US ahead (then as long as the drawing takes plus EDGE_MARGIN_US) and
+# shows it when it starts.
+use_edge_align = True
+EDGE_LEAD_US = 20000
+EDGE_MARGIN_US = 2000
+EDGE_TOL_US = 250
+EDGE_CHECK_S = 30
+from clock_mod_edge import EdgeClock, EdgePresenter
+edge_clock = EdgeClock(time.time_ns, lambda secs: drift.correction_at(secs), BASE,
+                       EDGE_TOL_US, EDGE_MARGIN_US, EDGE_CHECK_S)
+edge = None     # the EdgePresenter, created by main() if use_edge_align
+
+wakeups = 0      # number of times the main loop/tasks woke up. See wakeups_per_sec()
+wakeups_t0 = 0
+wakeups_n0 = 0
+
+# State of the dirty-glyph renderer. See redraw_display_if_reqd()
+drawn_text = bytearray()  # the clock text currently on the display
+drawn_cells = None    # the cells (see clock_mod_layout.py) of its characters
+drawn_clr = None      # clr_idx it was drawn with
+force_redraw = True   # set when something else has drawn over the clock
+
+# If True the time spent in the stages of the main loop is measured (see clock_mod_prof.py)
+# and a table with the min/avg/p99/max times per stage is printed with the status lines.
+profiling = False
+PROF_STAGES = ('buttons', 'redraw', 'background', 'outline', 'update', 'sync')
+ST_BUTTONS = 0
+ST_REDRAW = 1
+ST_BACKGROUND = 2
+ST_OUTLINE = 3
+ST_UPDATE = 4
+ST_SYNC = 5
+prof = None  # the Profiler, created by startup() if profiling
+
+# The passes of the main loop allocate (almost) nothing: the clock text is changed in place,
+# the time is read with integer arithmetic. The garbage collector runs in the idle time between
+# two frames, when GC_COLLECT_BYTES were allocated since the previous collection, instead of
+# whenever the heap runs out. The heap report (bytes allocated per pass, low-water mark of
+# gc.mem_free(), collections and their pauses) is printed with the status heading each minute.
+# See clock_mod_heap.py
+GC_COLLECT_BYTES = 8192
+from clock_mod_heap import Heap
+heap = Heap(GC_COLLECT_BYTES)
+
+# The sounds are patterns of tones played by the sequencer of clock_mod_audio.py, stepped by
+# 'timer' (or, with lightsleep, at the deadlines of the main loop): nothing waits for a tone.
+# The sync beep, the volume feedback and the chimes are queued with play().
+VOL_BEEP_MS = 40
+last_quarter = -2  # epoch() // 900 at the previous chime_check()
+
 if use_sound:
     timer = machine.Timer(-1)
 
-    # The two frequencies to play
-    tone_a = 1000
-    tone_b = 900
     vol = 10  # initially no sound, only after user presses 'Vol +'
     min_vol = 10
     max_vol = 20000
-    
 
-    notes = [(1000, 900), (1000, 900)]
-    channels = [gu.synth_channel(i) for i in range(len(notes))]
-
-    def play_tone(tone):
-        global vol
-        if vol <= 10:
-            return  # don't make sound
-        if tone >= 0 and tone <=1000:
-            # Stop synth (if running) and play Tone A
-            timer.deinit()
-            if tone == tone_a:
-                channels[0].play_tone(tone, 0.06)
-            if tone == tone_b:
-                channels[1].play_tone(tone_b, 0.06, attack=0.5)
-
-            gu.play_synth()
-
-    def double_tone():
-        global tone_a, tone_b
-        TAG="double_tone(): "
-        tone_a = 1000
-        tone_b = 900
-        ch_a = 0
-        ch_b = 1
-        tone = None
-        ch = None
-
-        for _ in range(2):
-            timer.deinit() 
-            tone = tone_a if _ == 0 else tone_b
-            # print(TAG+f"playing tone {tone}")
-            ch = ch_a if _ == 0 else ch_b
-            if tone > 0:  # Zero means tone not playing
-                play_tone(tone)
-                time.sleep(0.3)
-        gu.stop_playing()
-        timer.deinit()
-        tone_a = 0
-        tone_b = 0
+    from clock_mod_audio import Sequencer, chime
+    SYNC_BEEP = ((0, 1000, 300), (1, 900, 300))
+    channels = [gu.synth_channel(i) for i in range(2)]
+    seq = Sequencer(gu, channels, None if use_lightsleep else timer)
+
+    # Queue a pattern of tones, if the volume is above its minimum
+    def play(pattern, cut=False):
+        if vol > min_vol:
+            seq.play(pattern, cut)
 
 """
     os.uname() result =
@@ -248,389 +424,428 @@ def my_dev():
     if my_debug:
         print(TAG+f"dev_dict= {dev_dict}")
 
-def clear():
-    gr.set_pen(BLACK)
-    gr.clear()
-    gu.update(gr)
-
-@micropython.native  # noqa: F821
-def from_hsv(h, s, v):
-    i = math.floor(h * 6.0)
-    f = h * 6.0 - i
-    v *= 255.0
-    p = v * (1.0 - s)
-    q = v * (1.0 - f * s)
-    t = v * (1.0 - (1.0 - f) * s)
-
-    i = int(i) % 6
-    if i == 0:
-        return int(v), int(t), int(p)
-    if i == 1:
-        return int(q), int(v), int(p)
-    if i == 2:
-        return int(p), int(v), int(t)
-    if i == 3:
-        return int(p), int(q), int(v)
-    if i == 4:
-        return int(t), int(p), int(v)
-    if i == 5:
-        return int(v), int(p), int(q)
-
-
-# function for drawing a gradient background
-def gradient_background(start_hue, start_sat, start_val, end_hue, end_sat, end_val):
+# Return the pens of the columns 0 ... width//2 of the background for the percentage-to-midday
+# key/BG_STEPS, from the integer tables (within a level or two of the float HSV colours, see tools/hsv_report.py)
+def gradient_pens_int(key):
+    i0 = I_MIDNIGHT + (I_MIDDAY - I_MIDNIGHT) * key // BG_STEPS
+    s = S_MIDNIGHT + (S_MIDDAY - S_MIDNIGHT) * key // BG_STEPS
+    v = V_MIDNIGHT + (V_MIDDAY - V_MIDNIGHT) * key // BG_STEPS
     half_width = width // 2
+    pens = []
     for x in range(0, half_width):
-        hue = ((end_hue - start_hue) * (x / half_width)) + start_hue
-        sat = ((end_sat - start_sat) * (x / half_width)) + start_sat
-        val = ((end_val - start_val) * (x / half_width)) + start_val
-        colour = from_hsv(hue, sat, val)
-        if classic:
-            gr.set_pen(gr.create_pen(int(colour[0]), int(colour[1]), int(colour[2])))
-        else:
-            gr.set_pen(gr.create_pen(0, 0, 0))  # mod by @PaulskPt
-        for y in range(0, height):
-            gr.pixel(x, y)
-            gr.pixel(width - x - 1, y)
-
-    colour = from_hsv(end_hue, end_sat, end_val)
-    if classic:
-        gr.set_pen(gr.create_pen(int(colour[0]), int(colour[1]), int(colour[2])))
-    else:
-        gr.set_pen(gr.create_pen(0, 0, 0))  # mod by @PaulskPt
-    for y in range(0, height):
-        gr.pixel(half_width, y)
+        r, g, b = hsv_tab.rgb(i0 + (2 * I_OFFSET * x + half_width) // (2 * half_width), s, v)
+        pens.append(palette.rgb(r, g, b))
+    r, g, b = hsv_tab.rgb(i0 + I_OFFSET, s, v)
+    pens.append(palette.rgb(r, g, b))
+    return pens
+
+# Draw the background for a given percentage-to-midday (0 ... DAY_PHASE_ONE, see day_phase()).
+# The pixel row of the gradient is taken from bg_cache, keyed by the percentage quantized in BG_STEPS steps.
+def draw_background(phase):
+    if not classic:
+        fb.fill(BLACK)  # mod by @PaulskPt
+        return
+    key = phase * BG_STEPS // DAY_PHASE_ONE
+    row = bg_cache.lookup(key)
+    if row is None:
+        row = bg_cache.store(key, fb.gradient_row(gradient_pens_int(key)))
+    fb.fill_row(row)
+
+# Draw outlined text into buf (rows of bw pixels, e.g. fb.layer): the 'classic' clock and the messages
+def draw_outlined(buf, bw, text, x, y, inv=0):
+    ol_pen = palette.pen(white_ if inv else black_)
+    fg_pen = palette.pen(black_ if inv else white_)
+    outline.draw(buf, bw, text, x, y, fb.pen(fg_pen), fb.pen(ol_pen))
+
+# Show text with the marquee: centred if it fits the display, else scrolling.
+# keep: replace the message showing now without starting it again (e.g. the volume while it changes)
+def show_message(text, keep=False):
+    global force_redraw
+    with frame_lock:
+        force_redraw = True
+        marquee.show(lay_gr.text_width(text) + 1, lambda buf, bw, x: draw_outlined(buf, bw, text, x + 1, 2), keep)
+
+# Advance the marquee; redraw the clock at once when the message is over
+def marquee_step():
+    global force_redraw, last_second
+    if not marquee.active:
+        return
+    with frame_lock:
+        if not marquee.step():
+            force_redraw = True
+            last_second = -1
 
 # function for drawing outlined text
-
-def outline_text(text, x: int=10, y: int=2, inv: int=0):
+# text: the clock text, a bytearray (see set_clock())
+def outline_text(text, x: int=10, y: int=2, inv: int=0, cells=None):
     # def draw(image, fg, bg, time_ms):
     TAG = "outline_text(): "
-    my_classic = classic
-    # print(TAG+f"text= \'{text}\'")
-    t_lst = ["Res", "Vol"]
-    if text[:3] in t_lst:
-        my_classic = True
-
-    if my_classic:
-        if not inv:
-            fg = clr_dict[black_]
-        else:
-            fg = clr_dict[white_]
-        fg_pen = gr.create_pen(fg[0], fg[1], fg[2])
-        gr.set_pen(fg_pen)
-        gr.text(text, x - 1, y - 1, -1, 1)
-        gr.text(text, x    , y - 1, -1, 1)
-        gr.text(text, x + 1, y - 1, -1, 1)
-        
-        gr.text(text, x - 1, y    , -1, 1)
-        gr.text(text, x + 1, y    , -1, 1)
-        
-        gr.text(text, x - 1, y + 1, -1, 1)
-        gr.text(text, x    , y + 1, -1, 1)
-        gr.text(text, x + 1, y + 1, -1, 1)
-        
-        if not inv:
-            fg = clr_dict[white_]
-        else:
-            fg = clr_dict[black_]
-        fg_pen = gr.create_pen(fg[0], fg[1], fg[2])
-        gr.set_pen(fg_pen)
-        gr.text(text, x, y, -1, 1)
+
+    if classic:
+        draw_outlined(fb.layer, width, text, x, y, inv)  # on top of the background
+        fb.dirty = True
         if vol_set:
             time.sleep(1)
     else:
-        img = None
-        fg = clr_dict[clr_idx]
+        for c in text:
+            if chr(c) not in glyphs:
+                if my_debug:
+                    print(TAG+f"key \'{chr(c)}\' not in the font")
+                return
+        if cells is None:
+            cells = lay.cells(text, x)
+        xs, ws = cells
+        fg_pen = palette.pen(clr_idx)
         if clr_dict_rev[clr_idx] == 'BLACK':
-            bg = clr_dict[white_]
-            bg_pen = gr.create_pen(bg[0], bg[1], bg[2])
-            for i in range(x):
-                for j in range(height):
-                    gr.set_pen(bg_pen)
-                    gr.pixel(i, j)
+            bg_pen = palette.pen(white_)
+            fb.fill_rect(0, xs[0], bg_pen)
         else:
-            bg = clr_dict[black_]
-        fg_pen = gr.create_pen(fg[0], fg[1], fg[2])
-        bg_pen = gr.create_pen(bg[0], bg[1], bg[2])
-        gr.set_pen(fg_pen)
-        
-        le=len(text)    
-        col_ = x
-        width_ = 0
-        time_ms = time.time_ns()//1000000  # convert nanosecond to millisecond - added by @PaulskPt
-        for _ in range(le):
-            if text[_][0] in img_dict:
-                img = img_dict[text[_]][0]
-                width_ = img_dict[text[_]][1]
-                #print(TAG+f"image= \'{text[_]}\'")
-            else:
-                if my_debug:
-                    print(TAG+f"key \'{text[_]}\' not in img_dict")
+            bg_pen = palette.pen(black_)
+
+        blink_on = (time.ticks_ms() // 300) % 2  # draw the caret blinking
+        for i in range(len(text)):
+            fb.blit_cell(glyphs[chr(text[i])], xs[i], ws[i], fg_pen, bg_pen, blink_on)
 
-            if img is None:
-                return
-            
-            for y in range(len(img)):
-                row = img[y]
-                for z in range(len(row)):
-                    pixel = row[z]
-                    # draw the prompt text
-                    if pixel == 'O':
-                        gr.set_pen(fg_pen)
-
-                    # draw the caret blinking
-                    elif pixel == 'X' and (time_ms // 300) % 2:
-                        gr.set_pen(fg_pen)
-                    else:
-                        gr.set_pen(bg_pen)                
-                    gr.pixel(col_+z, y)
-            col_ += width_+1
-            
         if clr_dict_rev[clr_idx] == 'BLACK':
-            le = width - col_
-            bg = clr_dict[white_]
-            bg_pen = gr.create_pen(bg[0], bg[1], bg[2])
-            for i in range(le):
-                for j in range(height):
-                    gr.set_pen(bg_pen)
-                    gr.pixel(col_+i, j)
-        gu.update(gr)
-        
+            col_ = xs[-1] + ws[-1] + 1
+            fb.fill_rect(col_, width - col_, bg_pen)
+
+# Repaint only the characters of text that differ from drawn_text.
+# Returns False if that is not possible (layout or colour changed, or an
+# earlier full repaint is required); the caller then repaints the whole display.
+def redraw_changed_glyphs(text, cells):
+    if force_redraw or classic or drawn_clr != clr_idx:
+        return False
+    if cells is None or cells != drawn_cells:
+        return False  # other cells: e.g. a narrower/wider character without tabular_digits
+    fg_pen = palette.pen(clr_idx)
+    bg_pen = palette.pen(white_ if clr_dict_rev[clr_idx] == 'BLACK' else black_)
+    blink_on = (time.ticks_ms() // 300) % 2
+    xs, ws = cells
+    for i in range(len(text)):
+        g = glyphs[chr(text[i])]
+        if text[i] != drawn_text[i] or g[G_BLINK_SPANS]:
+            fb.blit_cell(g, xs[i], ws[i], fg_pen, bg_pen, blink_on)
+    drawn_text[:] = text
+    return True
+
 # In the left-upper corner
 # blink a 2x2 square
 # to indicate:
 # WiFi Connected:       green_
 # WiFi disconnected:    red_
 # sync_time successful: blue_
+# blink() only queues the colour. blink_step(), called from the main loop,
+# draws the 3 blinks (0.2 s on, 0.2 s off), so the clock keeps running meanwhile.
+blink_queue = []
+blink_clr = None   # colour blinking now
+blink_phase = 0    # even: on, odd: off
+blink_due = 0      # time.ticks_ms() of the next phase
+
 def blink(clr):
     if my_debug:
         TAG= "blink():     "
         print(TAG+f"param= {clr_dict_rev[clr]}")
     if clr in clr_dict.keys():
-        fg = clr_dict[clr]
-        bg = clr_dict[black_]
-        fg_pen = gr.create_pen(fg[0], fg[1], fg[2])
-        bg_pen = gr.create_pen(bg[0], bg[1], bg[2])
-        for h in range(3): # blink 3 times
-            for i in range(2):  # horzontal
-                for j in range(2):  # vertical
-                    gr.set_pen(fg_pen) # green or red
-                    gr.pixel(i, j)
-            gu.update(gr)
-            time.sleep(0.2)
-            for i in range(2):  # horizontal
-                for j in range(2):  # vertical
-                    gr.set_pen(bg_pen) # black
-                    gr.pixel(i, j)
-            gu.update(gr)
-            time.sleep(0.2)
-
-# wrapper for wlan.isconnected()
+        blink_queue.append(clr)
+
+def blink_step():
+    global blink_clr, blink_phase, blink_due
+    t = time.ticks_ms()
+    if blink_clr is None:
+        if not blink_queue:
+            return
+        blink_clr = blink_queue.pop(0)
+        blink_phase = 0
+        blink_due = t
+    if time.ticks_diff(t, blink_due) < 0:
+        return
+    if blink_phase >= 6:  # blinked 3 times
+        blink_clr = None
+        with frame_lock:
+            fb.set_led(0, 0, 2, None)  # the clock underneath shows again
+        return
+    with frame_lock:
+        fb.set_led(0, 0, 2, palette.pen(black_ if blink_phase & 1 else blink_clr))
+    blink_phase += 1
+    blink_due = time.ticks_add(blink_due, 200)
+
+# Reports the WiFi connection state as known by wlan_mgr (the radio is not polled)
 # Param TAG: the TAG from the calling function
 # so this func is printing 'in name of' the calling function
 def is_connected(TAG):
-    global wlan
     if TAG is None:
         TAG="is_connected(): "
-    s = '' if wlan.isconnected() else "dis"
+    up = wlan_mgr.is_up()
+    s = '' if up else "dis"
     print(TAG+f"WiFi {s}connected")
-    if wlan.isconnected():
+    if up:
         blink(green_)
     else:
         blink(red_)
 
 
-# Connect to wifi and synchrnize the RTC time from NTP
+# Connect to wifi and synchrnize the RTC time from NTP.
+# Only starts the sync: sync_machine (see clock_mod_sync.py) is advanced
+# one step at a time by service(), called from the main loop.
 def sync_time():
-    global wlan, tone_a, tone_b
     if not do_sync:
         return
     if not wifi_available:
         return
-    TAG="sync_time(): "
-    msg_shown = False
-
-    # Start connection
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    wlan.connect(WIFI_SSID, WIFI_PASSWORD)
-
-    # Wait for connect success or failure
-    max_wait = 100
-    while max_wait > 0:
-        wstat = wlan.status()
-        if wstat < 0 or wstat >= 3:
-            break
-        max_wait -= 1
-        if not msg_shown:
-            msg_shown = True
-            print(TAG+'waiting for connection...')
-        time.sleep(0.2)
-
-        redraw_display_if_reqd()
-        gu.update(gr)
+    sync_machine.start()
 
-    if max_wait > 0:
+# Report the progress of sync_machine
+def sync_event(ev, arg):
+    global interval_secs
+    TAG="sync_time(): "
+    if ev == SYNC_WAITING:
+        print(TAG+'waiting for connection...')
+    elif ev == SYNC_CONNECTED:
         is_connected(TAG)
-        try:
-            # See: https://forum.micropython.org/viewtopic.php?t=5776
-            # and: https://github.com/micropython/micropython-infineon/blob/master/esp8266/scripts/ntptime.py
-            # The NTP host can be configured at runtime by doing: ntptime.host = 'myhost.org'
-            ntptime.host = ntp_server
-            ntptime.settime()
-            if use_sound:
-                double_tone()
-            blink(blue_)
-            print(TAG+"built-in RTC sync\'ed from NTP")
-        except OSError as e:
-            print(TAG+f"error: {e}")
-            pass
-    else:
+    elif ev == SYNC_SYNCED:
+        if use_sound:
+            play(SYNC_BEEP)
+        blink(blue_)
+        print(TAG+"built-in RTC sync\'ed from NTP")
+        if ntp:
+            print(TAG+ntp.stats())
+        with frame_lock:  # the render worker reads the drift model (epoch())
+            interval_secs = drift.synced(arg, time.time() - BASE, sync_machine.phase_ms)
+            edge_clock.reset()  # the RTC was set
+        print(TAG+drift.stats())
+    elif ev == SYNC_ERROR:
+        print(TAG+f"error: {arg}")
+        if ntp:
+            print(TAG+ntp.stats())
+    elif ev == SYNC_TIMEOUT:
         print(TAG+"NTP sync failed. Check WiFi Access Point")
-
-    wlan.disconnect()
-    cnt = 0
-    while wlan.isconnected():
-        machine.idle()  # save power while waiting
-        cnt += 1
-        if cnt >= 100:
-            print(TAG+f"failed to disconnect from wlan during {cnt} tries")
-            break
-    is_connected(TAG)
-    wlan.active(False)
+    elif ev == SYNC_OFF_TIMEOUT:
+        print(TAG+f"failed to disconnect from wlan during {arg} tries")
+    elif ev == SYNC_BACKOFF:
+        print(TAG+f"WiFi connection failed before. Next try in {arg//1000} secs")
+    elif ev == SYNC_DONE:
+        is_connected(TAG)
+        if my_debug:
+            print(TAG+wlan_mgr.stats())
+
+wlan_mgr = WlanManager(network,
+                       WIFI_SSID if wifi_available else None,
+                       WIFI_PASSWORD if wifi_available else None,
+                       wlan_policy)
+ntp = None  # the NtpClient, created by startup() if use_ntp_client
+sync_machine = SyncMachine(wlan_mgr, ntptime, ntp_server, sync_event, None, rtc, SYNC_STEP_MS, NTP_POLL_MS,
+                           edge_clock)
+
+# Advance the non-blocking jobs: NTP sync, status LED blink and the tones (if not stepped by the timer)
+def service():
+    if prof: t0 = time.ticks_us()
+    sync_machine.step()
+    if prof: prof.add(ST_SYNC, t0)
+    blink_step()
+    if use_sound:
+        seq.step()
+    marquee_step()
 
 #
-# return a quasi unix epoch value
+# return the local time in seconds since BASE (see clock_mod_tz.py)
 # to be used in main() to calculate the elapsed time in seconds
 # 
 def epoch():
-    secs = time.time() + (utc_offset * 3600)
+    if edge_clock.known():
+        secs = edge_clock.second()  # from the ticks, with the drift correction: no RTC read
+    else:
+        ms = time.time_ns() // 1000000
+        secs = (ms + drift.correction_at(ms // 1000 - BASE)) // 1000 - BASE  # drift of the RTC since the last NTP sync
+    secs += tz.offset(secs)  # one comparison; a binary search after a change (see clock_mod_tz.py)
     if my_debug:
         print(f"epoch(): seconds= {secs}")
     return secs
-        
-def adjust_hour(pin):
+
+# redraw_display_if_reqd() of UTC second t (None: the current time), for the EdgePresenter
+def redraw_utc(t):
+    redraw_display_if_reqd(None if t is None else t + tz.offset(t))
+
+# ms until the next second of epoch(): from the ticks, or, until the start of the seconds
+# of the RTC is known, as long as edge_clock polls it. 0 when second tm (the one just drawn) is
+# already over: the pass drew it just before its end
+def ms_to_next_second(tm=None):
+    if edge_clock.known():
+        if tm is not None and epoch() > tm:
+            return 0
+        return (edge_clock.us_to_next() + 999) // 1000
+    return edge_clock.poll_ms
+
+# Tell the scheduler the deadlines of the jobs of the main loop
+def schedule():
+    if edge and edge.aligned():
+        sched.due(edge.due_ms())  # draw the next second ahead, shown when it starts
+        if edge_clock.second() < edge.shown_tm:
+            sched.due(1)  # shown a little ahead of the clock: the status, resync
+    else:
+        sched.due(ms_to_next_second(None if render else last_tm) + SECOND_MARGIN_MS)  # redraw, status, resync
+    ms = edge_clock.due_ms()  # a sample that finds or narrows the start of the seconds
+    if ms >= 0:
+        sched.due(ms)
+    ms = sync_machine.due_ms()  # next step of a running NTP sync
+    if ms >= 0:
+        sched.due(ms)
+    if blink_clr is not None:
+        sched.due_at(blink_due)
+    elif blink_queue:
+        sched.due(0)
+    if use_sound:
+        ms = seq.due_ms()  # next tone
+        if ms >= 0:
+            sched.due(ms)
+    ms = marquee.due_ms()  # next column of a scrolling message
+    if ms >= 0:
+        sched.due(ms)
+    ms = inp.due_ms()  # debounce end, auto-repeat
+    if ms >= 0:
+        sched.due(ms)
+
+# Change the hour (delta +1 or -1), called for the A and B button events
+def adjust_hour(delta):
     global hour, time_chgd, do_sync
-    if time_chgd:
-        return  # we don't want react on a button bounce
-    if pin == button_a:
-        time_chgd = True
-        hour += 1
-        if hour >= 24:
-            hour = 0
-    elif pin == button_b:
+    with frame_lock:
         time_chgd = True
-        hour -= 1
-        if hour < 0:
-            hour = 23
-    if time_chgd:
-        print("Hour changed")
-        if do_sync:
-            do_sync = False  # We don't want the changed time to by overwritten by NTP sync
-            print("adjust_hour(): NTP sync swtiched off")
-            
-def adjust_minute(pin):
+        hour = (hour + delta) % 24
+    print("Hour changed")
+    if do_sync:
+        do_sync = False  # We don't want the changed time to by overwritten by NTP sync
+        print("adjust_hour(): NTP sync swtiched off")
+
+# Change the minute (delta +1 or -1), called for the C and D button events
+def adjust_minute(delta):
     global minute, time_chgd, do_sync
-    if time_chgd:
-        return  # we don't want react on a button bounce
-    if pin == button_c:
-        time_chgd = True
-        minute += 1
-        if minute >= 60:
-            minute = 0
-    elif pin == button_d:
+    with frame_lock:
         time_chgd = True
-        minute -= 1
-        if minute < 0:
-            minute = 59
-    if time_chgd:
-        print("Minute changed")
-        if do_sync:
-            do_sync = False  # We don't want the changed time to by overwritten by NTP sync
-            print("adjust_minute(): NTP sync swtiched off")
-
-# We use the IRQ method to detect the button presses to avoid incrementing/decrementing
-# multiple times when the button is held.
-button_a.irq(trigger=machine.Pin.IRQ_FALLING, handler=adjust_hour)
-button_b.irq(trigger=machine.Pin.IRQ_FALLING, handler=adjust_hour)
-button_c.irq(trigger=machine.Pin.IRQ_FALLING, handler=adjust_minute)
-button_d.irq(trigger=machine.Pin.IRQ_FALLING, handler=adjust_minute)
-
-# Check whether the RTC time has changed and if so redraw the display
-def redraw_display_if_reqd():
-    global clock, year, month, day, wd, hour, minute, second, last_second, old_secs, time_chgd, ptm, vol_set
-    
+        minute = (minute + delta) % 60
+    print("Minute changed")
+    if do_sync:
+        do_sync = False  # We don't want the changed time to by overwritten by NTP sync
+        print("adjust_minute(): NTP sync swtiched off")
+
+# Write hh:mm:ss into the clock text, in place
+def set_clock(h, m, s):
+    clock[0] = 48 + h // 10  # 48: '0'
+    clock[1] = 48 + h % 10
+    clock[3] = 48 + m // 10
+    clock[4] = 48 + m % 10
+    clock[6] = 48 + s // 10
+    clock[7] = 48 + s % 10
+
+# Check whether the RTC time has changed and if so redraw the display.
+# tm: draw that epoch() second instead (drawn ahead, see clock_mod_edge.py)
+def redraw_display_if_reqd(tm=None):
+    global year, month, day, wd, hour, minute, second, last_second, last_tm, last_day, old_secs, time_chgd, ptm, vol_set
+    global drawn_cells, drawn_clr, force_redraw
+
+    if prof: t_redraw = time.ticks_us()
     if time_chgd:
-        rtc.datetime((year,month,day,wd,hour,minute,second,0))
+        # the RTC keeps UTC
+        set_rtc(rtc, (tz.utc(time.mktime((year, month, day, hour, minute, second, 0, 0)) - BASE) + BASE) * 1000000000)
+        edge_clock.reset()
         time.sleep(0.1)
-    tm = time.time() + (utc_offset * 3600)
-    tm_local = time.localtime(tm)
-    if my_debug:
-        print(f"redraw_display_if_reqd(): tm_local= {tm_local}")
-    year   = tm_local[0]
-    month  = tm_local[1]
-    day    = tm_local[2]
-    hour   = tm_local[3]
-    minute = tm_local[4]
-    second = tm_local[5]
-    wd     = tm_local[6]
-    yd     = tm_local[7]
-    
-    if second != last_second or time_chgd:
+        tm = None
+    if tm is None:
+        tm = epoch()
+        if edge and tm == last_tm - 1 and not time_chgd:
+            tm = last_tm  # shown at the start of the second, the clock gets there within us
+    if tm != last_tm or time_chgd:
+        # the time of day from the seconds, the date (a new tuple) only when the day changes
+        last_tm = tm
+        if tm // 86400 != last_day:
+            last_day = tm // 86400
+            tm_local = time.localtime(tm + BASE)
+            if my_debug:
+                print(f"redraw_display_if_reqd(): tm_local= {tm_local}")
+            year   = tm_local[0]
+            month  = tm_local[1]
+            day    = tm_local[2]
+            wd     = tm_local[6]
+        secs = tm % 86400
+        hour   = secs // 3600
+        minute = secs // 60 % 60
+        second = secs % 60
+
+    if marquee.active and not time_chgd:
+        pass  # a message is showing: the clock is redrawn when it is over (see marquee_step())
+    elif second != last_second or time_chgd:
         if time_chgd:
             time_chgd = False
-        time_through_day = (((hour * 60) + minute) * 60) + second
-        percent_through_day = time_through_day / 86400
-        percent_to_midday = 1.0 - ((math.cos(percent_through_day * math.pi * 2) + 1) / 2)
-        if second*1000 % 10 == 0:
-            #print(percent_to_midday) # we don't need to show this percentage every second
-            ptm = percent_to_midday
-
-        hue = ((MIDDAY_HUE - MIDNIGHT_HUE) * percent_to_midday) + MIDNIGHT_HUE
-        sat = ((MIDDAY_SATURATION - MIDNIGHT_SATURATION) * percent_to_midday) + MIDNIGHT_SATURATION
-        val = ((MIDDAY_VALUE - MIDNIGHT_VALUE) * percent_to_midday) + MIDNIGHT_VALUE
+            marquee.stop()
+        phase = day_phase(day_phases, hour, minute, second)  # percentage-to-midday, 0 ... DAY_PHASE_ONE
+        ptm = phase
 
-        gradient_background(hue, sat, val,
-                            hue + HUE_OFFSET, sat, val)
+        set_clock(hour, minute, second)  # global var. Used in main() and hdg()
 
-        clock = "{:02}:{:02}:{:02}".format(hour, minute, second) # global var. Used sed in main() and hdg()
-
-        # set the font
-        gr.set_font("bitmap8")
-
-        # calculate text position so that it is centred
-        w = gr.measure_text(clock, 1)
+        y = 2
         if classic:
-            x = int(width / 2 - w / 2 + 1)
+            cells = None
+        elif tabular_digits:
+            cells = lay.cells(clock)
         else:
-            x = 9
-        y = 2
+            cells = lay.cells(clock, CLOCK_X)
+
+        # Most seconds only the last digit(s) change: repaint just those
+        if not redraw_changed_glyphs(clock, cells):
+            if prof: t0 = time.ticks_us()
+            draw_background(phase)
+            if prof: prof.add(ST_BACKGROUND, t0)
 
-        outline_text(clock, x, y)
+            if classic:
+                # calculate text position so that it is centred
+                x = int(width / 2 - lay_gr.text_width(clock) / 2 + 1)
+            else:
+                x = cells[0][0]
+
+            if prof: t0 = time.ticks_us()
+            outline_text(clock, x, y, cells=cells)
+            if prof: prof.add(ST_OUTLINE, t0)
+            drawn_text[:] = clock
+            drawn_cells = cells
+            drawn_clr = clr_idx
+            force_redraw = False
         if vol_set:
             vol_set = False  # clear
 
         last_second = second
+    if prof: prof.add(ST_REDRAW, t_redraw)
+
+HDG_LINE = "+----------+-------------+--------------+"
+HDG_1 = "|          | NTP sync    |      %       |"
+HDG_2 = "|  Clock   | in...  secs |  to midday   |"
 
 def hdg(hdg, TAG, clock, time_to_sync, s,):
-    ln = TAG+"+----------+-------------+--------------+"
     if clock is None:
-        clock = '00:00:00'
-    if isinstance(clock, str) and len(clock) == 8:
+        clock = b'00:00:00'
+    if len(clock) == 8:
         if hdg:
             print()
-            print(ln)
-            print(TAG+"|          | NTP sync    |      %       |")
-            print(TAG+"|  Clock   | in...  secs |  to midday   |")
-            print(ln)
-        print(TAG+f"| {clock} |     {time_to_sync}    |     {s}   |")
-        print(ln)
+            print(TAG, HDG_LINE, sep='')
+            print(TAG, HDG_1, sep='')
+            print(TAG, HDG_2, sep='')
+            print(TAG, HDG_LINE, sep='')
+        print(TAG, "| ", str(clock, 'ascii'), " |     ", time_to_sync, "    |     ", s, "   |", sep='')
+        print(TAG, HDG_LINE, sep='')
     
-def main():
-    global dev_dict, clr_idx, tone_a, tone_b, vol_set, vol
-    TAG="main():      "
+# Print the start-up info to the REPL and do the first NTP sync
+def startup(TAG):
+    global prof, ntp
     my_dev() # fill dev_dict with os.uname() keys and values
+    if profiling:
+        from clock_mod_prof import Profiler
+        prof = Profiler(PROF_STAGES)
+    if use_ntp_client:
+        try:
+            import usocket as socket
+        except ImportError:
+            import socket
+        from clock_mod_ntp import NtpClient
+        ntp = NtpClient(socket, ntp_servers, edge_clock.rtc_ns)
+        sync_machine.ntp = ntp
     if len(dev_dict) > 0:
         k = dev_dict.keys()
         if 'machine' in k:
@@ -641,31 +856,190 @@ def main():
                 print(TAG+f"MicroPython release: \'{dev_dict['release']}\'")
             if 'version' in k:
                 print(TAG+f"Version: \'{dev_dict['version']}\'")
-    print(TAG+f"Timezone offset to UTC = {utc_offset} hours")
-    print(TAG+f"Using NTP server: \"{ntp_server}\"")
+    if tz.path:
+        print(TAG+f"Time zone table: {tz.path}")
+    else:
+        print(TAG+f"Timezone offset to UTC = {utc_offset} hours")
+    epoch()  # looks up the offset now, for tz.stats()
+    print(TAG+tz.stats())
+    if ntp:
+        print(TAG+f"Using NTP servers: {ntp_servers}")
+    else:
+        print(TAG+f"Using NTP server: \"{ntp_server}\"")
     gu.set_brightness(0.2)  # was: (0.5)
-    #----------------------------------+
-    interval_secs = 600 # 10 minutes # | <<<=== Set here the time_sync interval
-    #----------------------------------+
     if do_sync:
         print(TAG+f"At intervals of {interval_secs//60} minutes the built-in RTC will be synchronized from NTP datetime server")
     else:
         print(TAG+"The built-in RTC will not by synchronized from NTP datetime server")
-    
+
     sync_time()
 
+# Sync the built-in RTC and, if use_fixed_color is False, change the display colour
+def resync(TAG):
+    global clr_idx
+    print("Going to sync built-in RTC with NTP date & time")
+    sync_time()
+    if not use_fixed_color:
+        with frame_lock:
+            clr_idx += 1
+            if clr_idx > max_clr_idx:
+                clr_idx = 0  # not 0 (that's black)
+    print(TAG+f"Display color: {clr_dict_rev[clr_idx]}")
+
+# Print a line of the status table. With heading if pr_hdg.
+def print_status(TAG, elapsed_secs, pr_hdg):
+    #s = "{:4d}".format(elapsed_secs)
+    time_to_sync = "{:4d}".format(interval_secs - elapsed_secs)
+    # 100 - ptm*100/DAY_PHASE_ONE in thousandths, rounded, without a float
+    n = 100000 - (ptm * 200000 + DAY_PHASE_ONE) // (2 * DAY_PHASE_ONE)
+    s = "{:2d}{}{:03d}".format(n // 1000, DECIMAL_SEP, n % 1000)  # DECIMAL_SEP: ',' if country == "PT"
+    hdg(pr_hdg, TAG, clock, time_to_sync, s)
+    if pr_hdg:
+        print(TAG+heap.stats())
+    if pr_hdg and my_debug:
+        print(TAG+palette.stats())
+        if render:
+            print(TAG+render.stats())
+        if edge:
+            print(TAG+edge.stats())
+        if use_sound:
+            print(TAG+seq.stats())
+        if sched:
+            print(TAG+sched.stats())  # the wakeups of the sleeps, the passes of the main loop
+        else:
+            print(TAG+f"CPU wakeups: {wakeups_per_sec()}/s")
+    if prof:
+        for ln in prof.table():
+            print(TAG+ln)
+
+# Return the number of wakeups per second since the previous call
+def wakeups_per_sec():
+    global wakeups_t0, wakeups_n0
+    t = time.ticks_ms()
+    dt = time.ticks_diff(t, wakeups_t0)
+    n = wakeups - wakeups_n0
+    wakeups_t0 = t
+    wakeups_n0 = wakeups
+    return n * 1000 // dt if dt > 0 else 0
+
+# Handle the queued button events (see clock_mod_input.py):
+# A/B: hour +/-, C/D: minute +/- (repeating when held), VOL +/-, LUX +/- (repeating),
+# SLEEP + A: NTP sync on again (and sync now), SLEEP + C: next display colour.
+# Returns True when the SLEEP button was pressed and released alone (the caller resets the device)
+def poll_buttons():
+    global vol, do_sync, clr_idx, force_redraw, drift, interval_secs
+    if prof: t0 = time.ticks_us()
+    stop = False
+    inp.poll()
+    while True:
+        ev = inp.get()
+        if ev < 0:
+            break
+        kind = ev >> 8
+        b = ev & 0xff
+        if kind == EV_PRESS or kind == EV_REPEAT:
+            if b == BTN_A:
+                adjust_hour(+1)
+            elif b == BTN_B:
+                adjust_hour(-1)
+            elif b == BTN_C:
+                adjust_minute(+1)
+            elif b == BTN_D:
+                adjust_minute(-1)
+            elif b == BTN_LUX_UP:
+                gu.adjust_brightness(+LUX_STEP)
+            elif b == BTN_LUX_DN:
+                gu.adjust_brightness(-LUX_STEP)
+            elif use_sound and (b == BTN_VOL_UP or b == BTN_VOL_DN):
+                if vol > 0:  # Zero means tone not playing
+                    if b == BTN_VOL_UP:
+                        vol = min(vol + VOL_STEP, 20000)  # Increase Tone A
+                        text = "Vol Up"+' '+str(vol)
+                    else:
+                        vol = max(vol - VOL_STEP, 10)  # Decrease Tone A
+                        text = "Vol Dn"+' '+str(vol)
+                    show_message(text, keep=True)
+                    # a beep whose pitch rises with the volume: 200 ... 1000 Hz
+                    play(((0, 200 + vol // 25, VOL_BEEP_MS),), cut=True)
+        elif kind == EV_CHORD:
+            if b == BTN_A:
+                do_sync = True
+                print("SLEEP + A: NTP sync switched on")
+                # the hour/minute may have been changed by hand: restart the drift estimate
+                drift = DriftModel(sync_interval_min, sync_interval_max, drift_tolerance_ms)
+                interval_secs = sync_interval_min
+                sync_time()
+            elif b == BTN_B:
+                show_message("{:04d}-{:02d}-{:02d}".format(year, month, day))
+            elif b == BTN_C:
+                with frame_lock:
+                    clr_idx = 0 if clr_idx >= max_clr_idx else clr_idx + 1
+                    force_redraw = True
+                print(f"SLEEP + C: Display color: {clr_dict_rev[clr_idx]}")
+        elif kind == EV_TAP and b == BTN_SLEEP:
+            text = "Reset..."
+            print("Going to reset...")
+            stop = True
+            show_message(text)
+    if prof: prof.add(ST_BUTTONS, t0)
+    return stop
+
+# Chime the quarters of epoch() tm: only when it moves on to the next quarter,
+# not when the time is changed by hand (or the first time)
+def chime_check(tm):
+    global last_quarter
+    q = tm // 900
+    if use_sound and use_chimes and q == last_quarter + 1:
+        play(chime(q % 4, (tm // 3600 + 11) % 12 + 1))
+    last_quarter = q
+
+# Start the render worker (see clock_mod_render.py) on the second core
+def start_render_worker():
+    global render, frame_lock
+    import _thread
+    # from now on only the worker uses gr: read the font of the messages and the classic clock first
+    chars = ''.join(chr(c) for c in range(32, 127))
+    outline.text_width(chars)
+    lay_gr.text_width(chars)
+    render = RenderWorker(_thread, fb, gu, redraw_display_if_reqd,
+                          lambda: ms_to_next_second(last_tm) + SECOND_MARGIN_MS, SCHED_SLICE_MS,
+                          prof, ST_UPDATE)
+    frame_lock = render.lock
+    render.start()
+
+def main():
+    global wakeups, sched, edge
+    TAG="main():      "
+    startup(TAG)
+
+    if use_asyncio:
+        import clock_mod_async
+        clock_mod_async.run(sys.modules[__name__], TAG)
+        return
+
+    if use_render_worker:
+        start_render_worker()
+    elif use_edge_align:
+        edge = EdgePresenter(edge_clock, fb, gu, redraw_utc, EDGE_LEAD_US, EDGE_MARGIN_US, prof, ST_UPDATE)
+
+    from clock_mod_sched import Scheduler
+    sched = Scheduler(machine, inp.pending, use_lightsleep, slice_ms=SCHED_SLICE_MS)
+    sched.idle = heap.idle  # garbage collection between two frames
+
     start_secs = epoch()
     if my_debug:
         print(TAG+"+----------+-------------+--------------+")
         print(TAG+"| mod_secs | start_secs  | elapsed_secs |")
         print(TAG+"+----------+-------------+--------------+")
     elapsed_old = -1
-    pr_hdg = False
     print(TAG+f"Display color: {clr_dict_rev[clr_idx]}")
     stop = False
     while True:
         try:
-            text = ''
+            wakeups += 1
+            heap.tick_start()
+            with frame_lock:
+                edge_clock.step()  # the start of the seconds of the RTC, when it needs a sample
             curr_secs = epoch()
             elapsed_secs = curr_secs - start_secs
             #print(TAG+f"elapsed_secs= {elapsed_secs}")
@@ -675,97 +1049,42 @@ def main():
                 mod_secs60 = elapsed_secs % 60
                 #print(TAG+f"mod_secs60 = {mod_secs60}")
                 mod_secs2 = elapsed_secs % interval_secs
+                chime_check(curr_secs)
                 if elapsed_secs > 0 and mod_secs2 == 0:
                     start_secs = curr_secs
-                    print("Going to sync built-in RTC with NTP date & time")
-                    sync_time()
-                    pr_hdg = True
-                    if not use_fixed_color:
-                        clr_idx += 1
-                        if clr_idx > max_clr_idx:
-                            clr_idx = 0  # not 0 (that's black)
-                    print(TAG+f"Display color: {clr_dict_rev[clr_idx]}")
+                    resync(TAG)
                 if my_debug:
                     s = "| {:4d}     |  {:8d}   |  {:4d}        |".format(mod_secs10, start_secs, elapsed_secs)
                     print(TAG+s)
                 if mod_secs10 == 0:
-                    #s = "{:4d}".format(elapsed_secs)
-                    time_to_sync = "{:4d}".format(interval_secs - elapsed_secs)
-                    n = 100-ptm*100
-                    s = "{:6.3f}".format(n)
-                    #s = str(n)
-                    if country.upper() == "PT":
-                        s = s.replace('.',',')  # Don't do this if country == "USA"
-                    if elapsed_secs == 0 or mod_secs60 == 0:
-                        if not pr_hdg:
-                            pr_hdg = True
-                        hdg(pr_hdg, TAG, clock, time_to_sync, s)
-                    else:
-                        if pr_hdg:
-                            pr_hdg = False
-                        hdg(pr_hdg, TAG, clock, time_to_sync, s)
-
-            if gu.is_pressed(gu.SWITCH_BRIGHTNESS_UP):
-                gu.adjust_brightness(+0.01)
-
-            if gu.is_pressed(gu.SWITCH_BRIGHTNESS_DOWN):
-                gu.adjust_brightness(-0.01)
-            
-            if use_sound:
-                if gu.is_pressed(gu.SWITCH_VOLUME_UP):
-                    if vol > 0:  # Zero means tone not playing
-                        # Increase Tone A
-                        vol = min(vol + 10, 20000)
-                        #channels[0].frequency(vol)
-
-                if gu.is_pressed(gu.SWITCH_VOLUME_DOWN):
-                    if vol > 0:  # Zero means tone not playing
-                        # Decrease Tone A
-                        vol = max(vol - 10, 10)
-                        #channels[0].frequency(vol)
-                    
-                if gu.is_pressed(gu.SWITCH_VOLUME_UP):
-                    text = "Vol Up"+' '+str(vol)
-                    gr.set_pen(gr.create_pen(0, 0, 0))
-                    clear()
-                    outline_text(text, x=5)
-
-                if gu.is_pressed(gu.SWITCH_VOLUME_DOWN):
-                    text = "Vol Dn"+' '+str(vol)
-                    gr.set_pen(gr.create_pen(0, 0, 0))
-                    clear()
-                    outline_text(text, x=5)
-
-            if gu.is_pressed(gu.SWITCH_A):
-                adjust_hour(gu.SWITCH_A)
-            
-            if gu.is_pressed(gu.SWITCH_B):
-                adjust_hour(gu.SWITCH_B)
-                
-            if gu.is_pressed(gu.SWITCH_C):
-                adjust_minute(gu.SWITCH_C)
-                
-            if gu.is_pressed(gu.SWITCH_D):
-                adjust_minute(gu.SWITCH_D)
-                
-            if gu.is_pressed(gu.SWITCH_SLEEP):
-                text = "Reset..."
-                print("Going to reset...")
+                    print_status(TAG, elapsed_secs, elapsed_secs == 0 or mod_secs60 == 0)
+
+            if poll_buttons():
                 stop = True
-                gr.set_pen(gr.create_pen(0, 0, 0))
-                clear()
-                outline_text(text)
-    
-            redraw_display_if_reqd()
 
-            # update the display
-            gu.update(gr)
-            
+            service()
+
+            if render:
+                if fb.dirty or time_chgd or curr_secs > last_tm:
+                    render.request()  # the worker redraws and shows the frame (a probe saw the second start)
+            elif edge:
+                if edge.step():
+                    sched.due(0)  # the second just started: the status, resync, chimes
+            else:
+                redraw_display_if_reqd()
+
+                # update the display, if the frame changed
+                if prof: t0 = time.ticks_us()
+                fb.present(gu)
+                if prof: prof.add(ST_UPDATE, t0)
+
             if stop:
                 time.sleep(2)
                 machine.reset()
 
-            time.sleep(0.01)
+            heap.tick_end()
+            schedule()
+            sched.sleep()
         except KeyboardInterrupt:
             print("Keyboard interrupt. Exiting...")
             sys.exit()
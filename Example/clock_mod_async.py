@@ -0,0 +1,104 @@
+#
+# Belongs to clock_mod.py
+# uasyncio runtime. Used by main() in clock_mod.py when 'use_asyncio' is True.
+#
+# Instead of one loop waking up every 10 ms, separate tasks wake up only when they have work:
+# - render_task(): redraws the display just after each second boundary (cm.ms_to_next_second(), from the
+#                  ticks: see clock_mod_edge.py) and takes the samples of the RTC that cm.edge_clock asks for;
+# - button_task(): handles the queued button events and advances the non-blocking jobs (see service()) every BUTTON_POLL_MS;
+# - sync_task():   starts a sync of the built-in RTC from NTP every 'interval_secs';
+# - status_task(): prints the status table to the REPL every STATUS_SECS.
+# Runs on MicroPython (uasyncio) and on CPython (asyncio).
+# The tasks use the globals and functions of clock_mod.py through the module object 'cm'
+# passed to run(), so clock_mod.py can be run as '__main__'.
+#
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import time
+
+BUTTON_POLL_MS = 50
+STATUS_SECS = 10
+
+cm = None          # the clock_mod module
+start_secs = 0     # epoch() of the last sync
+
+
+async def sleep_ms(ms):
+    if hasattr(asyncio, 'sleep_ms'):
+        await asyncio.sleep_ms(ms)
+    else:
+        await asyncio.sleep(ms / 1000)
+
+
+async def render_task():
+    while True:
+        cm.wakeups += 1
+        cm.heap.tick_start()
+        with cm.frame_lock:
+            cm.edge_clock.step()  # the start of the seconds of the RTC, when it needs a sample
+        cm.redraw_display_if_reqd()
+        cm.chime_check(cm.last_tm)  # the quarters (see clock_mod_audio.py)
+        if cm.prof: t0 = time.ticks_us()
+        cm.fb.present(cm.gu)
+        if cm.prof: cm.prof.add(cm.ST_UPDATE, t0)
+        cm.heap.tick_end()
+        # garbage collection (see clock_mod_heap.py), before button_task() wakes up again
+        ms = cm.ms_to_next_second()
+        cm.heap.idle(min(ms, BUTTON_POLL_MS))
+        ms = cm.ms_to_next_second(cm.last_tm) + 1
+        probe = cm.edge_clock.due_ms()
+        await sleep_ms(probe if 0 <= probe < ms else ms)
+
+
+async def button_task():
+    while True:
+        cm.wakeups += 1
+        stop = cm.poll_buttons()
+        cm.service()  # NTP sync steps, status LED blink, tones
+        if cm.time_chgd:
+            cm.redraw_display_if_reqd()  # show the changed hour/minute at once
+        cm.fb.present(cm.gu)  # the volume/reset screens, the status LED blinks (if any changed)
+        if stop:
+            await sleep_ms(2000)
+            cm.machine.reset()
+        ms = cm.sync_machine.due_ms()  # sooner while waiting for the NTP replies
+        await sleep_ms(ms if 0 <= ms < BUTTON_POLL_MS else BUTTON_POLL_MS)
+
+
+async def sync_task(TAG):
+    global start_secs
+    while True:
+        await sleep_ms(cm.interval_secs * 1000)
+        cm.wakeups += 1
+        start_secs = cm.epoch()
+        cm.resync(TAG)
+
+
+async def status_task(TAG):
+    await sleep_ms(cm.ms_to_next_second() + 10)  # let render_task() set the clock string first
+    while True:
+        cm.wakeups += 1
+        elapsed_secs = cm.epoch() - start_secs
+        cm.print_status(TAG, elapsed_secs, elapsed_secs < STATUS_SECS or elapsed_secs % 60 < STATUS_SECS)
+        await sleep_ms((STATUS_SECS - 1) * 1000 + cm.ms_to_next_second())
+
+
+async def run_tasks(TAG):
+    asyncio.create_task(render_task())
+    asyncio.create_task(button_task())
+    asyncio.create_task(sync_task(TAG))
+    await status_task(TAG)
+
+
+def run(clock_mod, TAG):
+    global cm, start_secs
+    cm = clock_mod
+    start_secs = cm.epoch()
+    print(TAG+f"Display color: {cm.clr_dict_rev[cm.clr_idx]}")
+    try:
+        asyncio.run(run_tasks(TAG))
+    except KeyboardInterrupt:
+        print("Keyboard interrupt. Exiting...")
+        cm.sys.exit()
@@ -0,0 +1,164 @@
+#
+# Belongs to clock_mod.py
+# Non-blocking tone sequencer and chimes.
+#
+# A pattern is a tuple of steps (channel, frequency, ms): the tone is started on that synth
+# channel (gu.synth_channel()) and ms later the next step starts. A tone sounds until the
+# channel is released: when a step starts on another channel (the tone fades out with the
+# release time of the channel, while the next one starts) or at a rest (frequency 0).
+# play() queues a pattern (at most max_queue); with cut=True the pattern playing and the
+# queue are dropped first (e.g. for the volume feedback).
+# Nothing sleeps: run() starts the steps that are due and notes the deadline of the next one.
+# - With a machine.Timer, the timer is armed (one-shot) for the next deadline and its callback
+#   runs run() through micropython.schedule(), so the notes keep their time while the main
+#   loop sleeps or is busy, and the main loop doesn't wake up for them;
+# - without one, step() is called by the main loop (see service() in clock_mod.py) and
+#   due_ms() is the time to the next deadline, for the scheduler.
+# The main code only appends to the queue and counts the cuts; all the other state is changed
+# by run(), so the timer callback can run between any two lines of the main code.
+# gu.play_synth() is called when the first pattern starts, gu.stop_playing() when the queue is empty.
+#
+# chime(q, strikes) is the pattern of quarter q of the hour: the Westminster quarters
+# (1: one phrase, 2: two, 3: three; 0: four, then 'strikes' strokes of the hour bell).
+#
+import time
+try:
+    from micropython import schedule
+except ImportError:
+    schedule = None
+
+
+class Sequencer:
+    def __init__(self, gu, channels, timer=None, volume=0.06, max_queue=4):
+        self.gu = gu
+        self.channels = channels
+        self.timer = timer
+        self.volume = volume
+        self.max_queue = max_queue
+        self.queue = []
+        self.cuts = 0          # play(cut=True) calls
+        self.cuts_done = 0     # cuts done by run()
+        self.pattern = None    # the pattern playing
+        self.i = 0             # its next step
+        self.due = 0           # time.ticks_ms() of the next step
+        self.armed = False     # the timer is armed
+        self.playing = False   # gu.play_synth() called
+        self.ch = -1           # the channel sounding
+        self.run_ref = self.run  # bound once: the IRQ must not allocate
+        self.irq_ref = self.irq
+        self.patterns = 0      # patterns started
+        self.notes = 0         # steps played
+        self.dropped = 0       # patterns dropped (queue full)
+        self.late_max = 0      # ms a step started after its deadline, max this period
+
+    def busy(self):
+        return self.pattern is not None or len(self.queue) > 0
+
+    # Queue a pattern; False if the queue is full
+    def play(self, pattern, cut=False):
+        if len(self.queue) >= self.max_queue and not cut:
+            self.dropped += 1
+            return False
+        if cut:
+            self.cuts += 1  # first: run() keeps the last pattern of the queue
+        self.queue.append(pattern)
+        if self.timer is not None and not self.armed:
+            self.armed = True
+            self.timer.init(mode=self.timer.ONE_SHOT, period=1, callback=self.irq_ref)
+        return True
+
+    def irq(self, t):
+        schedule(self.run_ref, 0)
+
+    # Start the steps that are due
+    def run(self, arg=None):
+        self.armed = False
+        now = time.ticks_ms()
+        if self.cuts != self.cuts_done:
+            self.cuts_done = self.cuts
+            del self.queue[:-1]
+            self.pattern = None
+        while True:
+            p = self.pattern
+            if p is None:
+                if not self.queue:
+                    self.release()
+                    if self.playing:
+                        self.playing = False
+                        self.gu.stop_playing()
+                    return
+                p = self.pattern = self.queue.pop(0)
+                self.i = 0
+                self.due = now
+                self.patterns += 1
+                if not self.playing:
+                    self.playing = True
+                    self.gu.play_synth()
+            late = time.ticks_diff(now, self.due)
+            if late < 0:
+                break
+            if self.i >= len(p):
+                self.pattern = None
+                continue
+            ch, f, ms = p[self.i]
+            if ch != self.ch or not f:
+                self.release()
+            if f:
+                self.channels[ch].play_tone(f, self.volume)
+                self.ch = ch
+            self.i += 1
+            self.notes += 1
+            if late > self.late_max:
+                self.late_max = late
+            # keep the rhythm, unless far behind
+            self.due = time.ticks_add(now if late > ms else self.due, ms)
+        if self.timer is not None:
+            self.armed = True
+            self.timer.init(mode=self.timer.ONE_SHOT, period=max(1, -late), callback=self.irq_ref)
+
+    def release(self):
+        if self.ch >= 0:
+            self.channels[self.ch].trigger_release()
+            self.ch = -1
+
+    # Called by the main loop: plays the steps that are due, if there is no timer
+    def step(self):
+        if self.timer is None and (self.pattern is not None or self.queue):
+            self.run()
+
+    # ms until step() has work, -1 if none (or the timer does it)
+    def due_ms(self):
+        if self.timer is not None:
+            return -1
+        if self.pattern is None:
+            return 0 if self.queue else -1
+        return max(0, time.ticks_diff(self.due, time.ticks_ms()))
+
+    # Status line; starts a new period
+    def stats(self):
+        s = "audio: {} patterns, {} notes, {} dropped, late max {} ms".format(
+            self.patterns, self.notes, self.dropped, self.late_max)
+        self.late_max = 0
+        return s
+
+
+# The Westminster quarters in E major: G#4, F#4, E4, B3; the hour bell E3
+NOTE_MS = 500
+PHRASES = ((415, 370, 330, 247), (330, 415, 370, 247), (330, 370, 415, 330),
+           (415, 330, 370, 247), (247, 370, 415, 330))
+QUARTERS = ((1, 2, 3, 4), (0,), (1, 2), (3, 4, 0))  # phrases of quarter 0 (the hour) ... 3
+STRIKE = 165
+STRIKE_MS = 1500
+
+
+# The notes alternate between channels 0 and 1, so a bell fades out while the next one starts
+def chime(q, strikes=0):
+    steps = []
+    for k in QUARTERS[q]:
+        for j, f in enumerate(PHRASES[k]):
+            steps.append((len(steps) & 1, f, NOTE_MS if j < 3 else 2 * NOTE_MS))
+        steps.append((0, 0, NOTE_MS))
+    if q == 0:
+        for j in range(strikes):
+            steps.append((len(steps) & 1, STRIKE, STRIKE_MS))
+    return tuple(steps)
@@ -0,0 +1,43 @@
+#
+# Belongs to clock_mod.py
+# Cache of precomputed gradient backgrounds.
+#
+# The 'classic' gradient background only depends on the percentage-to-midday,
+# which barely moves from one second to the next. clock_mod.py quantizes that
+# percentage into a key and stores, per key, the pixel row of the gradient
+# (see FrameBuffer.gradient_row() in clock_mod_fb.py). Every row of the background is a copy of it.
+# The cache holds at most 'max_entries' rows; the least recently used one is dropped.
+#
+class BackgroundCache:
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.tables = {}
+        self.order = []  # keys, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    # Return the row stored for key, or None
+    def lookup(self, key):
+        row = self.tables.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.order[-1] != key:
+            self.order.remove(key)
+            self.order.append(key)
+        return row
+
+    def store(self, key, row):
+        if key in self.tables:
+            self.order.remove(key)
+        elif len(self.order) >= self.max_entries:
+            del self.tables[self.order.pop(0)]
+        self.tables[key] = row
+        self.order.append(key)
+        return row
+
+    def clear(self):
+        self.tables = {}
+        self.order = []
+
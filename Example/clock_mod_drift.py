@@ -0,0 +1,85 @@
+#
+# Belongs to clock_mod.py
+# Self-calibrating drift model of the built-in RTC.
+#
+# At each NTP sync clock_mod.py passes the offset (NTP time - RTC time, in ms)
+# the sync corrected. Since the previous sync set the RTC right, offset / elapsed time
+# is the drift rate of the RTC. The rate, in ppm, is estimated from the last
+# 'n_samples' syncs (sum of the offsets / sum of the intervals, so long intervals weigh more).
+# It is kept in ppb (parts per billion), an integer.
+# Between syncs, correction_ms() returns the time to add to the RTC time.
+# A sync that can only set whole seconds (the RTC of the rp2 port) leaves the RTC off by a
+# fraction of a second, phase_ms: correction_at() adds it, and the drift since that sync is
+# the next offset minus phase_ms.
+# The sync interval is doubled after a sync whose offset was predicted within
+# 'tolerance_ms', and halved when the prediction was off by more than twice that,
+# within [min_interval, max_interval] seconds.
+# All arithmetic is done with integers (MicroPython floats are 32-bit and each one is allocated
+# on the heap). correction_ms() is called every second: it stays within the small integers of
+# MicroPython (no heap allocation) for rates up to 1000 ppm, and clock_mod.py counts the RTC
+# seconds from BASE (see clock_mod_tz.py).
+#
+class DriftModel:
+    def __init__(self, min_interval, max_interval, tolerance_ms=1000, n_samples=8):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tolerance_ms = tolerance_ms
+        self.n_samples = n_samples
+        self.interval = min_interval
+        self.offsets = []     # ms
+        self.elapsed = []     # s
+        self.rate_ppb = 0
+        self.last_sync = None  # RTC seconds at the last sync
+        self.phase_ms = 0      # NTP time - RTC time just after the last sync
+        self.syncs = 0
+        self.last_err_ms = 0
+        self.max_err_ms = 0
+
+    # Milliseconds to add to the RTC time, 'secs' seconds after the last sync (rounded towards 0):
+    # rate_ppb * secs // 1000000 in two steps, so the product stays small
+    def correction_ms(self, secs):
+        if secs <= 0:
+            return 0
+        r = self.rate_ppb
+        n = r if r >= 0 else -r
+        ms = (n * (secs // 1000) + n * (secs % 1000) // 1000) // 1000
+        return ms if r >= 0 else -ms
+
+    # Correction for the RTC time 'rtc_secs'
+    def correction_at(self, rtc_secs):
+        if self.last_sync is None:
+            return 0
+        return self.phase_ms + self.correction_ms(rtc_secs - self.last_sync)
+
+    # Record a sync. offset_ms: NTP time - RTC time just before the sync;
+    # rtc_secs: RTC time (seconds) just after it; phase_ms: NTP time - RTC time just after it.
+    # Returns the next sync interval in seconds.
+    def synced(self, offset_ms, rtc_secs, phase_ms=0):
+        self.syncs += 1
+        if self.last_sync is not None:
+            elapsed = rtc_secs - self.last_sync
+            if elapsed > 0:
+                offset_ms -= self.phase_ms  # the drift since the last sync
+                err = offset_ms - self.correction_ms(elapsed)  # error of the displayed time
+                self.last_err_ms = err
+                if abs(err) > self.max_err_ms:
+                    self.max_err_ms = abs(err)
+                self.offsets.append(offset_ms)
+                self.elapsed.append(elapsed)
+                if len(self.offsets) > self.n_samples:
+                    self.offsets.pop(0)
+                    self.elapsed.pop(0)
+                self.rate_ppb = sum(self.offsets) * 1000000 // sum(self.elapsed)
+                if len(self.offsets) > 1 and abs(err) <= self.tolerance_ms:
+                    self.interval = min(self.interval * 2, self.max_interval)
+                elif abs(err) > 2 * self.tolerance_ms:
+                    self.interval = max(self.interval // 2, self.min_interval)
+        self.last_sync = rtc_secs
+        self.phase_ms = phase_ms
+        return self.interval
+
+    def stats(self):
+        r = self.rate_ppb
+        n = (r if r >= 0 else -r) // 100  # 0.1 ppm
+        return "drift: {}{}.{} ppm, {} syncs, interval {} s, last error {} ms, max error {} ms".format(
+            '-' if r < 0 else '', n // 10, n % 10, self.syncs, self.interval, self.last_err_ms, self.max_err_ms)
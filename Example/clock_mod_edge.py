@@ -0,0 +1,310 @@
+#
+# Belongs to clock_mod.py
+# Second edges: the seconds of the clock from the ticks, each second drawn ahead and shown when it starts.
+#
+# The main loop used to read the clock after each wake-up: time.time_ns() of the rp2 port
+# reads the RTC, which counts whole seconds, so it never told how far into a second it was:
+# the sleep to the next second was a whole second from whenever the clock was read, and the
+# display changed up to a second late. Each read also returns a long integer (the seconds since
+# 1970 don't fit in a small integer), a few bytes on the heap every pass.
+# EdgeClock keeps the phase of the seconds of the RTC (clock_ns()) in time.ticks_us(): an edge
+# (the start of a second) is in the interval (lo, hi] of ticks, the next edges follow every
+# 1000000 us. The clock of clock_mod.py is the RTC plus the drift correction (corr_ms() of each
+# second of the RTC, see clock_mod_drift.py), counted in seconds from 'base' (see BASE in
+# clock_mod_tz.py): second() and us_to_next() work it out from the ticks, small integers,
+# without reading the RTC. rtc_ns() is the RTC to the us (for the NTP timestamps), also when
+# it only counts whole seconds.
+# sample() reads the RTC and the ticks:
+# - when the RTC has the fraction of the second, the edge is the ticks minus the fraction;
+# - when it only has whole seconds, the first sample in a new second puts the edge between the
+#   previous sample and this one (step() samples every poll_ms until then). From then on each
+#   sample in the interval narrows it: the RTC still in the old second moves lo to the sample,
+#   in the new one hi. probe_us() tells when a sample halves it: at its middle (the main loop
+#   wakes in whole ms: step() waits the last bit with sleep_us(), and the halving goes on while
+#   the next middle is that close), until it is within tol_us.
+# The seconds start at hi: never before the RTC has the new one, at most the width late.
+# The ticks and the RTC may drift apart (drift_ppm): every check_s seconds the RTC is read
+# again, or with whole seconds the interval is widened by what they could have drifted and the
+# probes narrow it again (not just after an edge: the second would go back). aligned() holds
+# while it is no wider than that. A sample that doesn't fit (the RTC was set without reset())
+# drops the interval; it is found again from the next new second.
+# The ticks wrap after 1073 s: step() must be called at least every few minutes.
+# EdgePresenter shows the frames of the main loop (instead of redraw() and fb.present()).
+# When the edge is aligned it draws the next second lead_us before its edge (redraw(tm)),
+# copies it into gr (fb.stage()), waits for the edge with time.sleep_us() and shows it
+# (fb.flip()): the display changes at the edge, whatever the drawing took. lead_us follows the
+# drawing time: the longest one plus margin_us, then it decays slowly. The other changes
+# (messages, the status LED, ...) are shown at once, as before.
+# With a Profiler 'prof' (see clock_mod_prof.py) the frames it shows are timed as stage
+# prof_stage: fb.present(), or fb.stage() plus fb.flip() without the wait for the edge.
+#
+import time
+
+NS = 1000000000
+SEC_US = 1000000
+
+
+class EdgeClock:
+    # clock_ns(): the RTC (ns since the epoch of 'time'); corr_ms(s): the drift correction at RTC second s (since base)
+    def __init__(self, clock_ns, corr_ms=None, base=0, tol_us=250, margin_us=2000, check_s=30,
+                 drift_ppm=50, poll_ms=20):
+        self.clock_ns = clock_ns
+        self.corr_ms = corr_ms
+        self.base = base
+        self.tol_us = tol_us
+        self.margin_us = margin_us
+        self.check_s = check_s
+        self.drift_us = drift_ppm * check_s  # the ticks and the RTC may drift apart in check_s
+        self.poll_ms = poll_ms
+        self.fine = False     # the RTC has the fraction of the second
+        self.lo = None        # an edge is in (lo, hi] (time.ticks_us()); None: not known
+        self.hi = None
+        self.sec = 0          # the RTC second (since base) that started at that edge
+        self.checked = 0      # the RTC second of the last check
+        self.k = None         # the previous sample: ticks (before the clock was read), second
+        self.s = 0
+        self.samples = 0
+        self.restarts = 0     # the interval was dropped (a sample didn't fit)
+
+    def known(self):
+        return self.lo is not None
+
+    def aligned(self):
+        return self.lo is not None and self.width_us() <= self.tol_us + 2 * self.drift_us
+
+    def width_us(self):
+        return time.ticks_diff(self.hi, self.lo)
+
+    # The RTC was set: find the edge again
+    def reset(self):
+        self.lo = None
+        self.k = None
+
+    def sample(self):
+        k0 = time.ticks_us()
+        t = self.clock_ns()
+        k = time.ticks_us()  # the clock was read between k0 and k
+        s = t // NS
+        self.samples += 1
+        if t % NS:
+            self.fine = True
+        s -= self.base
+        if self.fine:
+            f = t % NS // 1000  # the ns are cut off: the edge may be up to 1 us later
+            self.lo = time.ticks_add(k0, -f - 1)
+            self.hi = time.ticks_add(k, -f + 1)
+            self.sec = s
+        elif self.lo is not None and not self.check(k0, k, s):
+            self.restarts += 1
+            self.lo = None
+        if self.lo is None and self.k is not None and s == self.s + 1:
+            self.lo = self.k  # a new second since the previous sample
+            self.hi = k
+            self.sec = s
+        self.k = k0
+        self.s = s
+        self.checked = s
+
+    # Narrow the interval with second s, read between ticks k0 and k. False if that doesn't fit
+    def check(self, k0, k, s):
+        d = time.ticks_diff(k0, self.lo)
+        n = d // SEC_US
+        if n:  # on to the edge just before k0
+            self.lo = time.ticks_add(self.lo, n * SEC_US)
+            self.hi = time.ticks_add(self.hi, n * SEC_US)
+            self.sec += n
+            d -= n * SEC_US
+        if d > self.width_us():
+            return s == self.sec
+        if s == self.sec - 1:
+            self.lo = k0  # the edge is later
+        elif s == self.sec:
+            if time.ticks_diff(k, self.hi) < 0:
+                self.hi = k
+        else:
+            return False
+        return True
+
+    # Sample the RTC when that tells something: to find the edge, to narrow it, every check_s
+    def step(self):
+        if self.lo is None:
+            self.sample()
+            return
+        if self.check_due() and time.ticks_diff(time.ticks_us(), self.hi) % SEC_US > self.drift_us:
+            # (not within drift_us after an edge: the later hi would take the second back)
+            if self.fine:
+                self.sample()
+                return
+            self.lo = time.ticks_add(self.lo, -self.drift_us)
+            self.hi = time.ticks_add(self.hi, self.drift_us)
+            self.checked = self.rtc_second()
+        while True:  # halve the interval while its middle is close
+            us = self.probe_us()
+            if us < 0 or us > self.margin_us:
+                break
+            time.sleep_us(us)
+            self.sample()
+
+    # check_s seconds since the last check
+    def check_due(self):
+        return self.rtc_second() - self.checked >= self.check_s
+
+    # The edges of the RTC: hi, never before the RTC has the new second (at most the width late)
+    def rtc_edge(self):
+        return self.hi
+
+    # The RTC (ns since the epoch of 'time') at ticks now: from the edge, to the us, while it is
+    # known (a long integer: not for every pass)
+    def rtc_ns(self, now=None):
+        if self.lo is None:
+            return self.clock_ns()
+        if now is None:
+            now = time.ticks_us()
+        t = time.ticks_diff(now, self.rtc_edge())
+        return (self.base + self.sec + t // SEC_US) * NS + t % SEC_US * 1000
+
+    # The RTC second (since base) at ticks now
+    def rtc_second(self, now=None):
+        if now is None:
+            now = time.ticks_us()
+        return self.sec + time.ticks_diff(now, self.rtc_edge()) // SEC_US
+
+    # The drift correction (us) in RTC second r
+    def corr_us(self, r):
+        return self.corr_ms(r) * 1000 if self.corr_ms else 0
+
+    # The drift corrected second (since base) at ticks now
+    def second(self, now=None):
+        if now is None:
+            now = time.ticks_us()
+        t = time.ticks_diff(now, self.rtc_edge())
+        r = self.sec + t // SEC_US
+        return r + (t % SEC_US + self.corr_us(r)) // SEC_US
+
+    # us from ticks now to the next drift corrected second (1 ... 1000000 and the change of the
+    # correction at the next second of the RTC)
+    def us_to_next(self, now=None):
+        if now is None:
+            now = time.ticks_us()
+        t = time.ticks_diff(now, self.rtc_edge())
+        r = self.sec + t // SEC_US
+        d = t % SEC_US  # us into RTC second r
+        c = self.corr_us(r)
+        us = SEC_US - (d + c) % SEC_US
+        if d + us < SEC_US:
+            return us
+        us = SEC_US - d  # to the next second of the RTC, with its correction c1
+        c1 = self.corr_us(r + 1)
+        if 1 + c1 // SEC_US > (SEC_US - 1 + c) // SEC_US:
+            return us  # a second starts there (the correction moved on)
+        return us + -c1 % SEC_US
+
+    # The ticks of the next edge of the drift corrected seconds after now: second(e) starts there
+    def next_edge(self, now=None):
+        if now is None:
+            now = time.ticks_us()
+        return time.ticks_add(now, self.us_to_next(now))
+
+    # us until a sample narrows the interval, -1 when it is within tol_us (or not known yet)
+    def probe_us(self):
+        if self.lo is None or self.fine:
+            return -1
+        w = self.width_us()
+        if w <= self.tol_us:
+            return -1
+        d = time.ticks_diff(time.ticks_us(), self.lo) % SEC_US  # where we are in the second
+        if d < w:  # at or past the middle (woken late) a sample still narrows it
+            return w // 2 - d if d < w // 2 else 0
+        return SEC_US - d + w // 2
+
+    # ms until step() has a sample to take, -1: none
+    def due_ms(self):
+        if self.lo is None:
+            return self.poll_ms  # the RTC is read until its second changes
+        if self.check_due():
+            return self.drift_us // 1000 + 1  # (waits for the end of drift_us after an edge)
+        us = self.probe_us()
+        return -1 if us < 0 else us // 1000  # just before: step() waits the rest
+
+    def stats(self):
+        if self.lo is None:
+            return "edge: not known, {} samples".format(self.samples)
+        return "edge: {} RTC, within {} us, {} samples, {} restarts".format(
+            'fine' if self.fine else 'whole-second', self.width_us(), self.samples, self.restarts)
+
+
+class EdgePresenter:
+    # redraw(tm): compose the frame of second tm of edge.second() in fb (None: the current time)
+    def __init__(self, edge, fb, gu, redraw, lead_us=20000, margin_us=2000, prof=None, prof_stage=0):
+        self.edge = edge
+        self.fb = fb
+        self.gu = gu
+        self.redraw = redraw
+        self.lead_us = lead_us
+        self.margin_us = margin_us
+        self.prof = prof
+        self.prof_stage = prof_stage
+        self.shown_tm = -1     # the second shown at its edge last
+        self.flips = 0         # seconds shown at their edge
+        self.late = 0          # of those, drawn too late to wait for the edge
+        self.late_max = 0      # us
+        self.draw_max = 0      # us
+
+    def aligned(self):
+        return self.edge.aligned()
+
+    # Show the frame: True when the next second was drawn ahead and shown at its edge
+    def step(self):
+        edge = self.edge
+        prof = self.prof
+        if edge.aligned():
+            t0 = time.ticks_us()
+            e = edge.next_edge(t0)
+            tm = edge.second(e)
+            if tm != self.shown_tm and time.ticks_diff(e, t0) <= self.lead_us:
+                self.redraw(tm)
+                if prof: ts = time.ticks_us()
+                self.fb.stage()
+                t1 = time.ticks_us()
+                d = time.ticks_diff(t1, t0)
+                if d > self.draw_max:
+                    self.draw_max = d
+                need = d + self.margin_us
+                if need > self.lead_us:
+                    self.lead_us = need
+                else:
+                    self.lead_us -= (self.lead_us - need) >> 6
+                us = time.ticks_diff(e, t1)
+                if us > 0:
+                    time.sleep_us(us)
+                else:
+                    self.late += 1
+                    if -us > self.late_max:
+                        self.late_max = -us
+                if prof: ts = time.ticks_add(time.ticks_us(), -time.ticks_diff(t1, ts))  # with stage()
+                self.fb.flip(self.gu)
+                if prof: prof.add(self.prof_stage, ts)
+                self.shown_tm = tm
+                self.flips += 1
+                return True
+        self.redraw(None)
+        if prof: t0 = time.ticks_us()
+        self.fb.present(self.gu)
+        if prof: prof.add(self.prof_stage, t0)
+        return False
+
+    # ms until the next second is drawn ahead, -1: none (not aligned)
+    def due_ms(self):
+        edge = self.edge
+        if not edge.aligned():
+            return -1
+        t = time.ticks_us()
+        e = edge.next_edge(t)
+        if edge.second(e) == self.shown_tm:  # shown a little ahead of a later guess of its edge
+            e = time.ticks_add(e, SEC_US)
+        us = time.ticks_diff(e, t) - self.lead_us
+        return (us + 999) // 1000 if us > 0 else 0
+
+    def stats(self):
+        return "{}; {} seconds at their edge, lead {} us (drawing max {} us), {} late (max {} us)".format(
+            self.edge.stats(), self.flips, self.lead_us, self.draw_max, self.late, self.late_max)
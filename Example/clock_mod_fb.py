@@ -0,0 +1,188 @@
+#
+# Belongs to clock_mod.py
+# Frame compositor.
+#
+# The clock is drawn into 'layer', a preallocated bytearray in the pixel format of the
+# PicoGraphics framebuffer of the Galactic Unicorn (PEN_RGB888: one 32-bit little-endian
+# word 0x00RRGGBB per pixel, rows of width*4 bytes), with slice assignments instead of
+# one PicoGraphics call per pixel or span:
+# - backgrounds: one row is built, then copied into every row (see fill(), fill_row());
+# - glyphs: each glyph is rendered once per colour pair into per-row byte strings
+#   ('cells'), copied with one slice assignment per row (see blit(), blit_cell());
+# - outlined text: spans of the cached masks of the characters (see clock_mod_outline.py).
+# The status LED (the 2x2 square of blink()) is a separate overlay, so the layer stays intact.
+# present() copies the layer into memoryview(gr), draws the overlay and calls gu.update(gr):
+# once per frame, and only when something changed (the 'dirty' flag). stage() and flip() do the
+# same in two steps, to show a frame drawn ahead at a given time.
+#
+from clock_mod_glyphs import G_WIDTH, G_ROWS, G_MASK, G_BLINK, G_BLINK_SPANS
+
+
+# The 4 bytes of a pen in the framebuffer
+def pen_bytes(pen):
+    return bytes((pen & 0xff, (pen >> 8) & 0xff, (pen >> 16) & 0xff, 0))
+
+
+class FrameBuffer:
+    def __init__(self, gr, width, height):
+        self.gr = gr
+        self.gr_buf = memoryview(gr)
+        self.width = width
+        self.height = height
+        self.stride = width * 4
+        self.layer = bytearray(self.stride * height)
+        self.row = bytearray(self.stride)  # scratch row of fill() and gradient_row()
+        self.pens = {}        # pen -> pen_bytes(pen)
+        self.cells = {}       # id(glyph) (~id(glyph) with blink_on) -> tuple of row byte strings
+        self.cell_fg = None   # the pens of the cells
+        self.cell_bg = None
+        self.led = None       # (x, y, size, pen) of the status LED overlay, or None
+        self.dirty = True
+        self.presents = 0     # number of gu.update() calls by present() and show()
+
+    def pen(self, pen):
+        b = self.pens.get(pen)
+        if b is None:
+            if len(self.pens) >= 64:
+                self.pens = {}
+            b = pen_bytes(pen)
+            self.pens[pen] = b
+        return b
+
+    # Copy row (width*4 bytes) into every row of the layer
+    def fill_row(self, row):
+        s = self.stride
+        for y in range(self.height):
+            self.layer[y * s:(y + 1) * s] = row
+        self.dirty = True
+
+    # Fill the layer with one pen
+    def fill(self, pen):
+        b = self.pen(pen)
+        row = self.row
+        for x in range(0, self.stride, 4):
+            row[x:x + 4] = b
+        self.fill_row(row)
+
+    # Return the row (bytes) of a mirrored gradient: pens[x] for the columns x and width-x-1,
+    # for x < width//2, and pens[width//2] for the centre column. See clock_mod_bgcache.py
+    def gradient_row(self, pens):
+        w = self.width
+        half = w // 2
+        row = self.row
+        for x in range(half):
+            b = self.pen(pens[x])
+            row[x * 4:x * 4 + 4] = b
+            row[(w - x - 1) * 4:(w - x) * 4] = b
+        row[half * 4:half * 4 + 4] = self.pen(pens[half])
+        return bytes(row)
+
+    # Fill the columns x ... x+n-1 of all rows with one pen (pixel by pixel: a slice of a row
+    # would be a new bytearray)
+    def fill_rect(self, x, n, pen):
+        if n <= 0:
+            return
+        b = self.pen(pen)
+        layer = self.layer
+        s = self.stride
+        for y in range(self.height):
+            o = y * s + x * 4
+            for i in range(o, o + n * 4, 4):
+                layer[i:i + 4] = b
+        self.dirty = True
+
+    # Return the rows of a glyph in the colours fg/bg as a tuple of byte strings
+    def cell(self, glyph, fg, bg, blink_on):
+        if fg != self.cell_fg or bg != self.cell_bg:
+            self.cells = {}
+            self.cell_fg = fg
+            self.cell_bg = bg
+        if blink_on and not glyph[G_BLINK_SPANS]:
+            blink_on = False  # no 'X' pixels: the same cell
+        key = ~id(glyph) if blink_on else id(glyph)  # a small integer (the address), not a new tuple
+        c = self.cells.get(key)
+        if c is None:
+            fgb = self.pen(fg)
+            bgb = self.pen(bg)
+            w = glyph[G_WIDTH]
+            rows = []
+            for y in range(glyph[G_ROWS]):
+                m = glyph[G_MASK][y]
+                if blink_on:
+                    m |= glyph[G_BLINK][y]
+                r = bytearray(w * 4)
+                for x in range(w):
+                    r[x * 4:x * 4 + 4] = fgb if (m >> x) & 1 else bgb
+                rows.append(bytes(r))
+            c = tuple(rows)
+            self.cells[key] = c
+        return c
+
+    # Draw a compiled glyph (see clock_mod_glyphs.py) with its left column at x, top row at 0:
+    # the glyph cell in bg with the 'O' pixels (and, if blink_on, the 'X' pixels) in fg.
+    def blit(self, glyph, x, fg, bg, blink_on=False):
+        rows = self.cell(glyph, fg, bg, blink_on)
+        n = glyph[G_WIDTH] * 4
+        o = x * 4
+        s = self.stride
+        for r in rows:
+            self.layer[o:o + n] = r
+            o += s
+        self.dirty = True
+
+    # Draw a glyph in the cell of columns x ... x+w-1: centred, the rest of the cell in bg
+    def blit_cell(self, glyph, x, w, fg, bg, blink_on=False):
+        d = w - glyph[G_WIDTH]
+        if d > 0:
+            self.fill_rect(x, w, bg)
+            x += d // 2
+        self.blit(glyph, x, fg, bg, blink_on)
+
+    # Copy the window of the display width at column pos of an off-screen strip
+    # (height rows of strip_w pixels, the layer format) into the layer. See clock_mod_marquee.py
+    def window(self, strip, strip_w, pos):
+        s = self.stride
+        o = pos * 4
+        for y in range(self.height):
+            self.layer[y * s:(y + 1) * s] = strip[o:o + s]
+            o += strip_w * 4
+        self.dirty = True
+
+    # Show a square of size x size pixels at x, y in pen on top of the layer; pen None: remove it
+    def set_led(self, x, y, size, pen):
+        led = None if pen is None else (x, y, size, pen)
+        if led != self.led:
+            self.led = led
+            self.dirty = True
+
+    # Show the frame on the display if it changed since the previous present()
+    def present(self, gu):
+        if not self.dirty:
+            return False
+        self.show(gu, self.layer, self.led)
+        self.dirty = False
+        return True
+
+    # Show a frame in the layer format (e.g. the front buffer of clock_mod_render.py)
+    # with the status LED overlay led (see set_led()) on the display
+    def show(self, gu, layer, led):
+        self.copy(layer, led)
+        self.flip(gu)
+
+    # Copy a frame and the overlay into gr, without showing it
+    def copy(self, layer, led):
+        self.gr_buf[:len(layer)] = layer
+        if led is not None:
+            x, y, size, pen = led
+            self.gr.set_pen(pen)
+            self.gr.rectangle(x, y, size, size)
+
+    # Copy the frame into gr now and show it later with flip(): drawn ahead (see clock_mod_edge.py)
+    def stage(self):
+        self.copy(self.layer, self.led)
+        self.dirty = False
+
+    # Show what is in gr
+    def flip(self, gu):
+        gu.update(self.gr)
+        self.presents += 1
@@ -0,0 +1,98 @@
+#
+# Belongs to clock_mod.py
+# Binary fonts with lazy glyph loading.
+#
+# tools/font_compiler.py compiles a module of ASCII-art glyphs (like clock_mod_digits.py)
+# into a binary font file (or a module with the file as a bytes constant, which costs
+# no heap when frozen into the firmware). The format, all numbers unsigned, little-endian:
+#   header (8 bytes): magic b'GUF1', number of glyphs, rows per glyph, flags, 0
+#   index (4 bytes per glyph): character code, width, offset of the rows (2 bytes)
+#   rows: per glyph one bitmask byte per row (bit 0 = leftmost column) of the 'O' pixels,
+#         followed, if flags & F_BLINK, by one per row of the 'X' pixels.
+# BinFont reads the header and the index only. A glyph is read, with one small read,
+# the first time it is used and then kept in the glyph tuple format of clock_mod_glyphs.py.
+# BinFont works like the dict of compile_font(): 'c in font', font[c].
+# A font file is looked up in the directories of sys.path, like a module.
+#
+import sys
+from clock_mod_glyphs import make_glyph
+
+MAGIC = b'GUF1'
+HDR_SIZE = 8
+ENTRY_SIZE = 4
+F_BLINK = 1        # the font has a plane of 'X' (blink) pixels
+
+
+# Return the path of file name in the current directory or in a directory of sys.path
+def find_file(name):
+    for d in [''] + sys.path:
+        p = d + '/' + name if d and not d.endswith('/') else d + name
+        try:
+            open(p, 'rb').close()
+            return p
+        except OSError:
+            pass
+    raise OSError("font file {} not found".format(name))
+
+
+class BinFont:
+    # name: a font file; or data: the font as bytes (e.g. the FONT of a frozen module)
+    def __init__(self, name=None, data=None):
+        self.data = None
+        self.path = None
+        if data is None:
+            self.path = find_file(name)
+            with open(self.path, 'rb') as f:
+                hdr = f.read(HDR_SIZE)
+                index = f.read(hdr[4] * ENTRY_SIZE) if len(hdr) == HDR_SIZE else b''
+        else:
+            self.data = memoryview(data)
+            hdr = self.data[:HDR_SIZE]
+            index = self.data[HDR_SIZE:HDR_SIZE + hdr[4] * ENTRY_SIZE]
+        if len(hdr) != HDR_SIZE or bytes(hdr[:4]) != MAGIC:
+            raise ValueError("not a font file")
+        n = hdr[4]
+        if len(index) != n * ENTRY_SIZE:
+            raise ValueError("font file truncated")
+        self.rows = hdr[5]
+        self.planes = 2 if hdr[6] & F_BLINK else 1
+        self.index = {}    # char -> (width, offset)
+        for i in range(0, n * ENTRY_SIZE, ENTRY_SIZE):
+            self.index[chr(index[i])] = (index[i + 1], index[i + 2] | (index[i + 3] << 8))
+        self.buf = bytearray(self.rows * self.planes)
+        self.no_blink = bytes(self.rows)
+        self.glyphs = {}   # char -> glyph tuple, of the glyphs used so far
+        self.loads = 0     # glyphs read
+
+    def __contains__(self, c):
+        return c in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getitem__(self, c):
+        g = self.glyphs.get(c)
+        if g is None:
+            width, offset = self.index[c]
+            rows = self.rows
+            size = rows * self.planes
+            if self.data is not None:
+                planes = self.data[offset:offset + size]  # no copy
+            else:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    if f.readinto(self.buf) != size:
+                        raise ValueError("font file truncated")
+                planes = bytes(self.buf)
+            mask = planes[:rows]
+            blink = planes[rows:] if self.planes == 2 else self.no_blink
+            g = make_glyph(width, mask, blink)
+            self.glyphs[c] = g
+            self.loads += 1
+        return g
+
+    def get(self, c, default=None):
+        return self[c] if c in self.index else default
@@ -0,0 +1,80 @@
+#
+# Belongs to clock_mod.py
+# Glyph compiler.
+#
+# The characters in clock_mod_digits.py are lists of ASCII-art strings.
+# Walking those strings pixel by pixel every second is slow on the Pico W,
+# so compile_font() turns them, once at import time, into:
+# - per-row bitmasks (bit 0 = leftmost column) of the 'O' and 'X' pixels;
+# - tuples of horizontal spans (dx, y, length).
+# Fonts compiled ahead of time into binary files (tools/font_compiler.py) give the
+# bitmasks directly; make_glyph() adds the spans (see clock_mod_font.py).
+#
+GLYPH_ON = 'O'     # pixel always drawn in the foreground colour
+GLYPH_BLINK = 'X'  # pixel drawn in the foreground colour during the 'on' phase of the caret blink
+
+# Indexes into a compiled glyph tuple
+G_WIDTH = 0        # character width, as given in img_dict
+G_ROWS = 1         # number of rows
+G_MASK = 2         # bytearray: per-row bitmask of the 'O' pixels
+G_BLINK = 3        # bytearray: per-row bitmask of the 'X' pixels
+G_SPANS = 4        # tuple of (dx, y, length) spans of the 'O' pixels
+G_BLINK_SPANS = 5  # tuple of (dx, y, length) spans of the 'X' pixels
+
+MAX_GLYPH_WIDTH = 8  # a row bitmask has to fit in one byte
+
+
+# Convert a row bitmask into a list of (dx, y, length) spans
+def mask_to_spans(mask, y, spans):
+    dx = 0
+    while mask:
+        if mask & 1:
+            n = 0
+            while mask & 1:
+                n += 1
+                mask >>= 1
+            spans.append((dx, y, n))
+            dx += n
+        else:
+            mask >>= 1
+            dx += 1
+    return spans
+
+
+# Make a glyph tuple (see the G_* indexes) from the per-row bitmasks
+def make_glyph(width, mask, blink):
+    spans = []
+    blink_spans = []
+    for y in range(len(mask)):
+        mask_to_spans(mask[y], y, spans)
+        mask_to_spans(blink[y], y, blink_spans)
+    return (width, len(mask), mask, blink, tuple(spans), tuple(blink_spans))
+
+
+# Compile one list of ASCII-art strings into a glyph tuple
+def compile_glyph(img, width):
+    if width > MAX_GLYPH_WIDTH:
+        raise ValueError("glyph width {} > {}".format(width, MAX_GLYPH_WIDTH))
+    n_rows = len(img)
+    mask = bytearray(n_rows)
+    blink = bytearray(n_rows)
+    for y in range(n_rows):
+        row = img[y]
+        m = 0
+        b = 0
+        for z in range(len(row)):
+            if row[z] == GLYPH_ON:
+                m |= 1 << z
+            elif row[z] == GLYPH_BLINK:
+                b |= 1 << z
+        mask[y] = m
+        blink[y] = b
+    return make_glyph(width, mask, blink)
+
+
+# Compile an img_dict ({char: [image, width]}) into {char: glyph tuple}
+def compile_font(img_dict):
+    font = {}
+    for k, v in img_dict.items():
+        font[k] = compile_glyph(v[0], v[1])
+    return font
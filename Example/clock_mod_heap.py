@@ -0,0 +1,100 @@
+#
+# Belongs to clock_mod.py
+# Heap and garbage collector instrumentation.
+#
+# The main loop calls tick_start() at the start of a pass and tick_end() at its end: the
+# difference of gc.mem_alloc() is the number of bytes the pass allocated. When it is negative
+# the garbage collector ran during the pass (an 'unplanned' collection, counted in 'auto').
+# idle(ms) is called by the scheduler before it sleeps ms (see clock_mod_sched.py): when the
+# sleep is long enough for a collection (the longest pause so far plus a margin) and more than
+# collect_bytes were allocated since the previous one (or max_secs have passed), it runs
+# gc.collect() there, between two frames, and measures the pause. mem_free() is sampled just
+# before each collection and at the end of each pass: its lowest value is the low-water mark.
+# stats() returns a line for the status output. Without gc.mem_alloc() (CPython, the
+# simulator) only the pauses are measured.
+#
+import gc
+import time
+try:
+    from gc import mem_alloc, mem_free
+except ImportError:
+    mem_alloc = mem_free = None
+
+
+class Heap:
+    def __init__(self, collect_bytes=8192, max_secs=60, margin_ms=5):
+        self.collect_bytes = collect_bytes
+        self.max_secs = max_secs
+        self.margin_ms = margin_ms
+        self.a0 = 0            # mem_alloc() at the start of the pass
+        self.a_gc = mem_alloc() if mem_alloc else 0  # mem_alloc() after the last collection
+        self.t_gc = time.ticks_ms()
+        self.low = mem_free() if mem_free else -1    # low-water mark of mem_free()
+        self.ticks = 0         # passes measured, this period
+        self.alloc_sum = 0
+        self.alloc_max = 0
+        self.auto = 0          # passes with a collection not run by idle()
+        self.gcs = 0           # collections by idle(), this period
+        self.pause_sum_us = 0
+        self.pause_max_us = 0
+        self.pause_worst_us = 0  # longest pause since the start: sets the idle time needed
+
+    def tick_start(self):
+        if mem_alloc:
+            self.a0 = mem_alloc()
+
+    def tick_end(self):
+        if not mem_alloc:
+            return
+        d = mem_alloc() - self.a0
+        if d < 0:
+            self.auto += 1
+            self.a_gc = mem_alloc()
+        else:
+            self.ticks += 1
+            self.alloc_sum += d
+            if d > self.alloc_max:
+                self.alloc_max = d
+        f = mem_free()
+        if f < self.low:
+            self.low = f
+
+    # ms of idle time before the next deadline: collect if worth it and if there is time
+    def idle(self, ms):
+        if ms < self.pause_worst_us // 1000 + self.margin_ms:
+            return
+        t = time.ticks_ms()
+        if mem_alloc:
+            if mem_alloc() - self.a_gc < self.collect_bytes and \
+                    time.ticks_diff(t, self.t_gc) < self.max_secs * 1000:
+                return
+            f = mem_free()
+            if f < self.low:
+                self.low = f
+        elif time.ticks_diff(t, self.t_gc) < self.max_secs * 1000:
+            return
+        t0 = time.ticks_us()
+        gc.collect()
+        p = time.ticks_diff(time.ticks_us(), t0)
+        self.t_gc = time.ticks_ms()
+        if mem_alloc:
+            self.a_gc = mem_alloc()
+        self.gcs += 1
+        self.pause_sum_us += p
+        if p > self.pause_max_us:
+            self.pause_max_us = p
+        if p > self.pause_worst_us:
+            self.pause_worst_us = p
+
+    # Status line; starts a new period
+    def stats(self):
+        s = "heap: "
+        if mem_free:
+            s += "free {} B (low {} B), alloc/pass avg {} B max {} B, {} unplanned gc, ".format(
+                mem_free(), self.low, self.alloc_sum // self.ticks if self.ticks else 0,
+                self.alloc_max, self.auto)
+        s += "idle gc {}x, pause avg {} us max {} us".format(
+            self.gcs, self.pause_sum_us // self.gcs if self.gcs else 0, self.pause_max_us)
+        self.ticks = self.alloc_sum = self.alloc_max = self.auto = 0
+        self.gcs = self.pause_sum_us = self.pause_max_us = 0
+        return s
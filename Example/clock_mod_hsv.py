@@ -0,0 +1,85 @@
+#
+# Belongs to clock_mod.py
+# Fixed-point colour tables of the 'classic' gradient background.
+#
+# HsvTable: the colour at full saturation and value of 'n' hues evenly spaced
+# from hue_lo to hue_hi, computed once at start into a bytearray (3 bytes per hue).
+# rgb(i, s, v) returns the colour of hue index i for a saturation s and a value v
+# in 0 ... 255 with integer arithmetic only: for a given hue HSV to RGB is linear
+# in s and v, channel = v * (255 - s + s * c / 255) / 255, c being the full colour channel.
+#
+# day_phase_table() returns the percentage-to-midday, 1 - (cos(2 * pi * t) + 1) / 2,
+# of each minute of the day, scaled to 0 ... DAY_PHASE_ONE, in an array of 1441
+# entries (the last one is midnight again). day_phase() interpolates the seconds.
+#
+import math
+from array import array
+
+DAY_PHASE_ONE = 65535
+
+
+# Colour (r, g, b), each 0.0 ... 1.0, of hue h (1.0 = 360 degrees, wraps) at full saturation and value
+def hue_rgb(h):
+    h = h % 1.0 * 6.0
+    i = int(h)
+    f = h - i
+    if i == 0:
+        return 1.0, f, 0.0
+    if i == 1:
+        return 1.0 - f, 1.0, 0.0
+    if i == 2:
+        return 0.0, 1.0, f
+    if i == 3:
+        return 0.0, 1.0 - f, 1.0
+    if i == 4:
+        return f, 0.0, 1.0
+    return 1.0, 0.0, 1.0 - f
+
+
+class HsvTable:
+    def __init__(self, hue_lo, hue_hi, n=512):
+        self.hue_lo = hue_lo
+        self.hue_hi = hue_hi
+        self.n = n
+        self.rgb_tab = bytearray(3 * n)
+        for i in range(n):
+            r, g, b = hue_rgb(hue_lo + (hue_hi - hue_lo) * i / (n - 1))
+            self.rgb_tab[3 * i] = int(r * 255 + 0.5)
+            self.rgb_tab[3 * i + 1] = int(g * 255 + 0.5)
+            self.rgb_tab[3 * i + 2] = int(b * 255 + 0.5)
+
+    # Index of the table entry nearest to hue (used at start, to convert constants)
+    def index(self, hue):
+        return int((hue - self.hue_lo) * (self.n - 1) / (self.hue_hi - self.hue_lo) + 0.5)
+
+    # Index difference of a hue difference
+    def steps(self, d_hue):
+        i = d_hue * (self.n - 1) / (self.hue_hi - self.hue_lo)
+        return int(i + 0.5) if i >= 0 else -int(-i + 0.5)
+
+    # Colour (r, g, b) of hue index i with saturation s and value v (0 ... 255)
+    def rgb(self, i, s, v):
+        if i < 0:
+            i = 0
+        elif i >= self.n:
+            i = self.n - 1
+        t = self.rgb_tab
+        k = 255 - s
+        return ((v * (255 * k + s * t[3 * i])) // 65025,      # truncated, like int() in from_hsv()
+                (v * (255 * k + s * t[3 * i + 1])) // 65025,
+                (v * (255 * k + s * t[3 * i + 2])) // 65025)
+
+
+def day_phase_table():
+    t = array('H', [0] * 1441)
+    for m in range(1441):
+        p = 1.0 - ((math.cos(m / 1440 * math.pi * 2) + 1) / 2)
+        t[m] = int(p * DAY_PHASE_ONE + 0.5)
+    return t
+
+
+# Percentage-to-midday (0 ... DAY_PHASE_ONE) at hour:minute:second
+def day_phase(table, hour, minute, second):
+    m = hour * 60 + minute
+    a = table[m]
+    return a + (table[m + 1] - a) * second // 60
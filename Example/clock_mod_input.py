@@ -0,0 +1,184 @@
+#
+# Belongs to clock_mod.py
+# Button input events.
+#
+# Each button is a Pin with an IRQ on both edges (the buttons are active low).
+# The IRQ handler only stores the edge, (time.ticks_us(), button, level), in a
+# preallocated ring buffer. poll(), called from the main loop, turns the edges into events:
+# - debounce: after an accepted edge, the edges of that button are ignored during
+#   'debounce_ms'; then the level of the pin is read once more, in case the last edge was lost;
+# - EV_PRESS / EV_RELEASE: a debounced change of a button;
+# - EV_REPEAT: while a button with set_repeat() is held, first after 'delay_ms', then every 'period_ms';
+# - EV_CHORD: a button pressed while the 'modifier' button is held (e.g. SLEEP + A);
+# - EV_TAP: the modifier button released without a chord made during the press.
+# The events go into a second ring buffer. get() returns the next one as
+# (kind << 8) | button, or -1 if there is none; 'ev_t' is then its time.ticks_us().
+# get() also keeps the latency of the events: the time from the edge to get().
+#
+import time
+from array import array
+
+EV_PRESS = 1
+EV_RELEASE = 2
+EV_REPEAT = 3
+EV_CHORD = 4
+EV_TAP = 5
+
+EV_NAMES = ('', 'press', 'release', 'repeat', 'chord', 'tap')
+
+
+class Input:
+    def __init__(self, machine, pin_ids, modifier=-1, debounce_ms=20, n_edges=32, n_events=16):
+        self.n_buttons = len(pin_ids)
+        self.modifier = modifier           # button index of the chord modifier, -1: none
+        self.debounce_us = debounce_ms * 1000
+        self.edges = array('i', [0] * (3 * n_edges))  # t, button, level
+        self.n_edges = n_edges
+        self.e_head = 0                    # written by the IRQ handler
+        self.e_tail = 0                    # read by poll()
+        self.events = array('i', [0] * (2 * n_events))  # t, code
+        self.n_events = n_events
+        self.v_head = 0
+        self.v_tail = 0
+        nb = self.n_buttons
+        self.down = bytearray(nb)          # debounced state, 1: pressed
+        self.locked = bytearray(nb)        # 1: within the debounce time of the last accepted edge
+        self.lock_t = array('i', [0] * nb)
+        self.rep_delay = array('i', [0] * nb)   # ms, 0: no auto-repeat
+        self.rep_period = array('i', [0] * nb)
+        self.rep_due = array('i', [0] * nb)
+        self.rep_on = bytearray(nb)        # 1: auto-repeat running
+        self.chorded = False               # a chord was made during the current modifier press
+        self.ev_t = 0
+        self.dropped = 0                   # edges or events lost because a ring buffer was full
+        self.n = 0                         # events handed out by get()
+        self.lat_sum = 0
+        self.lat_max = 0
+        self.pins = []
+        for i in range(nb):
+            p = machine.Pin(pin_ids[i], machine.Pin.IN, machine.Pin.PULL_UP)
+            p.irq(handler=lambda pin, i=i: self.irq(i, pin),
+                  trigger=machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING)
+            self.pins.append(p)
+            self.down[i] = 1 if p.value() == 0 else 0
+
+    def set_repeat(self, button, delay_ms, period_ms):
+        self.rep_delay[button] = delay_ms
+        self.rep_period[button] = period_ms
+
+    # IRQ handler: store the edge
+    def irq(self, button, pin):
+        h = self.e_head
+        nxt = (h + 1) % self.n_edges
+        if nxt == self.e_tail:
+            self.dropped += 1
+            return
+        self.edges[3 * h] = time.ticks_us()
+        self.edges[3 * h + 1] = button
+        self.edges[3 * h + 2] = pin.value()
+        self.e_head = nxt
+
+    def put(self, t, kind, button):
+        h = self.v_head
+        nxt = (h + 1) % self.n_events
+        if nxt == self.v_tail:
+            self.dropped += 1
+            return
+        self.events[2 * h] = t
+        self.events[2 * h + 1] = (kind << 8) | button
+        self.v_head = nxt
+
+    # A debounced change of button at time t
+    def change(self, button, pressed, t):
+        self.down[button] = pressed
+        self.locked[button] = 1
+        self.lock_t[button] = t
+        self.rep_on[button] = 0
+        if pressed:
+            if button == self.modifier:
+                self.chorded = False
+                self.put(t, EV_PRESS, button)
+            elif self.modifier >= 0 and self.down[self.modifier]:
+                self.chorded = True
+                self.put(t, EV_CHORD, button)
+                return  # no auto-repeat for chords
+            else:
+                self.put(t, EV_PRESS, button)
+            if self.rep_delay[button]:
+                self.rep_on[button] = 1
+                self.rep_due[button] = time.ticks_add(t, self.rep_delay[button] * 1000)
+        else:
+            self.put(t, EV_RELEASE, button)
+            if button == self.modifier and not self.chorded:
+                self.put(t, EV_TAP, button)
+
+    # Turn the stored edges into events. Returns the number of events waiting
+    def poll(self):
+        while self.e_tail != self.e_head:
+            k = 3 * self.e_tail
+            t = self.edges[k]
+            b = self.edges[k + 1]
+            pressed = 1 if self.edges[k + 2] == 0 else 0
+            self.e_tail = (self.e_tail + 1) % self.n_edges
+            if self.locked[b] and time.ticks_diff(t, self.lock_t[b]) < self.debounce_us:
+                continue  # bounce
+            self.locked[b] = 0
+            if pressed != self.down[b]:
+                self.change(b, pressed, t)
+        now = time.ticks_us()
+        for b in range(self.n_buttons):
+            if self.locked[b] and time.ticks_diff(now, self.lock_t[b]) >= self.debounce_us:
+                self.locked[b] = 0
+                pressed = 1 if self.pins[b].value() == 0 else 0
+                if pressed != self.down[b]:  # the last edge of a bounce was missed
+                    self.change(b, pressed, now)
+            if self.rep_on[b] and time.ticks_diff(now, self.rep_due[b]) >= 0:
+                self.put(self.rep_due[b], EV_REPEAT, b)
+                self.rep_due[b] = time.ticks_add(now, self.rep_period[b] * 1000)  # no bursts after a long pause
+        return (self.v_head - self.v_tail) % self.n_events
+
+    # Return the next event, (kind << 8) | button, or -1
+    def get(self):
+        if self.v_tail == self.v_head:
+            return -1
+        k = 2 * self.v_tail
+        self.ev_t = self.events[k]
+        code = self.events[k + 1]
+        self.v_tail = (self.v_tail + 1) % self.n_events
+        lat = time.ticks_diff(time.ticks_us(), self.ev_t)
+        self.n += 1
+        self.lat_sum += lat
+        if lat > self.lat_max:
+            self.lat_max = lat
+        return code
+
+    # True if edges are waiting for poll()
+    def pending(self):
+        return self.e_tail != self.e_head
+
+    # ms until poll() has work: 0 if edges are waiting, else the next end of a debounce
+    # time or auto-repeat; -1 if there is none
+    def due_ms(self):
+        if self.e_tail != self.e_head:
+            return 0
+        now = time.ticks_us()
+        d = None
+        for b in range(self.n_buttons):
+            if self.locked[b]:
+                t = self.debounce_us - time.ticks_diff(now, self.lock_t[b])
+                if d is None or t < d:
+                    d = t
+            if self.rep_on[b]:
+                t = time.ticks_diff(self.rep_due[b], now)
+                if d is None or t < d:
+                    d = t
+        if d is None:
+            return -1
+        return (d + 999) // 1000 if d > 0 else 0
+
+    def is_down(self, button):
+        return self.down[button] == 1
+
+    def stats(self):
+        avg = self.lat_sum // self.n if self.n else 0
+        return "input: {} events, latency avg {} us, max {} us, {} dropped".format(self.n, avg, self.lat_max, self.dropped)
@@ -0,0 +1,102 @@
+#
+# Belongs to clock_mod.py
+# Cached text layout.
+#
+# A Layout places the characters of a text in cells: the left column and the width of each.
+# - The advance of each character is asked once from advance(c) (the glyph width of a
+#   compiled font, or gr.measure_text(c) of a PicoGraphics font) and kept, until set_font().
+# - template(t) places the cells of a fixed text like "00:00:00" once, centred on the display.
+#   With 'tabular' every digit gets a cell as wide as the widest digit, so the cells don't
+#   move when the digits change; a narrower digit (the '1') is centred in its cell when drawn
+#   (see FrameBuffer.blit_cell()). cells(text) returns the template cells, the same tuples
+#   every time, for a text that fits the template: same length, the non-digits at the same places.
+#   Without 'tabular' no text fits the template.
+# - Other texts are placed from column x (centred if x is None), one cell per character as
+#   wide as its advance; the cells of the last such text are kept.
+# A text is a str or a bytes-like object (e.g. the clock text, changed in place): its
+# characters are then character codes.
+#
+DIGITS = '0123456789'
+
+
+def char(c):
+    return c if isinstance(c, str) else chr(c)
+
+
+class Layout:
+    def __init__(self, width, advance, spacing=0, tabular=False):
+        self.width = width         # display width
+        self.spacing = spacing     # columns between the cells
+        self.tabular = tabular
+        self.t_text = None         # the template
+        self.t_fixed = ()          # (index, char) of its non-digits
+        self.t_cells = None        # (xs, ws) of the template
+        self.set_font(advance)
+
+    # Use another font (advance(c): its width of character c). Forgets the cached
+    # advances and layouts, and places the template again
+    def set_font(self, advance):
+        self.advance = advance
+        self.adv = {}              # char -> advance
+        self.digit_w = 0           # advance of the widest digit, 0: not known yet
+        self.last = None           # (text, x, cells) of the last other text
+        if self.t_text is not None:
+            self.template(self.t_text)
+
+    def adv_of(self, c):
+        c = char(c)
+        a = self.adv.get(c)
+        if a is None:
+            a = self.advance(c)
+            self.adv[c] = a
+        return a
+
+    def cell_width(self, c):
+        c = char(c)
+        if self.tabular and c in DIGITS:
+            if not self.digit_w:
+                self.digit_w = max(self.adv_of(d) for d in DIGITS)
+            return self.digit_w
+        return self.adv_of(c)
+
+    # Width of text in columns, the spacing after each character included
+    def text_width(self, text):
+        w = 0
+        for c in text:
+            w += self.adv_of(c) + self.spacing
+        return w
+
+    def place(self, text, x, cell_width):
+        ws = tuple(cell_width(c) for c in text)
+        if x is None:
+            x = (self.width - sum(ws) - self.spacing * (len(ws) - 1)) // 2
+        xs = []
+        for w in ws:
+            xs.append(x)
+            x += w + self.spacing
+        return tuple(xs), ws
+
+    # Place the cells of template t, centred
+    def template(self, t):
+        self.t_text = t
+        self.t_fixed = tuple((i, c) for i, c in enumerate(t) if c not in DIGITS)
+        self.t_cells = self.place(t, None, self.cell_width)
+
+    def fits(self, text):
+        if not self.tabular or self.t_text is None or len(text) != len(self.t_text):
+            return False
+        for i, c in self.t_fixed:
+            if char(text[i]) != c:
+                return False
+        return True
+
+    # Return the cells (xs, ws) of text: the template cells if it fits, else placed from x
+    def cells(self, text, x=None):
+        if x is None and self.fits(text):
+            return self.t_cells
+        last = self.last
+        if last is not None and last[0] == text and last[1] == x:
+            return last[2]
+        c = self.place(text, x, self.adv_of)
+        self.last = (text if isinstance(text, str) else bytes(text), x, c)
+        return c
@@ -0,0 +1,123 @@
+#
+# Belongs to clock_mod.py
+# Scrolling messages.
+#
+# A message is rendered into an off-screen strip: a bytearray of 'height' rows of the width
+# of the message, at most max_cols, in the pixel format of the compositor (see clock_mod_fb.py),
+# filled with the background and drawn by draw(strip, width, x) (see clock_mod_outline.py).
+# A message wider than max_cols is rendered in chunks: when the window scrolls past the end
+# of the strip, the strip is rendered again from the left edge of the display (once every
+# max_cols - width columns), so the strip doesn't grow with the message.
+# A message that fits the display is centred and shown for 2 * hold_ms. A wider one is
+# shown from its start for hold_ms, then scrolls left at 'speed' columns per second until
+# its end is at the right edge, and stays there for hold_ms.
+# step(), called every pass of the main loop, copies the visible window of the strip into
+# the layer of the compositor when the position changed: 'height' slice copies, whatever
+# the length of the message. due_ms() is the time until the next column, for the scheduler.
+#
+import time
+
+
+class Marquee:
+    def __init__(self, fb, bg, speed=20, hold_ms=1000, max_cols=320):
+        self.fb = fb
+        self.bg = bg               # pen of the background
+        self.speed = speed         # columns per second
+        self.hold_ms = hold_ms
+        self.max_cols = max_cols   # longer messages are rendered in chunks of this width
+        self.strip = None
+        self.strip_mv = None
+        self.strip_w = 0
+        self.off = -1              # column of the message at the left of the strip, -1: not rendered
+        self.draw = None
+        self.msg_w = 0             # width of the message, at least the display width
+        self.x = 0                 # column of the message where the text starts
+        self.active = False
+        self.t0 = 0                # time.ticks_ms() of the start
+        self.total_ms = 0          # duration: hold, scroll, hold
+        self.pos = -1              # column of the strip at the left edge of the display
+        self.renders = 0           # messages rendered into the strip
+
+    # Render the columns off ... off + strip_w of the message into the strip
+    def render(self, off):
+        fb = self.fb
+        sw = self.msg_w
+        if sw > self.max_cols:
+            sw = self.max_cols
+        if off > self.msg_w - sw:
+            off = self.msg_w - sw
+        if self.strip is None or len(self.strip) != sw * fb.height * 4:
+            self.strip = bytearray(sw * fb.height * 4)
+            self.strip_mv = memoryview(self.strip)
+        self.strip_w = sw
+        self.off = off
+        row = fb.pen(self.bg) * sw
+        n = sw * 4
+        for y in range(fb.height):
+            self.strip[y * n:(y + 1) * n] = row
+        self.draw(self.strip, sw, self.x - off)
+        self.renders += 1
+
+    # Show text, 'cols' columns wide, drawn by draw(strip, strip_w, x) with its left column at x.
+    # keep: if a message is showing, replace it without starting again (e.g. a changing number)
+    def show(self, cols, draw, keep=False):
+        w = self.fb.width
+        self.draw = draw
+        self.msg_w = max(cols, w)
+        self.x = (w - cols) // 2 if cols < w else 0
+        self.off = -1  # rendered by step()
+        scroll_ms = (self.msg_w - w) * 1000 // self.speed
+        self.total_ms = 2 * self.hold_ms + scroll_ms
+        now = time.ticks_ms()
+        if keep and self.active:
+            left = self.total_ms - time.ticks_diff(now, self.t0)
+            if left < self.hold_ms:  # stay at the end for hold_ms more
+                self.t0 = time.ticks_add(now, self.hold_ms - self.total_ms)
+        else:
+            self.t0 = now
+        self.active = True
+        self.pos = -1
+        self.step()
+
+    def stop(self):
+        self.active = False
+        self.draw = None
+
+    def position(self, t):
+        dt = time.ticks_diff(t, self.t0) - self.hold_ms
+        if dt <= 0:
+            return 0
+        p = dt * self.speed // 1000
+        m = self.msg_w - self.fb.width
+        return p if p < m else m
+
+    # Show the window at the current position. Returns False when the message is over
+    def step(self):
+        if not self.active:
+            return False
+        t = time.ticks_ms()
+        if time.ticks_diff(t, self.t0) >= self.total_ms:
+            self.stop()
+            return False
+        p = self.position(t)
+        if p != self.pos:
+            self.pos = p
+            if self.off < 0 or p < self.off or p + self.fb.width > self.off + self.strip_w:
+                self.render(p)
+            self.fb.window(self.strip_mv, self.strip_w, p - self.off)
+        return True
+
+    # ms until step() has something to do, -1 if no message is showing
+    def due_ms(self):
+        if not self.active:
+            return -1
+        dt = time.ticks_diff(time.ticks_ms(), self.t0)
+        end = self.total_ms - dt
+        if self.position(time.ticks_add(self.t0, dt)) >= self.msg_w - self.fb.width:
+            return end if end > 0 else 0
+        if dt < self.hold_ms:
+            return self.hold_ms - dt
+        # the time of the next column
+        nxt = ((dt - self.hold_ms) * self.speed // 1000 + 1) * 1000
+        d = (nxt + self.speed - 1) // self.speed + self.hold_ms - dt
+        return d if d > 0 else 0
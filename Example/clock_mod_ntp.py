@@ -0,0 +1,203 @@
+#
+# Belongs to clock_mod.py
+# NTP client: several servers, non-blocking UDP, round-trip compensation, outliers rejected.
+#
+# ntptime.settime() asks one server, waits for the reply, drops the fraction of the second
+# and ignores the time the reply took: right after a sync the clock can be up to a second off.
+# NtpClient sends one request (SNTP version 4, client mode) to each server of 'hosts' at once,
+# from a non-blocking UDP socket; step() picks up the replies as they come in and returns at once.
+# A reply gives four timestamps: T1 request sent (local clock, echoed by the server), T2 request
+# received and T3 reply sent (server clock), T4 reply received (local clock), so
+#   offset = ((T2 - T1) + (T3 - T4)) / 2   the server clock minus the local clock
+#   delay  = (T4 - T1) - (T3 - T2)         the round trip, without the time spent in the server
+# and the error of the offset is at most delay / 2 (all of the delay on one way).
+# Replies are dropped when they don't answer a request of ours (originate timestamp), when the
+# server is not synchronized (leap indicator 3, stratum 0 (kiss-o'-death) or above 15) or when the
+# delay is above max_delay_ms. When every server answered, or after timeout_ms, the outliers are
+# rejected: the samples whose offset is more than outlier_ms + delay / 2 from the median offset.
+# The rest must be a majority (a single server is trusted); of those, the sample with the
+# smallest delay is the result: offset_ns and delay_ns. Else 'error' tells why there is none.
+# The local clock is now_ns() (time.time_ns(): the RTC; clock_mod.py gives EdgeClock.rtc_ns(),
+# the RTC to the us from the ticks, as time.time_ns() of the rp2 port only has whole seconds).
+# T4 is read when step() gets the reply, so step() should run every few ms while waiting()
+# (see poll_ms in clock_mod_sync.py).
+# The entries of 'hosts' are names or (name, port); they are resolved at the first start()
+# (a blocking DNS lookup), once.
+# set_rtc() sets the RTC with the fraction of the second, for the ports whose RTC keeps it. The
+# sync machine calls it at a second boundary of the NTP time, or, when the RTC only counts whole
+# seconds, at one of the RTC (see clock_mod_sync.py).
+#
+import time
+import struct
+
+NTP_PORT = 123
+NS = 1000000000
+# Seconds from 1900-01-01 (NTP) to the epoch of 'time' (1970, or 2000 on some MicroPython ports)
+NTP_DELTA = 2208988800 if time.gmtime(0)[0] == 1970 else 3155673600
+
+
+def to_ntp(ns):
+    return ((ns // NS + NTP_DELTA) << 32) | (((ns % NS) << 32) // NS)
+
+
+def from_ntp(secs, frac):
+    return (secs - NTP_DELTA) * NS + ((frac * NS) >> 32)
+
+
+# Set the RTC to ns (since the epoch of 'time'), as ntptime.settime() does, with the fraction
+def set_rtc(rtc, ns):
+    tm = time.gmtime(ns // NS)
+    rtc.datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], ns % NS // 1000))
+
+
+class NtpClient:
+    def __init__(self, socket, hosts, now_ns=time.time_ns, timeout_ms=1000, max_delay_ms=500,
+                 outlier_ms=100):
+        self.socket = socket
+        self.hosts = hosts
+        self.now_ns = now_ns
+        self.timeout_ns = timeout_ms * 1000000
+        self.max_delay_ns = max_delay_ms * 1000000
+        self.outlier_ns = outlier_ms * 1000000
+        self.addrs = None      # the resolved addresses of the hosts
+        self.sock = None       # open while waiting for the replies
+        self.buf = bytearray(48)
+        self.sent = {}         # NTP timestamp of the request (echoed by the reply) -> (host, T1)
+        self.samples = []      # (offset_ns, delay_ns, host) of the replies
+        self.t_start = 0
+        self.ok = False
+        self.offset_ns = 0
+        self.delay_ns = 0
+        self.host = -1         # the host of the result
+        self.error = None
+        self.replies = 0       # valid replies, last query
+        self.dropped = 0       # replies dropped, last query
+        self.rejected = 0      # outliers, last query
+
+    def resolve(self):
+        addrs = []
+        for h in self.hosts:
+            name, port = h if isinstance(h, tuple) else (h, NTP_PORT)
+            try:
+                addrs.append(self.socket.getaddrinfo(name, port)[0][-1])
+            except OSError as e:
+                print("NtpClient: {}: {}".format(name, e))
+                addrs.append(None)
+        self.addrs = addrs
+
+    # Send the requests. False if none could be sent ('error')
+    def start(self):
+        if self.addrs is None:
+            self.resolve()
+        self.close()
+        self.ok = False
+        self.error = None
+        self.sent = {}
+        self.samples = []
+        self.replies = self.dropped = self.rejected = 0
+        socket = self.socket
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.setblocking(False)
+        self.sock = s
+        buf = self.buf
+        self.t_start = self.now_ns()
+        for i, addr in enumerate(self.addrs):
+            if addr is None:
+                continue
+            for j in range(48):
+                buf[j] = 0
+            buf[0] = 0x23  # leap indicator 0, version 4, mode 3 (client)
+            t1 = self.now_ns()
+            ts = (to_ntp(t1) & ~0xff) | i  # the host in the lowest bits: each request its own timestamp
+            struct.pack_into("!Q", buf, 40, ts)  # transmit timestamp
+            try:
+                s.sendto(buf, addr)
+            except OSError as e:
+                self.error = e
+                continue
+            self.sent[ts] = (i, t1)
+        if not self.sent:
+            if self.error is None:
+                self.error = "no server"
+            self.close()
+            return False
+        return True
+
+    def waiting(self):
+        return self.sock is not None
+
+    # Take the replies that came in; True while waiting for more
+    def step(self):
+        s = self.sock
+        if s is None:
+            return False
+        while self.sent:
+            try:
+                data = s.recv(48)
+            except OSError:
+                break  # nothing (EAGAIN), or an ICMP error of a server
+            self.reply(data, self.now_ns())
+        if self.sent and self.now_ns() - self.t_start < self.timeout_ns:
+            return True
+        self.close()
+        self.select()
+        return False
+
+    def reply(self, data, t4):
+        if len(data) < 48:
+            self.dropped += 1
+            return
+        # flags, stratum, poll, precision, root delay, dispersion, ref. id, ref. time, T1, T2, T3
+        lvm, stratum, _, _, _, _, _, _, orig, t2s, t2f, t3s, t3f = \
+            struct.unpack_from("!BBBbIIIQQIIII", data)
+        r = self.sent.pop(orig, None) if lvm & 7 == 4 else None  # mode 4: server
+        if r is None or lvm >> 6 == 3 or not 1 <= stratum <= 15:
+            self.dropped += 1
+            return
+        i, t1 = r
+        t2 = from_ntp(t2s, t2f)
+        t3 = from_ntp(t3s, t3f)
+        delay = (t4 - t1) - (t3 - t2)
+        if delay < 0:
+            delay = 0  # rounding of the timestamps
+        if delay > self.max_delay_ns:
+            self.dropped += 1
+            return
+        self.replies += 1
+        self.samples.append(((t2 - t1 + t3 - t4) // 2, delay, i))
+
+    # The result from the samples: the best of the majority that agree
+    def select(self):
+        sm = self.samples
+        if not sm:
+            self.error = "no reply"
+            return
+        offs = sorted(x[0] for x in sm)
+        n = len(offs)
+        med = (offs[(n - 1) // 2] + offs[n // 2]) // 2
+        good = [x for x in sm if abs(x[0] - med) <= self.outlier_ns + x[1] // 2]
+        self.rejected = n - len(good)
+        if n > 1 and 2 * len(good) <= n:
+            self.error = "the servers don't agree"
+            return
+        best = good[0]
+        for x in good:
+            if x[1] < best[1]:
+                best = x
+        self.offset_ns, self.delay_ns, self.host = best
+        self.ok = True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def stats(self):
+        s = "ntp: {} of {} servers replied, {} dropped, {} rejected".format(
+            self.replies, len(self.addrs or ()), self.dropped, self.rejected)
+        if self.ok:
+            s += ", offset {:+.3f} ms, delay {:.3f} ms (server {})".format(
+                self.offset_ns / 1e6, self.delay_ns / 1e6, self.host)
+        elif self.error is not None:
+            s += ", {}".format(self.error)
+        return s
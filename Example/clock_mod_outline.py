@@ -0,0 +1,141 @@
+#
+# Belongs to clock_mod.py
+# Outlined text from cached glyph masks.
+#
+# The outlined text of the classic clock and of the messages was drawn with nine gr.text()
+# calls: eight times in the outline pen at the eight neighbouring offsets, then once in the
+# text pen. Here each character is drawn once with gr.text() into the framebuffer of gr
+# and read back as a mask (one bitmask per row), the first time it is used. Its outline is
+# the mask dilated by one pixel in every direction (the union of the eight offsets) minus
+# the mask itself. Both are kept as spans per row: (dx, n), relative to the character.
+# draw() paints a whole text into a buffer in the layer format (see clock_mod_fb.py):
+# first the outline spans of all characters, then the text spans of all characters,
+# in the order of the nine gr.text() calls, so the result is the same pixel for pixel.
+# The pixels outside the outline are not touched: the background shows through.
+# The mask of a character is read with the font set on gr (gr.set_font()) at that time.
+# A text is a str or a bytes-like object of character codes.
+#
+class Outline:
+    def __init__(self, gr, width, height):
+        self.gr = gr
+        self.gr_buf = memoryview(gr)
+        self.width = width
+        self.height = height
+        self.on = gr.create_pen(255, 255, 255)
+        self.off = gr.create_pen(0, 0, 0)
+        self.glyphs = {}   # char -> (advance, top, rows): rows of (outline spans, text spans) from row top
+        self.pen_rows = {}  # pen bytes -> (the pen repeated n times for n = 0 ... the widest span)
+        self.span_max = 0
+        self.reads = 0     # characters read from gr
+
+    # Read the mask of c from gr: one bitmask per row, bit x for column x
+    def read_mask(self, c):
+        gr = self.gr
+        adv = gr.measure_text(c, 1)
+        w = min(adv + 1, self.width)
+        gr.set_pen(self.off)
+        gr.rectangle(0, 0, w, self.height)
+        gr.set_pen(self.on)
+        gr.text(c, 0, 0, -1, 1)
+        buf = self.gr_buf
+        s = self.width * 4
+        mask = []
+        for y in range(self.height):
+            m = 0
+            o = y * s
+            for x in range(w):
+                i = o + x * 4
+                if buf[i] | buf[i + 1] | buf[i + 2]:
+                    m |= 1 << x
+            mask.append(m)
+        while mask and not mask[-1]:
+            mask.pop()
+        self.reads += 1
+        return adv, mask
+
+    @staticmethod
+    def spans(m):
+        # bit 0 is column -1
+        r = []
+        x = 0
+        while m:
+            if m & 1:
+                n = 0
+                while m & 1:
+                    m >>= 1
+                    n += 1
+                r.append((x - 1, n))
+                x += n
+            else:
+                m >>= 1
+                x += 1
+        return tuple(r)
+
+    def glyph(self, c):
+        if not isinstance(c, str):
+            c = chr(c)
+        g = self.glyphs.get(c)
+        if g is None:
+            adv, mask = self.read_mask(c)
+            rows = []
+            # rows -1 ... len(mask), the masks shifted left by one: bit 0 is column -1
+            for y in range(-1, len(mask) + 1):
+                fg = mask[y] << 1 if 0 <= y < len(mask) else 0
+                d = 0
+                for yy in (y - 1, y, y + 1):
+                    if 0 <= yy < len(mask):
+                        m = mask[yy] << 1
+                        d |= m | (m << 1) | (m >> 1)
+                ol = self.spans(d & ~fg)
+                tx = self.spans(fg)
+                for x, n in ol + tx:
+                    if n > self.span_max:
+                        self.span_max = n
+                        self.pen_rows = {}
+                rows.append((ol, tx))
+            g = (adv, -1, tuple(rows))
+            self.glyphs[c] = g
+        return g
+
+    # Width of text in columns, as gr.measure_text(text, 1)
+    def text_width(self, text):
+        w = 0
+        for c in text:
+            w += self.glyph(c)[0]
+        return w
+
+    def pen_row(self, pen_b):
+        r = self.pen_rows.get(pen_b)
+        if r is None:
+            if len(self.pen_rows) >= 8:
+                self.pen_rows = {}
+            r = tuple(pen_b * n for n in range(self.span_max + 1))
+            self.pen_rows[pen_b] = r
+        return r
+
+    # Draw text with its top-left at x, y into buf: rows of bw pixels, 4 bytes per pixel.
+    # fg_b, ol_b: the 4 bytes of the text pen and of the outline pen (see clock_mod_fb.pen_bytes())
+    def draw(self, buf, bw, text, x, y, fg_b, ol_b):
+        bh = len(buf) // (bw * 4)
+        for c in text:
+            self.glyph(c)  # all masks read before the pen rows are made
+        for k in (0, 1):
+            row = self.pen_row(fg_b if k else ol_b)
+            gx = x
+            for c in text:
+                g = self.glyphs[c if isinstance(c, str) else chr(c)]
+                yy = y + g[1]
+                for r in g[2]:
+                    if 0 <= yy < bh:
+                        o = yy * bw * 4
+                        for dx, n in r[k]:
+                            a = gx + dx
+                            b = a + n
+                            if a < 0:
+                                a = 0
+                            if b > bw:
+                                b = bw
+                            if b > a:
+                                buf[o + a * 4:o + b * 4] = row[b - a]
+                    yy += 1
+                gx += g[0]
@@ -0,0 +1,43 @@
+#
+# Belongs to clock_mod.py
+# Pen/palette manager.
+#
+# gr.create_pen() is called once per RGB triple; the pens are kept
+# in a dictionary keyed by the packed 0xRRGGBB value.
+# The colours of clr_dict are created at start and handed out by colour index.
+# 'hits' and 'misses' count the RGB lookups that were served from the cache
+# and the ones that needed a gr.create_pen(); the lookups by colour index are not counted.
+# To bound the RAM used, the RGB cache is emptied when it holds 'max_entries' pens
+# (the indexed colours stay available).
+#
+class Palette:
+    def __init__(self, gr, clr_dict, max_entries=64):
+        self.gr = gr
+        self.max_entries = max_entries
+        self.rgb_pens = {}
+        self.idx_pens = {}
+        self.hits = 0
+        self.misses = 0
+        for idx, rgb in clr_dict.items():
+            self.idx_pens[idx] = self.rgb(rgb[0], rgb[1], rgb[2])
+
+    # Return the pen for an RGB triple
+    def rgb(self, r, g, b):
+        key = (r << 16) | (g << 8) | b
+        pen = self.rgb_pens.get(key)
+        if pen is None:
+            self.misses += 1
+            if len(self.rgb_pens) >= self.max_entries:
+                self.rgb_pens = {}
+            pen = self.gr.create_pen(r, g, b)
+            self.rgb_pens[key] = pen
+        else:
+            self.hits += 1
+        return pen
+
+    # Return the pen for a colour index of clr_dict
+    def pen(self, idx):
+        return self.idx_pens[idx]
+
+    def stats(self):
+        return "pens: {} cached, RGB lookups: {} hits, {} misses".format(len(self.rgb_pens), self.hits, self.misses)
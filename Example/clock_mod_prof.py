@@ -0,0 +1,55 @@
+#
+# Belongs to clock_mod.py
+# Per-stage timing of the main loop.
+#
+# For each stage (button polling, redraw, background, ...) the durations in microseconds
+# (time.ticks_us()) of the last 'n_samples' passes are kept in a ring buffer. All buffers
+# are in one array, allocated once; add() does not allocate memory.
+# Usage in the hot path, with 'prof' None when profiling is off:
+#   if prof: t0 = time.ticks_us()
+#   ... stage ...
+#   if prof: prof.add(STAGE, t0)
+# so the cost when off is a test of a global variable.
+#
+import time
+from array import array
+
+
+class Profiler:
+    def __init__(self, names, n_samples=128):
+        self.names = names
+        self.n = n_samples
+        self.buf = array('i', [0] * (n_samples * len(names)))
+        self.count = [0] * len(names)  # samples added per stage
+
+    # Add the time since t0 (a time.ticks_us() value) to the samples of stage
+    def add(self, stage, t0):
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        i = self.count[stage]
+        self.buf[stage * self.n + i % self.n] = dt
+        self.count[stage] = i + 1
+
+    def clear(self):
+        for i in range(len(self.count)):
+            self.count[i] = 0
+
+    # Return (n, min, avg, p99, max) in us of the samples in the buffer of stage.
+    # n is 0 if there are none.
+    def stats(self, stage):
+        n = min(self.count[stage], self.n)
+        if n == 0:
+            return 0, 0, 0, 0, 0
+        s = sorted(self.buf[stage * self.n:stage * self.n + n])
+        return n, s[0], sum(s) // n, s[(n * 99 + 99) // 100 - 1], s[-1]
+
+    # Return the lines of a table with the stats of all stages
+    def table(self):
+        ln = "+------------+------+---------+---------+---------+---------+"
+        lines = [ln,
+                 "| stage      |  n   |  min us |  avg us |  p99 us |  max us |",
+                 ln]
+        for i in range(len(self.names)):
+            n, mn, avg, p99, mx = self.stats(i)
+            lines.append("| {:10s} | {:4d} | {:7d} | {:7d} | {:7d} | {:7d} |".format(self.names[i], n, mn, avg, p99, mx))
+        lines.append(ln)
+        return lines
@@ -0,0 +1,100 @@
+#
+# Belongs to clock_mod.py
+# Render worker on the second core of the RP2040.
+#
+# With the worker, the display is drawn by a thread started with _thread (on the Pico W it
+# runs on core 1), while the main loop (core 0) handles the buttons, the NTP sync, the sound
+# and the REPL output. A blocking NTP query or a slow print on core 0 no longer delays the
+# next second on the display.
+# The frame is double buffered:
+# - the back buffer is the layer of the compositor (clock_mod_fb.py). Whoever changes it
+#   holds 'lock': the worker when it renders the clock, core 0 when it shows a message, moves
+#   the marquee or blinks the status LED (see frame_lock in clock_mod.py);
+# - the front buffer is the frame the worker shows. Under the lock it copies the layer (and
+#   the status LED overlay) into it, if it changed; it copies it into gr and calls gu.update()
+#   after releasing the lock, so core 0 can change the layer meanwhile.
+# The worker wakes at next_ms() (e.g. just after the next second, from the edge of the seconds
+# that core 0 keeps, see clock_mod_edge.py) or, within slice_ms, when
+# core 0 calls request() after it changed the layer (the locks of _thread have no timeout, so
+# it sleeps in slices). Only the worker uses gr; the masks of the outlined text are read
+# from gr before it starts (see clock_mod_outline.py).
+# With a Profiler 'prof' (see clock_mod_prof.py) the frames the worker shows (fb.show()) are
+# timed as stage prof_stage.
+# NoLock stands in for the lock when the main loop renders itself.
+#
+import time
+
+
+class NoLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RenderWorker:
+    # render(): compose the frame in fb; next_ms(): ms to the next frame (both called with the lock held)
+    def __init__(self, thread, fb, gu, render, next_ms, slice_ms=20, prof=None, prof_stage=0):
+        self.thread = thread
+        self.fb = fb
+        self.gu = gu
+        self.render = render
+        self.next_ms = next_ms
+        self.slice_ms = slice_ms
+        self.prof = prof
+        self.prof_stage = prof_stage
+        self.lock = thread.allocate_lock()
+        self.front = bytearray(len(fb.layer))
+        self.front_led = None
+        self.requested = False
+        self.running = False
+        self.passes = 0        # passes of the worker
+        self.frames = 0        # frames shown
+        self.requests = 0      # request() calls
+
+    def start(self):
+        self.running = True
+        self.thread.start_new_thread(self.run, ())
+
+    def stop(self):
+        self.running = False
+
+    # The layer changed: show it within slice_ms
+    def request(self):
+        self.requests += 1
+        self.requested = True
+
+    # Copy the layer into the front buffer if it changed. Call with the lock held
+    def take(self):
+        fb = self.fb
+        if not fb.dirty:
+            return False
+        self.front[:] = fb.layer
+        self.front_led = fb.led
+        fb.dirty = False
+        return True
+
+    def run(self):
+        prof = self.prof
+        while self.running:
+            self.requested = False
+            self.passes += 1
+            with self.lock:
+                self.render()
+                new = self.take()
+                ms = self.next_ms()  # core 0 moves the edge of the seconds under the lock
+            if new:
+                if prof: t0 = time.ticks_us()
+                self.fb.show(self.gu, self.front, self.front_led)
+                if prof: prof.add(self.prof_stage, t0)
+                self.frames += 1
+            end = time.ticks_add(time.ticks_ms(), ms)
+            while not self.requested:
+                left = time.ticks_diff(end, time.ticks_ms())
+                if left <= 0:
+                    break
+                time.sleep_ms(left if left < self.slice_ms else self.slice_ms)
+
+    def stats(self):
+        return "render: {} passes, {} frames, {} requests".format(self.passes, self.frames, self.requests)
@@ -0,0 +1,84 @@
+#
+# Belongs to clock_mod.py
+# Deadline scheduler of the main loop.
+#
+# Instead of a fixed time.sleep(0.01) per pass, the main loop tells the scheduler
+# the deadlines of its jobs with due(ms) (ms from now) or due_at(ticks_ms): the next
+# second of the clock, the next NTP sync step, blink or tone phase, the end of the debounce
+# time or the next auto-repeat of a button. sleep() then sleeps until the earliest one
+# (at most max_ms), or until wake() returns True (e.g. a button edge was queued):
+# - lightsleep: one machine.lightsleep(ms); the CPU wakes at the deadline or on an IRQ;
+# - otherwise: time.sleep_ms() in slices of at most slice_ms, stopping early when wake() is True.
+#   A pin IRQ doesn't end time.sleep_ms(), so the CPU wakes every slice_ms to look for button
+#   edges (about 50 times a second with 20 ms): only lightsleep sleeps to the deadline.
+# Before it sleeps it calls idle(ms), if set, with the time until the deadline: work that can
+# wait for a quiet moment (e.g. gc.collect(), see clock_mod_heap.py) is done there.
+# It counts the passes of the main loop, the wakeups (the ends of the sleeps: one per slice, or
+# per lightsleep) and the time spent awake. See stats().
+#
+import time
+
+
+class Scheduler:
+    def __init__(self, machine, wake, lightsleep=False, max_ms=1000, slice_ms=20):
+        self.lightsleep = machine.lightsleep if lightsleep and hasattr(machine, 'lightsleep') else None
+        self.wake = wake
+        self.max_ms = max_ms
+        self.slice_ms = slice_ms
+        self.next_ms = max_ms   # earliest deadline of this pass, ms from now
+        self.idle = None        # idle(ms): called before a sleep of ms
+        self.passes = 0
+        self.wakeups = 0
+        self.awake_us = 0
+        self.t_wake = time.ticks_us()  # end of the last sleep
+        self.t_stats = time.ticks_ms()  # start of the stats period (ms: ticks_diff() of ticks_us
+                                        # only holds for 8.9 minutes, of ticks_ms for 6 days)
+
+    # A job is due in ms (0: at once)
+    def due(self, ms):
+        if ms < self.next_ms:
+            self.next_ms = ms if ms > 0 else 0
+
+    # A job is due at time.ticks_ms() t
+    def due_at(self, t):
+        self.due(time.ticks_diff(t, time.ticks_ms()))
+
+    # Sleep until the earliest deadline, or until wake() is True
+    def sleep(self):
+        ms = self.next_ms
+        self.next_ms = self.max_ms
+        end = time.ticks_add(time.ticks_ms(), ms)
+        if ms > 0 and self.idle:
+            self.idle(ms)
+            ms = time.ticks_diff(end, time.ticks_ms())
+        self.awake_us += time.ticks_diff(time.ticks_us(), self.t_wake)
+        if ms > 0 and not self.wake():
+            if self.lightsleep:
+                self.wakeups += 1
+                self.lightsleep(ms)
+            else:
+                while True:
+                    left = time.ticks_diff(end, time.ticks_ms())
+                    if left <= 0:
+                        break
+                    self.wakeups += 1
+                    time.sleep_ms(left if left < self.slice_ms else self.slice_ms)
+                    if self.wake():
+                        break
+        self.passes += 1
+        self.t_wake = time.ticks_us()
+
+    # Wakeups and passes per minute and the awake duty cycle since the previous call
+    def stats(self):
+        t = time.ticks_ms()
+        dt = time.ticks_diff(t, self.t_stats)
+        if dt <= 0:
+            return "sched: -"
+        s = "sched: {} wakeups/min, {} passes/min, awake {}.{} %".format(
+            self.wakeups * 60000 // dt, self.passes * 60000 // dt,
+            self.awake_us // (dt * 10), self.awake_us // dt % 10)
+        self.passes = 0
+        self.wakeups = 0
+        self.awake_us = 0
+        self.t_stats = t
+        return s
@@ -0,0 +1,212 @@
+#
+# Belongs to clock_mod.py
+# Non-blocking NTP sync.
+#
+# SyncMachine does what sync_time() used to do in one blocking call
+# (connect -> wait for the connection -> query NTP -> disconnect) as a state machine.
+# start() arms it; step() advances it by at most one state and returns at once,
+# so the main loop can keep redrawing the display every second during a sync.
+# The WiFi link is handled by a WlanManager (see clock_mod_wlan.py), which decides whether
+# the link is kept up or taken down after the sync, and backs off after failures.
+# A sync that failed because the link could not be brought up is retried
+# as soon as the back-off of the WlanManager has passed.
+# What happens is reported through the callback on_event(event, arg). See the SYNC_* events.
+# With an NtpClient 'ntp' (see clock_mod_ntp.py) the query doesn't block either: QUERY sends
+# the requests to its servers, NTP_WAIT picks up the replies (every poll_ms), and SET waits for
+# the next second boundary of the NTP time to set 'rtc', so the RTC starts its seconds in phase
+# with NTP. Without one, QUERY calls ntptime.settime() (one server, whole seconds, blocking).
+# With an EdgeClock 'edge' (see clock_mod_edge.py; its rtc_ns() is the clock of the NtpClient)
+# QUERY waits until edge.aligned() (at most ready_ms), so the timestamps are right to the
+# width of its interval. When the RTC only counts whole seconds (the rp2 port: the fraction
+# written is dropped, the RTC keeps the phase of its seconds), SET waits for the next second
+# of the RTC instead and sets the offset rounded to whole seconds; what is left, phase_ms, is
+# for the drift model (see clock_mod_drift.py).
+# due_ms() is the time until step() has work, for the scheduler.
+#
+import time
+from clock_mod_wlan import LINK_UP, LINK_BACKOFF, LINK_DISCONNECTING
+from clock_mod_ntp import set_rtc, NS
+
+# States
+IDLE = 0
+CONNECT = 1
+WAIT = 2
+QUERY = 3
+DISCONNECT = 4
+WAIT_OFF = 5
+NTP_WAIT = 6
+SET = 7
+
+# Events passed to on_event()
+SYNC_WAITING = 0       # waiting for the WiFi connection
+SYNC_CONNECTED = 1     # WiFi connected
+SYNC_TIMEOUT = 2       # no WiFi connection (failed or not within max_wait_ms)
+SYNC_SYNCED = 3        # built-in RTC set from NTP. arg: the offset NTP time - RTC time, in ms
+SYNC_ERROR = 4         # NTP query failed. arg: the OSError (or why the NtpClient has no time)
+SYNC_OFF_TIMEOUT = 5   # WiFi still connected after max_off_steps steps. arg: number of steps
+SYNC_DONE = 6          # sync finished. arg: True if the RTC was set
+SYNC_BACKOFF = 7       # WiFi in back-off, sync postponed. arg: ms left
+
+
+class SyncMachine:
+    def __init__(self, wlan_mgr, ntptime, host, on_event, ntp=None, rtc=None, step_ms=50, poll_ms=2,
+                 edge=None, ready_ms=10000):
+        self.wlan_mgr = wlan_mgr
+        self.ntptime = ntptime
+        self.host = host
+        self.on_event = on_event
+        self.ntp = ntp
+        self.rtc = rtc
+        self.step_ms = step_ms
+        self.poll_ms = poll_ms     # while waiting for the NTP replies
+        self.edge = edge
+        self.ready_ms = ready_ms
+        self.t_query = 0           # time.ticks_ms() when QUERY started
+        self.set_ns = 0            # local time (ntp.now_ns()) at which SET sets the RTC
+        self.whole = False         # SET sets whole seconds at the second of the RTC
+        self.state = IDLE
+        self.synced = False
+        self.retry = False     # a sync failed for lack of WiFi; retry when the back-off is over
+        self.offset_ms = 0
+        self.phase_ms = 0          # NTP time - RTC time after the sync (whole seconds set)
+
+    # Arm the state machine. Returns False if a sync is already running
+    def start(self):
+        if self.state != IDLE:
+            return False
+        self.synced = False
+        self.retry = False
+        self.state = CONNECT
+        return True
+
+    def busy(self):
+        return self.state != IDLE
+
+    # ms until step() has work, -1 if idle
+    def due_ms(self):
+        st = self.state
+        if st == IDLE:
+            return -1
+        if st == NTP_WAIT:
+            return self.poll_ms
+        if st == SET:
+            return max(0, -((self.ntp.now_ns() - self.set_ns) // 1000000))  # rounded up
+        return self.step_ms
+
+    def connected(self):
+        self.state = QUERY
+        self.t_query = time.ticks_ms()
+        self.on_event(SYNC_CONNECTED, None)
+
+    # The clock of the NtpClient is right to the us (or it is waited for too long)
+    def ready(self):
+        edge = self.edge
+        return (edge is None or edge.aligned()
+                or time.ticks_diff(time.ticks_ms(), self.t_query) >= self.ready_ms)
+
+    def done(self):
+        self.state = IDLE
+        self.on_event(SYNC_DONE, self.synced)
+        return False
+
+    # Advance one state. Returns True while the sync is running
+    def step(self):
+        mgr = self.wlan_mgr
+        st = self.state
+        if st == IDLE:
+            if not self.retry or mgr.backoff_left() > 0:
+                if mgr.state != LINK_BACKOFF:
+                    mgr.step()  # POLICY_PERSISTENT: watch the link
+                return False
+            self.start()
+            st = CONNECT
+        if st == CONNECT:
+            link = mgr.request()
+            if link == LINK_BACKOFF:
+                self.retry = True
+                self.state = IDLE
+                self.on_event(SYNC_BACKOFF, mgr.backoff_left())
+                return False
+            if link == LINK_UP:
+                self.connected()
+            else:
+                self.state = WAIT
+                self.on_event(SYNC_WAITING, None)
+        elif st == WAIT:
+            link = mgr.step()
+            if link == LINK_UP:
+                self.connected()
+            elif link == LINK_BACKOFF:
+                self.retry = True
+                self.on_event(SYNC_TIMEOUT, None)
+                return self.done()
+        elif st == QUERY and self.ntp:
+            if not self.ready():
+                return True
+            if self.ntp.start():
+                self.state = NTP_WAIT
+            else:
+                self.state = DISCONNECT
+                self.on_event(SYNC_ERROR, self.ntp.error)
+        elif st == NTP_WAIT:
+            ntp = self.ntp
+            if ntp.step():
+                return True
+            if ntp.ok:
+                now = ntp.now_ns()
+                edge = self.edge
+                self.whole = edge is not None and edge.known() and not edge.fine
+                if self.whole:
+                    self.set_ns = now + NS - now % NS  # the next second of the RTC
+                else:
+                    self.set_ns = now + NS - (now + ntp.offset_ns) % NS  # of the NTP time
+                self.state = SET
+            else:
+                self.state = DISCONNECT
+                self.on_event(SYNC_ERROR, ntp.error)
+        elif st == SET:
+            ntp = self.ntp
+            now = ntp.now_ns()
+            if now < self.set_ns:
+                return True
+            off = ntp.offset_ns
+            if self.whole:
+                if now % NS >= NS // 2:
+                    self.set_ns = now + NS - now % NS  # woken late: the RTC second may end first
+                    return True
+                n = (off + NS // 2) // NS
+                set_rtc(self.rtc, now - now % NS + n * NS)
+                self.phase_ms = (off - n * NS + 500000) // 1000000
+            else:
+                set_rtc(self.rtc, now + off)
+                self.phase_ms = 0
+            self.offset_ms = (off + 500000) // 1000000
+            self.synced = True
+            self.state = DISCONNECT
+            self.on_event(SYNC_SYNCED, self.offset_ms)
+        elif st == QUERY:
+            self.state = DISCONNECT
+            try:
+                self.ntptime.host = self.host
+                t0 = time.time_ns()
+                k0 = time.ticks_ms()
+                self.ntptime.settime()
+                k1 = time.ticks_ms()
+                t1 = time.time_ns()
+                # RTC jump minus the duration of the query
+                self.offset_ms = (t1 - t0) // 1000000 - time.ticks_diff(k1, k0)
+                self.phase_ms = 0
+                self.synced = True
+                self.on_event(SYNC_SYNCED, self.offset_ms)
+            except OSError as e:
+                self.on_event(SYNC_ERROR, e)
+        elif st == DISCONNECT:
+            mgr.release()
+            self.state = WAIT_OFF
+        elif st == WAIT_OFF:
+            if mgr.step() == LINK_DISCONNECTING:
+                return True
+            if mgr.off_timeout:
+                self.on_event(SYNC_OFF_TIMEOUT, mgr.off_timeout)
+            return self.done()
+        return True
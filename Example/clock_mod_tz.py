@@ -0,0 +1,123 @@
+#
+# Belongs to clock_mod.py
+# Time zone: the UTC offset from a table of its changes (summer time).
+#
+# The local time used to be the RTC (UTC) plus TZ_OFFSET whole hours: the clock never changed
+# to summer time and a zone like UTC+5:30 could not be set. tools/tz_compile.py compiles the
+# rule of a time zone (a POSIX TZ string like "WET0WEST,M3.5.0/1,M10.5.0", the last line of
+# the zone files of the tz database) into a table of its changes for a number of years, to be
+# copied to the Pico W next to clock_mod.py (or into /lib). The format, little-endian:
+#   header (36 bytes): magic b'GUZ1', number of changes, first year, last year, 0 (2 bytes
+#           each), UTC offsets of the standard time and of the summer time (s, signed, 4 bytes
+#           each), their names (8 bytes each, ASCII, padded with zeros)
+#   changes (8 bytes each, in time order): the UTC of the change (s since 1970, unsigned),
+#           the UTC offset from then on (s, signed)
+# TimeZone keeps the changes in two arrays and the interval of the last lookup: offset(t) is
+# one comparison while t stays in it (a whole season), else a binary search (find()).
+# Before the first change the offset is the other one of the two; after the last change (the
+# end of the table) it stays. Without a table (the file is not found) the offset is fixed.
+# A table file is looked up in the directories of sys.path, like a module.
+# The times of a TimeZone are counted from 'base' (clock_mod.py passes BASE, see below).
+#
+import struct
+import time
+from array import array
+from clock_mod_font import find_file
+
+MAGIC = b'GUZ1'
+HDR = '<4sHHHHii8s8s'
+HDR_SIZE = 36
+ENTRY = '<Ii'
+ENTRY_SIZE = 8
+# Seconds from 1970-01-01 to the epoch of 'time' (1970, or 2000 on some MicroPython ports)
+EPOCH_DELTA = 0 if time.gmtime(0)[0] == 1970 else 946684800
+# 2020-01-01 00:00 UTC in the seconds of 'time'. The seconds since 1970 don't fit in a small
+# integer of MicroPython (31 bits): each one is a long integer on the heap. clock_mod.py counts
+# its seconds from BASE instead (small integers up to 2054); a whole number of days, so the
+# seconds of the day and the hours come out the same.
+BASE = 1577836800 - EPOCH_DELTA
+END = 1 << 40  # after any time
+
+
+# +hh:mm of a UTC offset in s
+def hm(off):
+    s = '-' if off < 0 else '+'
+    off = abs(off)
+    return "{}{:02d}:{:02d}".format(s, off // 3600, off // 60 % 60)
+
+
+class TimeZone:
+    # offset: the UTC offset (s) if there is no table file 'name'; base: the times are counted from it
+    def __init__(self, offset=0, name=None, base=0):
+        self.base = base
+        self.times = array('l')  # UTC of the changes (s since base)
+        self.offs = array('l')   # the offset from each change on
+        self.std_off = self.dst_off = self.first = offset
+        self.std_name = self.dst_name = ''
+        self.years = None        # first, last year of the table
+        self.path = None
+        self.off = offset        # offset in [start, end)
+        self.start = 0
+        self.end = END
+        self.finds = 0           # binary searches
+        if name:
+            try:
+                self.path = find_file(name)
+            except OSError:
+                return
+            self.load(self.path)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            hdr = f.read(HDR_SIZE)
+            if len(hdr) != HDR_SIZE or hdr[:4] != MAGIC:
+                raise ValueError("{} is not a time zone table".format(path))
+            _, n, y0, y1, _, self.std_off, self.dst_off, sn, dn = struct.unpack(HDR, hdr)
+            data = f.read(n * ENTRY_SIZE)
+        for i in range(n):
+            t, off = struct.unpack_from(ENTRY, data, i * ENTRY_SIZE)
+            self.times.append(t - EPOCH_DELTA - self.base)
+            self.offs.append(off)
+        self.std_name = sn.split(b'\0')[0].decode()
+        self.dst_name = dn.split(b'\0')[0].decode()
+        self.years = (y0, y1)
+        self.first = self.dst_off if n and self.offs[0] == self.std_off else self.std_off
+        self.start = self.end = 0  # the next offset() looks it up
+
+    # The UTC offset (s) at UTC t (s since base)
+    def offset(self, t):
+        if self.start <= t < self.end:
+            return self.off
+        return self.find(t)
+
+    # Look up the interval between two changes of UTC t
+    def find(self, t):
+        times = self.times
+        lo = 0
+        hi = len(times)
+        while lo < hi:  # the number of changes up to t
+            mid = (lo + hi) // 2
+            if times[mid] <= t:
+                lo = mid + 1
+            else:
+                hi = mid
+        self.start = times[lo - 1] if lo else 0
+        self.end = times[lo] if lo < len(times) else END
+        self.off = self.offs[lo - 1] if lo else self.first
+        self.finds += 1
+        return self.off
+
+    # The UTC of local time t (in the hour skipped or repeated at a change: with either offset)
+    def utc(self, t):
+        return t - self.offset(t - self.offset(t - self.off))
+
+    # The name of the time at the last lookup (e.g. 'CEST'), '' without a table
+    def name(self):
+        return self.dst_name if self.off != self.std_off else self.std_name
+
+    def stats(self):
+        if self.years is None:
+            return "tz: UTC{} (fixed)".format(hm(self.off))
+        return "tz: {}{}, {} changes {}-{}, now {} (UTC{}), {} lookups".format(
+            self.std_name, '/' + self.dst_name if self.dst_name else '', len(self.times),
+            self.years[0], self.years[1], self.name(), hm(self.off), self.finds)
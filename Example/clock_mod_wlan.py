@@ -0,0 +1,148 @@
+#
+# Belongs to clock_mod.py
+# WLAN connection manager.
+#
+# One network.WLAN object is created and reused for all NTP syncs. Two policies:
+# - POLICY_PERSISTENT: the link is kept up between syncs. Every 'check_ms' step()
+#                      checks that it is still up; if not, the next request() reconnects.
+# - POLICY_DUTY:       the link is brought up for a sync and taken down by release().
+#                      If the radio is still associated at request() (last-good state), it is reused.
+# A failed association (status < 0 or no connection within 'max_wait_ms') puts the
+# manager in back-off: request() refuses to connect until 'backoff_ms' have passed.
+# The back-off doubles with each consecutive failure, from backoff_min_ms up to
+# backoff_max_ms, plus a random jitter of up to a quarter of it.
+# Like SyncMachine, the manager never blocks: request(), step() and release() return at once.
+#
+import time
+import random
+
+POLICY_PERSISTENT = 0
+POLICY_DUTY = 1
+
+# Link states
+LINK_DOWN = 0
+LINK_CONNECTING = 1
+LINK_UP = 2
+LINK_BACKOFF = 3
+LINK_DISCONNECTING = 4
+
+
+class WlanManager:
+    def __init__(self, network, ssid, password, policy=POLICY_DUTY, max_wait_ms=20000,
+                 backoff_min_ms=30000, backoff_max_ms=1800000, check_ms=10000, max_off_steps=100):
+        self.network = network
+        self.ssid = ssid
+        self.password = password
+        self.policy = policy
+        self.max_wait_ms = max_wait_ms
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.check_ms = check_ms
+        self.max_off_steps = max_off_steps
+        self.wlan = None
+        self.state = LINK_DOWN
+        self.t_start = 0
+        self.t_check = 0
+        self.retry_at = 0
+        self.cnt = 0
+        self.off_timeout = 0      # steps waited for a disconnect that did not happen (0: none)
+        self.last_good = None     # time.ticks_ms() of the last successful association
+        self.ifconfig = None      # ifconfig() of the last successful association
+        # statistics
+        self.assoc_count = 0
+        self.assoc_ms = 0         # duration of the last association
+        self.assoc_ms_max = 0
+        self.assoc_ms_total = 0
+        self.failures = 0
+        self.fail_streak = 0
+        self.backoff_ms = 0
+
+    def is_up(self):
+        return self.state == LINK_UP
+
+    # Milliseconds left before request() will try to connect again
+    def backoff_left(self):
+        if self.state != LINK_BACKOFF:
+            return 0
+        return max(0, time.ticks_diff(self.retry_at, time.ticks_ms()))
+
+    # Ask for the link. Starts connecting if it is down. Returns the link state
+    def request(self):
+        if self.state == LINK_BACKOFF:
+            if self.backoff_left() > 0:
+                return LINK_BACKOFF
+            self.state = LINK_DOWN
+        if self.state == LINK_DOWN:
+            if self.wlan is None:
+                self.wlan = self.network.WLAN(self.network.STA_IF)
+            self.wlan.active(True)
+            if self.wlan.isconnected():
+                self.state = LINK_UP
+                self.t_check = time.ticks_ms()
+            else:
+                self.wlan.connect(self.ssid, self.password)
+                self.t_start = time.ticks_ms()
+                self.state = LINK_CONNECTING
+        return self.state
+
+    # Advance connecting/disconnecting. Returns the link state
+    def step(self):
+        st = self.state
+        now = time.ticks_ms()
+        if st == LINK_CONNECTING:
+            wstat = self.wlan.status()
+            if wstat >= 3:
+                self.assoc_ms = time.ticks_diff(now, self.t_start)
+                self.assoc_count += 1
+                self.assoc_ms_total += self.assoc_ms
+                if self.assoc_ms > self.assoc_ms_max:
+                    self.assoc_ms_max = self.assoc_ms
+                self.fail_streak = 0
+                self.backoff_ms = 0
+                self.last_good = now
+                try:
+                    self.ifconfig = self.wlan.ifconfig()
+                except AttributeError:
+                    pass
+                self.t_check = now
+                self.state = LINK_UP
+            elif wstat < 0 or time.ticks_diff(now, self.t_start) >= self.max_wait_ms:
+                self.fail(now)
+        elif st == LINK_UP:
+            if time.ticks_diff(now, self.t_check) >= self.check_ms:
+                self.t_check = now
+                if not self.wlan.isconnected():
+                    self.state = LINK_DOWN  # link lost. The next request() reconnects
+        elif st == LINK_DISCONNECTING:
+            if self.wlan.isconnected():
+                self.cnt += 1
+                if self.cnt < self.max_off_steps:
+                    return st
+                self.off_timeout = self.cnt
+            self.wlan.active(False)
+            self.state = LINK_DOWN
+        return self.state
+
+    def fail(self, now):
+        self.failures += 1
+        self.fail_streak += 1
+        b = min(self.backoff_min_ms << min(self.fail_streak - 1, 16), self.backoff_max_ms)
+        self.backoff_ms = b + random.getrandbits(30) % (b // 4 + 1)
+        self.retry_at = time.ticks_add(now, self.backoff_ms)
+        self.wlan.disconnect()
+        self.wlan.active(False)
+        self.state = LINK_BACKOFF
+
+    # The caller is done with the link. POLICY_DUTY: start disconnecting
+    def release(self):
+        self.off_timeout = 0
+        if self.policy == POLICY_PERSISTENT or self.state != LINK_UP:
+            return
+        self.wlan.disconnect()
+        self.cnt = 0
+        self.state = LINK_DISCONNECTING
+
+    def stats(self):
+        avg = self.assoc_ms_total // self.assoc_count if self.assoc_count else 0
+        return "wlan: {} associations (last {} ms, avg {} ms, max {} ms), {} failures, backoff {} ms".format(
+            self.assoc_count, self.assoc_ms, avg, self.assoc_ms_max, self.failures, self.backoff_ms)
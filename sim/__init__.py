@@ -0,0 +1,175 @@
+#
+# Headless host simulator of the Galactic Unicorn (Pico W) for clock_mod.py.
+#
+# In-memory stand-ins for the modules clock_mod.py imports on the device:
+#   galactic, picographics, machine, network, ntptime, usocket, micropython, uasyncio, _thread and time
+# on top of a virtual clock (see clock.py). clock_mod.py and its helper modules
+# run unmodified: load() puts the stand-ins in sys.modules and imports them.
+#
+# Typical use:
+#   import sim
+#   cm = sim.load()                      # imports Example/clock_mod.py
+#   sim.press('A', at=5.0)               # scripted button press
+#   sim.run(cm.main, seconds=60)         # run main() for 60 virtual seconds
+#   sim.frame_stats()                    # drawing calls per frame
+#   sim.dump_frames('frames/')           # PNG images of the frames
+#
+import builtins
+import os
+import sys
+
+from . import clock as _clock
+from .clock import clock, SimulationEnd, make_time_module
+from . import machine, galactic, picographics, network, ntptime, usocket, micropython, uasyncio, thread
+from .machine import SimulationReset
+from .png import write_png
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Example')
+
+STAND_INS = {
+    'machine': machine,
+    'galactic': galactic,
+    'picographics': picographics,
+    'network': network,
+    'ntptime': ntptime,
+    'usocket': usocket,
+    'micropython': micropython,
+    'uasyncio': uasyncio,
+    '_thread': thread,
+}
+
+time = make_time_module()
+_saved = {}
+
+
+# Put the stand-ins (and the virtual 'time' module) in sys.modules
+def install():
+    if _saved:
+        return
+    for name, mod in list(STAND_INS.items()) + [('time', time), ('utime', time)]:
+        _saved[name] = sys.modules.get(name)
+        sys.modules[name] = mod
+    _saved['builtins.micropython'] = getattr(builtins, 'micropython', None)
+    builtins.micropython = micropython  # '@micropython.native' is used without import
+
+
+def uninstall():
+    for name, mod in _saved.items():
+        if name == 'builtins.micropython':
+            if mod is None:
+                del builtins.micropython
+            else:
+                builtins.micropython = mod
+        elif mod is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = mod
+    _saved.clear()
+
+
+# Reset the virtual clock and the scripted hardware
+def reset(start=_clock.DEFAULT_START, drift_ppm=0.0, cpu_scale=0):
+    clock.reset(start, drift_ppm, cpu_scale)
+    machine._pins.clear()
+    machine._level.clear()
+    galactic.units.clear()
+    network.reset()
+    ntptime.reset()
+    usocket.reset()
+
+
+# Reset the simulator and (re)import clock_mod.py (or another module of 'path')
+# with the stand-ins installed. Extra keyword arguments become module globals
+# set before main() runs, e.g. load(classic=True).
+# cpu_scale > 0 charges the host CPU time to the virtual clock (see clock.py).
+def load(name='clock_mod', path=EXAMPLE_DIR, start=_clock.DEFAULT_START, drift_ppm=0.0, cpu_scale=0, **overrides):
+    reset(start, drift_ppm, cpu_scale)
+    install()
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    for m in [m for m in sys.modules if m == name or m.startswith('clock_mod')]:
+        del sys.modules[m]
+    mod = __import__(name)
+    for k, v in overrides.items():
+        setattr(mod, k, v)
+    return mod
+
+
+# Call fn() until 'seconds' of virtual time have passed (or fn returns).
+# Returns 'end', 'reset' (machine.reset()) or 'return'.
+# Threads started by fn (see thread.py) end with it.
+def run(fn, seconds):
+    clock.end_ns = clock.mono_ns + int(seconds * 1000000000)
+    clock.ended = False
+    try:
+        fn()
+    except SimulationEnd:
+        return 'end'
+    except SimulationReset:
+        return 'reset'
+    finally:
+        with clock.cv:
+            clock.ended = True
+            clock.cv.notify_all()
+            while clock.threads > 1:
+                clock.cv.wait(1.0)
+        clock.end_ns = None
+        clock.ended = False
+    return 'return'
+
+
+# Scripted button press. switch: a name of galactic.SWITCHES ('A', 'SLEEP', ...) or a pin number
+def press(switch, at, duration=0.1):
+    if isinstance(switch, str):
+        switch = galactic.SWITCHES[switch]
+    galactic.press(switch, at, duration)
+
+
+def unit():
+    return galactic.units[-1]
+
+
+# Drawing calls of each frame (gu.update()) as a list of (virtual seconds, {call: count})
+def frames():
+    return [(t / 1000000000, c) for t, c in unit().frames]
+
+
+# Summary of the frames: number of frames, and average and maximum calls per frame
+def frame_stats():
+    fr = unit().frames
+    n = len(fr)
+    tot = {}
+    mx = {}
+    for _, c in fr:
+        for k, v in c.items():
+            tot[k] = tot.get(k, 0) + v
+            mx[k] = max(mx.get(k, 0), v)
+    avg = {k: v / n for k, v in tot.items()} if n else {}
+    return {'frames': n, 'avg': avg, 'max': mx, 'total': tot}
+
+
+# Sleeps (wakeups) per minute and awake duty cycle (%) of the program since load().
+# The time awake is the virtual time not spent sleeping: the CPU work charged with
+# cpu_scale or work(), and the busy waits; 0 without them.
+def power_stats():
+    t = clock.mono_ns
+    if t <= 0:
+        return {'wakeups': 0, 'wakeups_per_min': 0.0, 'duty': 0.0}
+    return {'wakeups': clock.sleeps,
+            'wakeups_per_min': clock.sleeps * 60e9 / t,
+            'duty': (t - clock.slept_ns) * 100 / t}
+
+
+# Write the recorded frames (load(...) then unit().keep_snapshots = True) as PNG images
+def dump_frames(directory, scale=8):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, (t, panel) in enumerate(unit().snapshots):
+        p = os.path.join(directory, "frame_{:05d}_{:09.3f}.png".format(i, t / 1000000000))
+        write_png(p, panel, scale)
+        paths.append(p)
+    return paths
+
+
+def dump_panel(path, scale=8):
+    write_png(path, unit().panel, scale)
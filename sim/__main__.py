@@ -0,0 +1,68 @@
+#
+# Run clock_mod.py on the host simulator.
+#
+# Usage: python3 -m sim [--seconds 60] [--press A@5] [--press VOLUME_UP@12:1.5] [--set classic=True]
+#                       [--frames DIR] [--png FILE] [--quiet] [--cpu-scale 20]
+#   --press NAME@T[:D]  press switch NAME (A, B, C, D, SLEEP, VOLUME_UP, ...) at virtual time T for D seconds
+#   --set NAME=VALUE    set a global of clock_mod before main() runs (VALUE is a Python literal)
+#   --frames DIR        write every frame as a PNG image to DIR
+#   --png FILE          write the last frame as a PNG image
+#   --cpu-scale F       charge the host CPU time, times F, to the virtual clock (0: off)
+#
+import argparse
+import ast
+import contextlib
+import io
+import sys
+
+import sim
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python3 -m sim')
+    ap.add_argument('--seconds', type=float, default=60)
+    ap.add_argument('--press', action='append', default=[])
+    ap.add_argument('--set', action='append', default=[])
+    ap.add_argument('--frames')
+    ap.add_argument('--png')
+    ap.add_argument('--cpu-scale', type=float, default=0)
+    ap.add_argument('--quiet', action='store_true', help="don't show the REPL output of clock_mod")
+    args = ap.parse_args(argv)
+
+    overrides = {}
+    for s in args.set:
+        k, v = s.split('=', 1)
+        overrides[k] = ast.literal_eval(v)
+    out = io.StringIO() if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(out):
+        cm = sim.load(cpu_scale=args.cpu_scale, **overrides)
+        sim.unit().keep_snapshots = bool(args.frames)
+        for p in args.press:
+            name, t = p.split('@')
+            d = 0.1
+            if ':' in t:
+                t, d = t.split(':')
+            sim.press(name, float(t), float(d))
+        how = sim.run(cm.main, args.seconds)
+    sim.uninstall()
+
+    st = sim.frame_stats()
+    print("simulated {:.1f} s ({}), {} frames, {} sleeps".format(
+        sim.clock.seconds(), how, st['frames'], sim.clock.sleeps))
+    pw = sim.power_stats()
+    print("{:.1f} wakeups/min ({:.1f} main loop/task passes/min), awake {:.2f} % of the time{}".format(
+        pw['wakeups_per_min'], cm.wakeups * 60 / max(sim.clock.seconds(), 1e-9), pw['duty'],
+        '' if args.cpu_scale else " (use --cpu-scale to charge the CPU time)"))
+    print("{:14s} {:>10s} {:>8s} {:>10s}".format("call", "per frame", "max", "total"))
+    for k in sorted(st['total']):
+        if st['total'][k]:
+            print("{:14s} {:10.1f} {:8d} {:10d}".format(k, st['avg'][k], st['max'][k], st['total'][k]))
+    if args.frames:
+        print("{} frames written to {}".format(len(sim.dump_frames(args.frames)), args.frames))
+    if args.png:
+        sim.dump_panel(args.png)
+        print("last frame written to {}".format(args.png))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#
+# Virtual clock of the simulator.
+#
+# Virtual time only moves when the simulated program sleeps (time.sleep*, machine.lightsleep,
+# machine.idle, uasyncio) or when the simulator advances it. Events (button presses,
+# timer callbacks, ...) scheduled with at() run when the virtual time reaches them.
+#
+# Two time scales are kept:
+# - the true time (UTC, what the fake NTP responder serves);
+# - the RTC time, which runs 'drift_ppm' fast (positive) or slow (negative) and is set
+#   by machine.RTC().datetime(...), like on the Pico W.
+# time.ticks_ms()/ticks_us() follow the monotonic time and wrap like on MicroPython.
+# time.time_ns() has the fraction of the second; with time_res_ns = 1000000000 it only has
+# whole seconds, like the RTC of the rp2 port: setting it then takes the whole seconds only,
+# the RTC keeps the phase of its own seconds.
+# With 'cpu_scale' > 0 the host CPU time spent by the program between two reads of the
+# clock is added to the virtual time too (multiplied by cpu_scale, e.g. 20 for a host
+# 20 times faster than the RP2040), so time.ticks_us() can time code as on the device.
+# Threads (started with the '_thread' stand-in, see thread.py) run on a discrete-event basis,
+# as on two cores: a thread that sleeps or waits for a lock is blocked, and the virtual time
+# only moves when all threads are blocked, to the earliest deadline. Blocking I/O (e.g. the
+# NTP query) blocks only the calling thread. cpu_scale is not applied while threads run.
+#
+import calendar
+import heapq
+import threading
+import time as _time
+import types
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+DEFAULT_START = 1700000000  # 2023-11-14 22:13:20 UTC
+
+
+class SimulationEnd(BaseException):
+    # Raised from a sleep when the simulation time is over. Not caught by 'except Exception'
+    pass
+
+
+class VirtualClock:
+    def __init__(self, start=DEFAULT_START, drift_ppm=0.0):
+        self.reset(start, drift_ppm)
+
+    def reset(self, start=DEFAULT_START, drift_ppm=0.0, cpu_scale=0):
+        self.start = start
+        self.mono_ns = 0                 # virtual time since the start
+        self.drift_ppm = drift_ppm
+        self.rtc_base_ns = start * 1000000000  # RTC time at rtc_set_mono_ns
+        self.rtc_set_mono_ns = 0
+        self.end_ns = None
+        self.events = []
+        self.seq = 0
+        self.sleeps = 0                  # number of sleeps (wakeups) of the program
+        self.slept_ns = 0                # virtual time spent sleeping (with threads: all of them)
+        self.awake_ns = 0                # virtual time charged as CPU work (see work() and cpu_scale)
+        self.cpu_scale = cpu_scale
+        self.cpu_t0 = _time.perf_counter_ns()
+        self.cv = threading.Condition()
+        self.threads = 1                 # running threads: the main thread and those of thread.py
+        self.blocked = {}                # thread ident -> deadline (mono_ns), None: waits for a lock
+        self.ended = False               # the simulation time is over: blocked threads end too
+        self.time_res_ns = 1             # resolution of time.time_ns() (1000000000: whole seconds)
+
+    # Add the host CPU time since the previous call to the virtual time, if cpu_scale > 0
+    def catch_up(self):
+        t = _time.perf_counter_ns()
+        if self.cpu_scale and self.threads == 1:
+            dt = int((t - self.cpu_t0) * self.cpu_scale)
+            self.mono_ns += dt
+            self.awake_ns += dt
+        self.cpu_t0 = t
+
+    # --- time scales
+    def true_ns(self):
+        return self.start * 1000000000 + self.mono_ns
+
+    def rtc_ns(self):
+        dt = self.mono_ns - self.rtc_set_mono_ns
+        return self.rtc_base_ns + dt + int(dt * self.drift_ppm / 1000000)
+
+    def set_rtc_ns(self, ns):
+        if self.time_res_ns >= 1000000000:
+            ns += self.rtc_ns() % 1000000000 - ns % 1000000000  # the fraction is not set
+        self.rtc_base_ns = ns
+        self.rtc_set_mono_ns = self.mono_ns
+
+    # --- events
+    def at(self, t_s, fn, *args):
+        # Run fn(*args) at virtual time t_s (seconds since the start)
+        self.seq += 1
+        heapq.heappush(self.events, (int(t_s * 1000000000), self.seq, fn, args))
+
+    def after(self, dt_s, fn, *args):
+        self.at(self.mono_ns / 1000000000 + dt_s, fn, *args)
+
+    def run_until(self, t_ns):
+        while self.events and self.events[0][0] <= t_ns:
+            ev_ns, _, fn, args = heapq.heappop(self.events)
+            if ev_ns > self.mono_ns:
+                self.mono_ns = ev_ns
+            fn(*args)
+        if t_ns > self.mono_ns:
+            self.mono_ns = t_ns
+        if self.end_ns is not None and self.mono_ns >= self.end_ns:
+            raise SimulationEnd()
+
+    def advance(self, dt_ns):
+        t_ns = self.mono_ns + max(0, int(dt_ns))
+        if self.threads > 1:
+            with self.cv:
+                self.block(t_ns)
+        else:
+            self.run_until(t_ns)
+
+    # --- threads. Called with cv held: block the calling thread until mono_ns >= t_ns,
+    # or, if t_ns is None, until unblock_waiters() (a lock was released)
+    def block(self, t_ns):
+        me = threading.get_ident()
+        if t_ns is not None and t_ns <= self.mono_ns:
+            return
+        self.blocked[me] = t_ns
+        try:
+            while me in self.blocked:
+                if self.ended:
+                    raise SimulationEnd()
+                if len(self.blocked) >= self.threads:
+                    self.step_blocked()
+                else:
+                    self.cv.wait()
+        finally:
+            self.blocked.pop(me, None)
+
+    # All threads are blocked: move to the earliest deadline and release the threads due
+    def step_blocked(self):
+        due = [t for t in self.blocked.values() if t is not None]
+        if not due:
+            raise RuntimeError("simulated threads deadlocked (all wait for a lock)")
+        t_ns = min(due)
+        if t_ns > self.mono_ns:
+            self.slept_ns += t_ns - self.mono_ns  # all threads (cores) idle
+        try:
+            self.run_until(t_ns)
+        except SimulationEnd:
+            self.ended = True
+            self.cv.notify_all()
+            raise
+        for k, t in list(self.blocked.items()):
+            if t is not None and t <= self.mono_ns:
+                del self.blocked[k]
+        self.cv.notify_all()
+
+    # Called with cv held: the threads waiting for a lock try again
+    def unblock_waiters(self):
+        for k, t in list(self.blocked.items()):
+            if t is None:
+                del self.blocked[k]
+        self.cv.notify_all()
+
+    def sleep_ns(self, dt_ns):
+        self.catch_up()
+        self.sleeps += 1
+        if self.threads == 1:
+            self.slept_ns += max(0, int(dt_ns))  # with threads: see step_blocked()
+        self.advance(dt_ns)
+        self.cpu_t0 = _time.perf_counter_ns()  # the time spent by the simulator is not charged
+
+    # Charge CPU time to the virtual clock (used by the benchmarks to model render cost)
+    def work(self, dt_ns):
+        self.awake_ns += dt_ns
+        self.advance(dt_ns)
+
+    def seconds(self):
+        return self.mono_ns / 1000000000
+
+
+clock = VirtualClock()
+
+
+def _tuple8(t):
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, t.tm_wday, t.tm_yday)
+
+
+# Build a stand-in for MicroPython's 'time' (utime) module on top of 'clock'
+def make_time_module():
+    m = types.ModuleType('time')
+    m.__file__ = __file__
+
+    def time():
+        clock.catch_up()
+        return clock.rtc_ns() // 1000000000
+
+    def time_ns():
+        clock.catch_up()
+        ns = clock.rtc_ns()
+        return ns - ns % clock.time_res_ns
+
+    def sleep(s):
+        clock.sleep_ns(s * 1000000000)
+
+    def sleep_ms(ms):
+        clock.sleep_ns(ms * 1000000)
+
+    def sleep_us(us):
+        clock.sleep_ns(us * 1000)
+
+    def ticks_ms():
+        clock.catch_up()
+        return (clock.mono_ns // 1000000) & TICKS_MAX
+
+    def ticks_us():
+        clock.catch_up()
+        return (clock.mono_ns // 1000) & TICKS_MAX
+
+    def ticks_cpu():
+        return ticks_us()
+
+    def ticks_add(t, delta):
+        return (t + delta) & TICKS_MAX
+
+    def ticks_diff(a, b):
+        return ((a - b + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+    def gmtime(secs=None):
+        if secs is None:
+            secs = time()
+        return _tuple8(_time.gmtime(secs))
+
+    def mktime(t):
+        return calendar.timegm((t[0], t[1], t[2], t[3], t[4], t[5], 0, 0, 0))
+
+    for f in (time, time_ns, sleep, sleep_ms, sleep_us, ticks_ms, ticks_us, ticks_cpu,
+              ticks_add, ticks_diff, gmtime, mktime):
+        setattr(m, f.__name__, f)
+    m.localtime = gmtime  # the Pico W has no time zone: localtime() == gmtime()
+    return m
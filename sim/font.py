@@ -0,0 +1,62 @@
+#
+# Small variable-width bitmap font used by the PicoGraphics stand-in for gr.text().
+#
+# It is NOT Pimoroni's 'bitmap8' font: it only stands in for it, with the same
+# height (8 rows, the bottom one empty) and about the same widths, so that
+# text drawing costs and layouts are realistic. Characters missing here are drawn as a box.
+#
+GLYPHS = {
+    ' ': ["   "] * 7,
+    '.': [" ", " ", " ", " ", " ", " ", "O"],
+    ',': ["  ", "  ", "  ", "  ", "  ", " O", "O "],
+    ':': [" ", "O", " ", " ", " ", "O", " "],
+    '-': ["    ", "    ", "    ", "OOOO", "    ", "    ", "    "],
+    '+': ["     ", "  O  ", "  O  ", "OOOOO", "  O  ", "  O  ", "     "],
+    '%': ["OO  O", "OO O ", "  O  ", " O   ", "O  OO", "   OO", "     "],
+    '0': [" OOO ", "O   O", "O  OO", "O O O", "OO  O", "O   O", " OOO "],
+    '1': [" O ", "OO ", " O ", " O ", " O ", " O ", "OOO"],
+    '2': [" OOO ", "O   O", "    O", "  OO ", " O   ", "O    ", "OOOOO"],
+    '3': ["OOOO ", "    O", "    O", " OOO ", "    O", "    O", "OOOO "],
+    '4': ["   O ", "  OO ", " O O ", "O  O ", "OOOOO", "   O ", "   O "],
+    '5': ["OOOOO", "O    ", "OOOO ", "    O", "    O", "O   O", " OOO "],
+    '6': [" OOO ", "O    ", "OOOO ", "O   O", "O   O", "O   O", " OOO "],
+    '7': ["OOOOO", "    O", "   O ", "  O  ", " O   ", " O   ", " O   "],
+    '8': [" OOO ", "O   O", "O   O", " OOO ", "O   O", "O   O", " OOO "],
+    '9': [" OOO ", "O   O", "O   O", " OOOO", "    O", "    O", " OOO "],
+    'D': ["OOOO ", "O   O", "O   O", "O   O", "O   O", "O   O", "OOOO "],
+    'R': ["OOOO ", "O   O", "O   O", "OOOO ", "O O  ", "O  O ", "O   O"],
+    'U': ["O   O", "O   O", "O   O", "O   O", "O   O", "O   O", " OOO "],
+    'V': ["O   O", "O   O", "O   O", "O   O", "O   O", " O O ", "  O  "],
+    'a': ["    ", "    ", " OOO", "O  O", "O  O", "O  O", " OOO"],
+    'e': ["    ", "    ", " OO ", "O  O", "OOOO", "O   ", " OOO"],
+    'l': ["O ", "O ", "O ", "O ", "O ", "O ", " O"],
+    'n': ["    ", "    ", "OOO ", "O  O", "O  O", "O  O", "O  O"],
+    'o': ["    ", "    ", " OO ", "O  O", "O  O", "O  O", " OO "],
+    'p': ["    ", "    ", "OOO ", "O  O", "OOO ", "O   ", "O   "],
+    's': ["    ", "    ", " OOO", "O   ", " OO ", "   O", "OOO "],
+    't': [" O  ", " O  ", "OOO ", " O  ", " O  ", " O  ", "  OO"],
+}
+
+HEIGHT = 8
+BOX = ["OOOO", "O  O", "O  O", "O  O", "O  O", "O  O", "OOOO"]
+
+
+# (width, [(dx, dy) of the set pixels]) of a character
+def glyph(c):
+    rows = GLYPHS.get(c, BOX)
+    pts = []
+    for dy in range(len(rows)):
+        for dx in range(len(rows[dy])):
+            if rows[dy][dx] == 'O':
+                pts.append((dx, dy))
+    return len(rows[0]), pts
+
+
+_cache = {}
+
+
+def cached_glyph(c):
+    g = _cache.get(c)
+    if g is None:
+        g = _cache[c] = glyph(c)
+    return g
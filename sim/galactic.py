@@ -0,0 +1,146 @@
+#
+# Stand-in for Pimoroni's 'galactic' module: GalacticUnicorn and Channel.
+#
+# gu.update(gr) is the end of a frame: it copies the framebuffer of the PicoGraphics
+# stand-in to 'panel', counts the frame and records the drawing calls made since the
+# previous update (see picographics.PicoGraphics.take_counts()).
+#
+from .clock import clock
+from . import machine
+
+WIDTH = 53
+HEIGHT = 11
+
+SWITCH_A = 0
+SWITCH_B = 1
+SWITCH_C = 3
+SWITCH_D = 6
+SWITCH_SLEEP = 27
+SWITCH_VOLUME_UP = 7
+SWITCH_VOLUME_DOWN = 8
+SWITCH_BRIGHTNESS_UP = 21
+SWITCH_BRIGHTNESS_DOWN = 26
+
+SWITCHES = {
+    'A': SWITCH_A, 'B': SWITCH_B, 'C': SWITCH_C, 'D': SWITCH_D,
+    'SLEEP': SWITCH_SLEEP,
+    'VOLUME_UP': SWITCH_VOLUME_UP, 'VOLUME_DOWN': SWITCH_VOLUME_DOWN,
+    'BRIGHTNESS_UP': SWITCH_BRIGHTNESS_UP, 'BRIGHTNESS_DOWN': SWITCH_BRIGHTNESS_DOWN,
+}
+
+units = []  # the GalacticUnicorn objects created
+
+
+class Channel:
+    NOISE = 128
+    SQUARE = 64
+    SAW = 32
+    TRIANGLE = 16
+    SINE = 8
+    WAVE = 1
+
+    def __init__(self, unit, index):
+        self.unit = unit
+        self.index = index
+        self.freq = 0
+
+    def play_tone(self, frequency, volume=None, attack=None, release=None):
+        self.freq = frequency
+        self.unit.tones.append((clock.mono_ns, self.index, frequency))
+
+    def frequency(self, f=None):
+        if f is None:
+            return self.freq
+        self.freq = f
+
+    def volume(self, v=None):
+        return 1.0
+
+    def trigger_attack(self):
+        pass
+
+    def trigger_release(self):
+        pass
+
+
+class GalacticUnicorn:
+    WIDTH = WIDTH
+    HEIGHT = HEIGHT
+    SWITCH_A = SWITCH_A
+    SWITCH_B = SWITCH_B
+    SWITCH_C = SWITCH_C
+    SWITCH_D = SWITCH_D
+    SWITCH_SLEEP = SWITCH_SLEEP
+    SWITCH_VOLUME_UP = SWITCH_VOLUME_UP
+    SWITCH_VOLUME_DOWN = SWITCH_VOLUME_DOWN
+    SWITCH_BRIGHTNESS_UP = SWITCH_BRIGHTNESS_UP
+    SWITCH_BRIGHTNESS_DOWN = SWITCH_BRIGHTNESS_DOWN
+
+    def __init__(self):
+        self.brightness = 0.5
+        self.vol = 0.5
+        self.panel = bytearray(WIDTH * HEIGHT * 4)
+        self.frames = []      # (virtual ns, {call: count}) per update()
+        self.snapshots = []   # (virtual ns, panel copy) per update(), if keep_snapshots
+        self.keep_snapshots = False
+        self.tones = []       # (virtual ns, channel, frequency)
+        self.playing = False
+        self.channels = [Channel(self, i) for i in range(8)]
+        units.append(self)
+
+    def clear(self):
+        for i in range(len(self.panel)):
+            self.panel[i] = 0
+
+    def update(self, gr):
+        self.panel[:] = gr
+        self.frames.append((clock.mono_ns, gr.take_counts()))
+        if self.keep_snapshots:
+            self.snapshots.append((clock.mono_ns, bytes(self.panel)))
+
+    def set_brightness(self, value):
+        self.brightness = max(0.0, min(1.0, value))
+
+    def get_brightness(self):
+        return self.brightness
+
+    def adjust_brightness(self, delta):
+        self.set_brightness(self.brightness + delta)
+
+    def set_volume(self, value):
+        self.vol = max(0.0, min(1.0, value))
+
+    def get_volume(self):
+        return self.vol
+
+    def adjust_volume(self, delta):
+        self.set_volume(self.vol + delta)
+
+    def light(self):
+        return 2048
+
+    def is_pressed(self, switch):
+        return machine.pin_level(switch) == 0
+
+    def synth_channel(self, channel):
+        return self.channels[channel]
+
+    def play_synth(self):
+        self.playing = True
+
+    def stop_playing(self):
+        self.playing = False
+
+    def play_sample(self, data):
+        self.playing = True
+
+    # Colour of a pixel on the panel as (r, g, b)
+    def get_pixel(self, x, y):
+        i = (y * WIDTH + x) * 4
+        return (self.panel[i + 2], self.panel[i + 1], self.panel[i])
+
+
+# Press 'switch' at virtual time 'at' (seconds) for 'duration' seconds
+def press(switch, at, duration=0.1):
+    clock.at(at, machine.set_level, switch, 0)
+    clock.at(at + duration, machine.set_level, switch, 1)
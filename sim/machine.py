@@ -0,0 +1,136 @@
+#
+# Stand-in for MicroPython's 'machine' module: Pin (with IRQs), RTC, Timer and the power functions.
+#
+import calendar
+import time as _time
+
+from .clock import clock
+
+
+class SimulationReset(BaseException):
+    # Raised by machine.reset()
+    pass
+
+
+_pins = {}   # pin id -> list of Pin objects created for it
+_level = {}  # pin id -> level (1: released, buttons are active low)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=IN, pull=None):
+        self.id = id
+        self.handler = None
+        self.trigger = 0
+        _pins.setdefault(id, []).append(self)
+
+    def value(self, v=None):
+        if v is None:
+            return _level.get(self.id, 1)
+        _level[self.id] = v
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+        self.trigger = trigger
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+
+# Drive a pin level; calls the IRQ handlers of the matching edge
+def set_level(pin_id, level):
+    old = _level.get(pin_id, 1)
+    _level[pin_id] = level
+    if old == level:
+        return
+    edge = Pin.IRQ_FALLING if level == 0 else Pin.IRQ_RISING
+    for p in _pins.get(pin_id, ()):
+        if p.handler is not None and p.trigger & edge:
+            p.handler(p)
+
+
+def pin_level(pin_id):
+    return _level.get(pin_id, 1)
+
+
+class RTC:
+    def datetime(self, dt=None):
+        if dt is None:
+            ns = clock.rtc_ns()
+            t = _time.gmtime(ns // 1000000000)
+            return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_wday, t.tm_hour, t.tm_min, t.tm_sec,
+                    (ns // 1000) % 1000000)
+        secs = calendar.timegm((dt[0], dt[1], dt[2], dt[4], dt[5], dt[6], 0, 0, 0))
+        clock.set_rtc_ns(secs * 1000000000 + dt[7] * 1000)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.gen = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, tick_hz=1000):
+        self.deinit()
+        if freq > 0:
+            period_s = 1 / freq
+        else:
+            period_s = period / tick_hz
+        self.gen += 1
+        self.mode = mode
+        self.period_s = period_s
+        self.callback = callback
+        clock.after(period_s, self._fire, self.gen)
+
+    def _fire(self, gen):
+        if gen != self.gen:
+            return  # deinit() or init() since
+        if self.mode == Timer.PERIODIC:
+            clock.after(self.period_s, self._fire, gen)
+        if self.callback is not None:
+            self.callback(self)
+
+    def deinit(self):
+        self.gen += 1
+
+
+def unique_id():
+    return b'\xe6\x61\x41\x04\x03\x5a\x2e\x2b'
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def idle():
+    clock.sleep_ns(1000)
+
+
+def lightsleep(ms=None):
+    # Wakes up after ms or at the next event (button press, timer)
+    if ms is None:
+        ms = 1000000000
+    wake = clock.mono_ns + ms * 1000000
+    if clock.events and clock.events[0][0] < wake:
+        wake = clock.events[0][0]
+    clock.sleep_ns(wake - clock.mono_ns)
+
+
+deepsleep = lightsleep
+
+
+def reset():
+    raise SimulationReset()
+
+
+def soft_reset():
+    raise SimulationReset()
@@ -0,0 +1,39 @@
+#
+# Stand-in for MicroPython's 'micropython' module. The code emitters are no-ops.
+#
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def const(x):
+    return x
+
+
+def opt_level(level=None):
+    return 0
+
+
+def mem_info(verbose=None):
+    pass
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(fn, arg):
+    fn(arg)
+
+
+def heap_lock():
+    pass
+
+
+def heap_unlock():
+    return 0
@@ -0,0 +1,85 @@
+#
+# Stand-in for MicroPython's 'network' module (WLAN station interface).
+#
+# The access point is scripted through the module globals:
+# ap_up:         False: connections never succeed (status stays STAT_CONNECTING,
+#                or STAT_CONNECT_FAIL if ap_refuse is True)
+# assoc_delay_s: virtual time an association takes
+# drop_at:       virtual time (seconds) at which an established link drops, or None
+#
+from .clock import clock
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+ap_up = True
+ap_refuse = False
+assoc_delay_s = 2.0
+drop_at = None
+
+interfaces = []  # the WLAN objects created
+connects = 0     # number of connect() calls
+
+
+def reset():
+    global ap_up, ap_refuse, assoc_delay_s, drop_at, connects
+    ap_up = True
+    ap_refuse = False
+    assoc_delay_s = 2.0
+    drop_at = None
+    connects = 0
+    interfaces.clear()
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self.on = False
+        self.t_connect = None
+        interfaces.append(self)
+
+    def active(self, on=None):
+        if on is None:
+            return self.on
+        self.on = bool(on)
+        if not self.on:
+            self.t_connect = None
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        global connects
+        connects += 1
+        self.t_connect = clock.mono_ns
+
+    def disconnect(self):
+        self.t_connect = None
+
+    def status(self, param=None):
+        if param is not None:
+            return -70  # rssi
+        if not self.on or self.t_connect is None:
+            return STAT_IDLE
+        if not ap_up:
+            return STAT_CONNECT_FAIL if ap_refuse else STAT_CONNECTING
+        if drop_at is not None and clock.mono_ns >= drop_at * 1000000000:
+            return STAT_IDLE
+        if clock.mono_ns - self.t_connect >= assoc_delay_s * 1000000000:
+            return STAT_GOT_IP
+        return STAT_CONNECTING
+
+    def isconnected(self):
+        return self.status() == STAT_GOT_IP
+
+    def ifconfig(self, config=None):
+        return ('192.168.1.53', '255.255.255.0', '192.168.1.1', '192.168.1.1')
+
+    def config(self, *args, **kwargs):
+        if args and args[0] == 'mac':
+            return b'\x28\xcd\xc1\x00\x00\x53'
+        return None
@@ -0,0 +1,49 @@
+#
+# Stand-in for MicroPython's 'ntptime' module, served by a fake NTP responder.
+#
+# settime() sets the RTC from the true time of the virtual clock, like ntptime does:
+# whole seconds only. The responder is scripted through the module globals:
+# delay_s:  round-trip time of a query (virtual time passes during settime())
+# error_s:  error of the time served
+# failing:  True: the query times out (after 'timeout' seconds) with OSError(ETIMEDOUT)
+#
+import time as _time
+
+from .clock import clock
+from . import machine
+
+host = "pool.ntp.org"
+timeout = 1
+NTP_DELTA = 2208988800
+
+delay_s = 0.03
+error_s = 0.0
+failing = False
+queries = 0
+
+
+def reset():
+    global host, delay_s, error_s, failing, queries
+    host = "pool.ntp.org"
+    delay_s = 0.03
+    error_s = 0.0
+    failing = False
+    queries = 0
+
+
+def time():
+    global queries
+    queries += 1
+    if failing:
+        clock.advance(timeout * 1000000000)
+        raise OSError(110)  # ETIMEDOUT
+    clock.advance(delay_s * 500000000)           # request on its way
+    t = (clock.true_ns() + int(error_s * 1000000000)) // 1000000000
+    clock.advance(delay_s * 500000000)           # reply on its way
+    return t
+
+
+def settime():
+    t = time()
+    tm = _time.gmtime(t)
+    machine.RTC().datetime((tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_wday + 1, tm.tm_hour, tm.tm_min, tm.tm_sec, 0))
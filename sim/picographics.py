@@ -0,0 +1,142 @@
+#
+# Stand-in for Pimoroni's 'picographics' module, for DISPLAY_GALACTIC_UNICORN.
+#
+# PicoGraphics is a bytearray holding the 53x11 framebuffer in the RGB888 pen format
+# of the Galactic Unicorn: one little-endian 32-bit word 0x00RRGGBB per pixel, so
+# memoryview(gr) works as on the device. Every drawing call is counted in 'counts'.
+#
+from . import font
+
+DISPLAY_GALACTIC_UNICORN = 11
+PEN_RGB888 = 7
+
+WIDTH = 53
+HEIGHT = 11
+
+CALLS = ('create_pen', 'set_pen', 'pixel', 'pixel_span', 'rectangle', 'clear', 'text',
+         'measure_text', 'set_font', 'line')
+
+
+class PicoGraphics(bytearray):
+    def __new__(cls, *args, **kwargs):
+        return super().__new__(cls)
+
+    def __init__(self, display=DISPLAY_GALACTIC_UNICORN, pen_type=PEN_RGB888, **kwargs):
+        super().__init__(WIDTH * HEIGHT * 4)
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.pen = 0
+        self.pen_bytes = b'\x00\x00\x00\x00'
+        self.font = "bitmap8"
+        self.clip = (0, 0, WIDTH, HEIGHT)
+        self.counts = dict.fromkeys(CALLS, 0)
+        self.totals = dict.fromkeys(CALLS, 0)
+
+    # Return the calls counted since the previous call and restart counting
+    def take_counts(self):
+        c = self.counts
+        for k, v in c.items():
+            self.totals[k] += v
+        self.counts = dict.fromkeys(CALLS, 0)
+        return c
+
+    def create_pen(self, r, g, b):
+        self.counts['create_pen'] += 1
+        return ((r & 0xff) << 16) | ((g & 0xff) << 8) | (b & 0xff)
+
+    def create_pen_hsv(self, h, s, v):
+        import colorsys
+        r, g, b = colorsys.hsv_to_rgb(h, s, v)
+        return self.create_pen(int(r * 255), int(g * 255), int(b * 255))
+
+    def set_pen(self, pen):
+        self.counts['set_pen'] += 1
+        self.pen = pen
+        self.pen_bytes = bytes((pen & 0xff, (pen >> 8) & 0xff, (pen >> 16) & 0xff, 0))
+
+    def get_bounds(self):
+        return (WIDTH, HEIGHT)
+
+    def set_clip(self, x, y, w, h):
+        self.clip = (max(0, x), max(0, y), min(WIDTH, x + w), min(HEIGHT, y + h))
+
+    def remove_clip(self):
+        self.clip = (0, 0, WIDTH, HEIGHT)
+
+    def _span(self, x, y, n):
+        x0, y0, x1, y1 = self.clip
+        if y < y0 or y >= y1:
+            return
+        a = max(x, x0)
+        b = min(x + n, x1)
+        if b <= a:
+            return
+        i = (y * WIDTH + a) * 4
+        self[i:i + (b - a) * 4] = self.pen_bytes * (b - a)
+
+    def pixel(self, x, y):
+        self.counts['pixel'] += 1
+        self._span(x, y, 1)
+
+    def pixel_span(self, x, y, n):
+        self.counts['pixel_span'] += 1
+        self._span(x, y, n)
+
+    def rectangle(self, x, y, w, h):
+        self.counts['rectangle'] += 1
+        for j in range(y, y + h):
+            self._span(x, j, w)
+
+    def line(self, x1, y1, x2, y2, thickness=1):
+        self.counts['line'] += 1
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self._span(x1, y1, 1)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def clear(self):
+        self.counts['clear'] += 1
+        self[:] = self.pen_bytes * (WIDTH * HEIGHT)
+
+    def set_font(self, name):
+        self.counts['set_font'] += 1
+        self.font = name
+
+    def measure_text(self, text, scale=1, spacing=1):
+        self.counts['measure_text'] += 1
+        w = 0
+        for c in text:
+            w += (font.cached_glyph(c)[0] + spacing) * scale
+        return w
+
+    def text(self, text, x, y, wordwrap=-1, scale=1, angle=0, spacing=1):
+        self.counts['text'] += 1
+        for c in text:
+            cw, pts = font.cached_glyph(c)
+            for dx, dy in pts:
+                if scale == 1:
+                    self._span(x + dx, y + dy, 1)
+                else:
+                    for j in range(scale):
+                        self._span(x + dx * scale, y + dy * scale + j, scale)
+            x += (cw + spacing) * scale
+
+    def update(self):
+        pass
+
+    # Colour of a pixel as (r, g, b)
+    def get_pixel(self, x, y):
+        i = (y * WIDTH + x) * 4
+        return (self[i + 2], self[i + 1], self[i])
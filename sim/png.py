@@ -0,0 +1,39 @@
+#
+# Frame dumps: writes a panel (RGB888 framebuffer of 53x11 32-bit words) as a PNG image.
+# Each LED is drawn as a 'scale' x 'scale' square with a one pixel dark gap.
+#
+import struct
+import zlib
+
+WIDTH = 53
+HEIGHT = 11
+
+
+def _chunk(kind, data):
+    c = struct.pack('>I', len(data)) + kind + data
+    return c + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def panel_png(panel, scale=8):
+    w = WIDTH * scale
+    h = HEIGHT * scale
+    rows = []
+    for y in range(HEIGHT):
+        line = bytearray()
+        for x in range(WIDTH):
+            i = (y * WIDTH + x) * 4
+            px = bytes((panel[i + 2], panel[i + 1], panel[i]))
+            line += px * (scale - 1) + b'\x10\x10\x10'
+        gap = b'\x10\x10\x10' * w
+        for j in range(scale):
+            rows.append(b'\x00' + (bytes(line) if j < scale - 1 else gap))
+    raw = b''.join(rows)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+            + _chunk(b'IDAT', zlib.compress(raw, 9))
+            + _chunk(b'IEND', b''))
+
+
+def write_png(path, panel, scale=8):
+    with open(path, 'wb') as f:
+        f.write(panel_png(panel, scale))
@@ -0,0 +1,89 @@
+#
+# Stand-in for MicroPython's '_thread' module, on top of CPython's 'threading'.
+#
+# On the Pico W _thread starts one more thread, on the second core. Here the threads are
+# real host threads, so races between them show up, but they run in virtual time (see
+# clock.py): a thread that sleeps or waits for a lock is blocked, and the virtual time moves
+# when all threads are blocked. An uncaught exception ends the thread with a traceback,
+# like on MicroPython; the end of the simulation (SimulationEnd) ends it silently.
+#
+import sys
+import threading
+import traceback
+
+from .clock import clock, SimulationEnd
+
+started = 0   # threads started since the start of the simulator
+
+
+class LockType:
+    def __init__(self):
+        self.held = False
+
+    def acquire(self, waitflag=1, timeout=-1):
+        with clock.cv:
+            while self.held:
+                if not waitflag:
+                    return False
+                if clock.threads == 1:
+                    raise RuntimeError("lock acquired twice by the only thread")
+                clock.block(None)
+            self.held = True
+            return True
+
+    def release(self):
+        with clock.cv:
+            if not self.held:
+                raise RuntimeError("release of an unlocked lock")
+            self.held = False
+            clock.unblock_waiters()
+
+    def locked(self):
+        return self.held
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def allocate_lock():
+    return LockType()
+
+
+def _run(fn, args, kwargs):
+    try:
+        fn(*args, **kwargs)
+    except (SimulationEnd, SystemExit):
+        pass
+    except BaseException:
+        print("Unhandled exception in thread started by {}".format(fn), file=sys.stderr)
+        traceback.print_exc()
+    finally:
+        with clock.cv:
+            clock.threads -= 1
+            clock.cv.notify_all()
+
+
+def start_new_thread(fn, args, kwargs=None):
+    global started
+    with clock.cv:
+        clock.threads += 1
+    started += 1
+    t = threading.Thread(target=_run, args=(fn, args, kwargs or {}), daemon=True)
+    t.start()
+    return t.ident
+
+
+def get_ident():
+    return threading.get_ident()
+
+
+def exit():
+    raise SystemExit()
+
+
+def stack_size(size=0):
+    return 0
@@ -0,0 +1,209 @@
+#
+# Stand-in for MicroPython's 'uasyncio' on the virtual clock.
+#
+# CPython's asyncio runs on the real monotonic clock; this small scheduler runs the
+# same coroutines on the virtual clock of the simulator, so an asyncio based runtime
+# can be simulated for hours in seconds. Supports create_task(), run(), sleep(),
+# sleep_ms(), gather(), Event and ThreadSafeFlag, Task.cancel() and wait_for_ms().
+#
+import heapq
+
+from .clock import clock
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class TimeoutError(Exception):
+    pass
+
+
+class _Sleep:
+    def __init__(self, ns):
+        self.ns = ns
+
+    def __await__(self):
+        yield self
+
+
+class _Wait:
+    def __init__(self, event):
+        self.event = event
+
+    def __await__(self):
+        yield self
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.done = False
+        self.result = None
+        self.exc = None
+        self.waiters = []
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.done:
+            self.cancelled = True
+            _loop.schedule(self, clock.mono_ns)
+        return True
+
+    def __await__(self):
+        while not self.done:
+            yield _Wait(self)
+        if self.exc is not None:
+            raise self.exc
+        return self.result
+
+
+class _Loop:
+    def __init__(self):
+        self.queue = []
+        self.seq = 0
+
+    def schedule(self, task, t_ns):
+        self.seq += 1
+        heapq.heappush(self.queue, (t_ns, self.seq, task))
+
+    def step(self, task):
+        try:
+            if task.cancelled:
+                task.cancelled = False
+                req = task.coro.throw(CancelledError())
+            else:
+                req = task.coro.send(None)
+        except StopIteration as e:
+            self.finish(task, e.value, None)
+            return
+        except CancelledError as e:
+            self.finish(task, None, e)
+            return
+        except Exception as e:
+            self.finish(task, None, e)
+            if not task.waiters:
+                raise
+            return
+        if isinstance(req, _Sleep):
+            self.schedule(task, clock.mono_ns + req.ns)
+        elif isinstance(req, _Wait):
+            req.event.waiters.append(task)
+        else:
+            self.schedule(task, clock.mono_ns)
+
+    def finish(self, task, result, exc):
+        task.done = True
+        task.result = result
+        task.exc = exc
+        for w in task.waiters:
+            self.schedule(w, clock.mono_ns)
+        task.waiters = []
+
+    def run_until_complete(self, main):
+        while not main.done:
+            if self.queue:
+                t_ns = self.queue[0][0]
+            elif clock.events:
+                t_ns = None
+            else:
+                raise RuntimeError("all tasks are waiting")
+            # run the clock events (IRQs, timers) due before the next task first:
+            # they may wake up other tasks
+            if clock.events and (t_ns is None or clock.events[0][0] < t_ns):
+                clock.sleep_ns(clock.events[0][0] - clock.mono_ns)
+                continue
+            if t_ns > clock.mono_ns:
+                clock.sleep_ns(t_ns - clock.mono_ns)
+            task = heapq.heappop(self.queue)[2]
+            if not task.done:
+                self.step(task)
+        if main.exc is not None:
+            raise main.exc
+        return main.result
+
+
+_loop = _Loop()
+
+
+def new_event_loop():
+    global _loop
+    _loop = _Loop()
+    return _loop
+
+
+def get_event_loop():
+    return _loop
+
+
+def create_task(coro):
+    t = Task(coro)
+    _loop.schedule(t, clock.mono_ns)
+    return t
+
+
+def run(coro):
+    new_event_loop()
+    return _loop.run_until_complete(create_task(coro))
+
+
+async def sleep(s):
+    await _Sleep(int(s * 1000000000))
+
+
+async def sleep_ms(ms):
+    await _Sleep(int(ms * 1000000))
+
+
+async def gather(*aws):
+    res = []
+    for a in aws:
+        if not isinstance(a, Task):
+            a = create_task(a)
+        res.append(await a)
+    return res
+
+
+class Event:
+    def __init__(self):
+        self.flag = False
+        self.waiters = []
+        self.done = False
+
+    def set(self):
+        self.flag = True
+        for w in self.waiters:
+            _loop.schedule(w, clock.mono_ns)
+        self.waiters = []
+
+    def clear(self):
+        self.flag = False
+
+    def is_set(self):
+        return self.flag
+
+    async def wait(self):
+        while not self.flag:
+            await _Wait(self)
+        return True
+
+
+class ThreadSafeFlag(Event):
+    async def wait(self):
+        await Event.wait(self)
+        self.flag = False
+
+
+async def wait_for_ms(aw, timeout_ms):
+    task = aw if isinstance(aw, Task) else create_task(aw)
+    end = clock.mono_ns + timeout_ms * 1000000
+    while not task.done:
+        if clock.mono_ns >= end:
+            task.cancel()
+            raise TimeoutError()
+        await _Sleep(min(1000000, end - clock.mono_ns))
+    return task.result
+
+
+async def wait_for(aw, timeout):
+    return await wait_for_ms(aw, int(timeout * 1000))
@@ -0,0 +1,117 @@
+#
+# Stand-in for MicroPython's 'usocket' module: UDP sockets to fake NTP servers.
+#
+# Any name resolves (getaddrinfo()) to a fake server; 'servers' scripts them by name, the others
+# behave as 'default'. A server answers a request to port 123 (an SNTP client request) with the
+# true time of the virtual clock plus its error_s. The request and the reply each take
+# delay_s / 2 plus a random jitter of 0 ... jitter_s (the random numbers are seeded by reset()),
+# in virtual time: the reply arrives as a clock event. A failing server does not answer.
+# recv() returns the replies in the order they arrived, or raises OSError(EAGAIN) on a
+# non-blocking socket.
+#
+import random
+import struct
+
+from .clock import clock
+
+AF_INET = 2
+SOCK_DGRAM = 2
+SOCK_STREAM = 1
+EAGAIN = 11
+ETIMEDOUT = 110
+NTP_DELTA = 2208988800
+
+
+class Server:
+    def __init__(self, error_s=0.0, delay_s=0.03, jitter_s=0.002, failing=False, stratum=2):
+        self.error_s = error_s
+        self.delay_s = delay_s
+        self.jitter_s = jitter_s
+        self.failing = failing
+        self.stratum = stratum
+
+    # Duration of one way, in seconds
+    def leg(self):
+        return self.delay_s / 2 + rnd.uniform(0, self.jitter_s)
+
+
+servers = {}        # name -> Server
+default = Server()
+rnd = random.Random(1)
+queries = 0         # requests sent to the servers
+
+
+def reset(seed=1):
+    global default, rnd, queries
+    servers.clear()
+    default = Server()
+    rnd = random.Random(seed)
+    queries = 0
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    return [(AF_INET, SOCK_DGRAM, 0, '', (host, port))]
+
+
+def ntp_timestamp(ns):
+    return ((ns // 1000000000 + NTP_DELTA) << 32) | (((ns % 1000000000) << 32) // 1000000000)
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_DGRAM, proto=0):
+        self.inbox = []       # (data, address) of the replies that arrived
+        self.blocking = True
+        self.timeout = None
+        self.closed = False
+
+    def setblocking(self, flag):
+        self.blocking = bool(flag)
+
+    def settimeout(self, value):
+        self.timeout = value
+        self.blocking = value != 0
+
+    def sendto(self, data, addr):
+        global queries
+        if self.closed:
+            raise OSError(9)  # EBADF
+        name, port = addr
+        srv = servers.get(name, default)
+        queries += 1
+        if port == 123 and not srv.failing and len(data) >= 48 and data[0] & 7 == 3:
+            clock.after(srv.leg(), self._at_server, srv, bytes(data), addr)
+        return len(data)
+
+    def _at_server(self, srv, req, addr):
+        t = clock.true_ns() + int(srv.error_s * 1000000000)
+        rep = bytearray(48)
+        rep[0] = 0x24  # leap indicator 0, version 4, mode 4 (server)
+        rep[1] = srv.stratum
+        rep[3] = 0xec  # precision 2**-20 s
+        struct.pack_into("!Q", rep, 16, ntp_timestamp(t - 1000000000))  # reference
+        rep[24:32] = req[40:48]  # originate: the transmit timestamp of the request
+        struct.pack_into("!QQ", rep, 32, ntp_timestamp(t), ntp_timestamp(t))  # receive, transmit
+        clock.after(srv.leg(), self._deliver, bytes(rep), addr)
+
+    def _deliver(self, data, addr):
+        if not self.closed:
+            self.inbox.append((data, addr))
+
+    def recvfrom(self, n):
+        if self.closed:
+            raise OSError(9)
+        if not self.inbox and self.blocking:
+            end = None if self.timeout is None else clock.mono_ns + int(self.timeout * 1000000000)
+            while not self.inbox and (end is None or clock.mono_ns < end):
+                clock.sleep_ns(1000000)
+        if not self.inbox:
+            raise OSError(EAGAIN if not self.blocking else ETIMEDOUT)
+        data, addr = self.inbox.pop(0)
+        return data[:n], addr
+
+    def recv(self, n):
+        return self.recvfrom(n)[0]
+
+    def close(self):
+        self.closed = True
+        self.inbox = []
@@ -0,0 +1,109 @@
+#
+# Host-side check of the tone sequencer of clock_mod_audio.py (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the simulator (package 'sim') from just before a full hour, with the
+# chimes on (use_chimes), for each runtime: the main loop with the timer stepping the tones,
+# the main loop with lightsleep (the tones at the deadlines of the main loop) and the asyncio
+# tasks. Each runtime runs twice: silent (vol at its minimum) and with the sound on, so the
+# hour chime (four phrases and the strokes of the hour) plays. The frames of the two runs must
+# be the same, at the same virtual times (within SHIFT_MAX_MS: the deadlines of the main loop
+# are whole ms): playing a chime doesn't change the frame cadence.
+# Reported per run: the frames, the seconds shown and their latency after the second
+# boundary (avg, max), the tones of the chime (from the hour on), the start of its first tone
+# after the hour, the latest tone (the sequencer's late_max), the sleeps (wakeups) per minute,
+# and the largest shift of a frame from the silent run.
+#
+# Usage: python3 tools/audio_cadence.py [--seconds 60] [--before 10]
+#
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+SHIFT_MAX_MS = 1
+
+RUNTIMES = (
+    ('main loop', {}),
+    ('lightsleep', {'use_lightsleep': True}),
+    ('asyncio', {'use_asyncio': True}),
+)
+
+
+def measure(overrides, sound, args):
+    hour = (sim._clock.DEFAULT_START // 3600 + 1) * 3600
+    start = hour - args.before
+    frames = []   # (mono_ns, rtc ms, text) of each gu.update()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(start=start, use_chimes=True, **overrides)
+        if sound:
+            cm.vol = 1000
+        update = cm.gu.update
+
+        def record(gr):
+            frames.append((sim.clock.mono_ns, sim.clock.rtc_ns() // 1000000, bytes(cm.drawn_text)))
+            update(gr)
+        cm.gu.update = record
+        sim.run(cm.main, args.seconds)
+    sim.uninstall()
+
+    lat = []
+    last = None
+    for mono, ms, text in frames:
+        if text != last and last is not None:
+            lat.append(ms % 1000)
+        last = text
+    # the RTC runs at the rate of the virtual time (no drift): the hour in virtual time
+    mono, ms, _ = frames[-1]  # after the sync at the start
+    t_hour = mono + (hour * 1000 - ms) * 1000000
+    tones = [t for t in sim.unit().tones if t[0] >= t_hour]  # not the sync beep at the start
+    return {'frames': frames, 'lat': lat, 'tones': len(tones),
+            'first_ms': (tones[0][0] - t_hour) / 1e6 if tones else None,
+            'late_max': cm.seq.late_max, 'wakeups': sim.power_stats()['wakeups_per_min']}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=60)
+    ap.add_argument('--before', type=int, default=10, help="seconds before the hour at the start")
+    args = ap.parse_args()
+    print("{} s simulated from {} s before a full hour, chimes on".format(args.seconds, args.before))
+    ln = "+------------+--------+--------+--------+------------------+-------+-----------+--------+----------+-------+"
+    print(ln)
+    print("| runtime    | sound  | frames | secs   | latency ms       | tones | 1st tone  | late   | wakeups  | shift |")
+    print("|            |        |        |        |    avg      max  |       | after :00 | max ms | /min     | ms    |")
+    print(ln)
+    bad = 0
+    for name, overrides in RUNTIMES:
+        base = None
+        for sound in (False, True):
+            r = measure(overrides, sound, args)
+            fr = r['frames']
+            if base is None:
+                base = fr
+                shift = '-'
+            elif len(fr) != len(base) or any(a[2] != b[2] for a, b in zip(fr, base)):
+                shift = 'DIFF'  # other frames
+                bad += 1
+            else:
+                d = max(abs(a[0] - b[0]) for a, b in zip(fr, base)) / 1e6
+                shift = "{:.0f}".format(d)
+                if d > SHIFT_MAX_MS or not r['tones']:
+                    bad += 1
+            lat = r['lat']
+            first = "{:6.0f} ms".format(r['first_ms']) if r['first_ms'] is not None else "      -  "
+            print("| {:10s} | {:6s} | {:6d} | {:6d} | {:7.1f}  {:7.1f} | {:5d} | {} | {:6d} | {:8.1f} | {:5s} |".format(
+                name, 'on' if sound else 'silent', len(r['frames']), len(lat),
+                sum(lat) / len(lat) if lat else 0, max(lat) if lat else 0, r['tones'], first,
+                r['late_max'], r['wakeups'], shift))
+    print(ln)
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#
+# Host-side benchmark for clock_mod_glyphs.py (runs with CPython, not on the Pico W).
+#
+# Counts the interpreted pixel operations one repaint of the clock digits costs:
+# - 'legacy': the former outline_text() loop, walking the ASCII-art strings of
+#             img_dict with one string compare, one gr.set_pen() and one gr.pixel() per pixel;
+# - 'packed': the glyphs compiled by compile_font(), drawn with PicoGraphics calls by
+#             blit_glyph(): one gr.rectangle() and one gr.pixel_span() per span.
+# Both paths draw into a recording stand-in for PicoGraphics; the resulting frames
+# must be identical. (On the Pico W the glyphs are now copied into the frame buffer
+# as whole rows, see clock_mod_fb.py.)
+#
+# Usage: python3 tools/bench_glyphs.py [--text HH:MM:SS]
+#
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Example'))
+
+from clock_mod_digits import img_dict  # noqa: E402
+from clock_mod_glyphs import compile_font, G_WIDTH, G_ROWS, G_SPANS, G_BLINK_SPANS  # noqa: E402
+
+WIDTH = 53
+HEIGHT = 11
+
+
+class CountingGraphics:
+    def __init__(self):
+        self.pen = 0
+        self.frame = {}
+        self.ops = {'set_pen': 0, 'pixel': 0, 'pixel_span': 0, 'rectangle': 0, 'compare': 0}
+
+    def set_pen(self, pen):
+        self.ops['set_pen'] += 1
+        self.pen = pen
+
+    def _put(self, x, y):
+        if 0 <= x < WIDTH and 0 <= y < HEIGHT:
+            self.frame[(x, y)] = self.pen
+
+    def pixel(self, x, y):
+        self.ops['pixel'] += 1
+        self._put(x, y)
+
+    def pixel_span(self, x, y, n):
+        self.ops['pixel_span'] += 1
+        for i in range(n):
+            self._put(x + i, y)
+
+    def rectangle(self, x, y, w, h):
+        self.ops['rectangle'] += 1
+        for j in range(h):
+            for i in range(w):
+                self._put(x + i, y + j)
+
+    def total(self):
+        return sum(self.ops.values())
+
+
+FG = 1
+BG = 2
+
+
+def legacy(gr, text, x, time_ms):
+    col_ = x
+    img = None
+    width_ = 0
+    for c in text:
+        if c in img_dict:
+            img = img_dict[c][0]
+            width_ = img_dict[c][1]
+        if img is None:
+            return
+        for y in range(len(img)):
+            row = img[y]
+            for z in range(len(row)):
+                pixel = row[z]
+                gr.ops['compare'] += 1
+                if pixel == 'O':
+                    gr.set_pen(FG)
+                elif pixel == 'X' and (time_ms // 300) % 2:
+                    gr.set_pen(FG)
+                else:
+                    gr.set_pen(BG)
+                gr.pixel(col_ + z, y)
+        col_ += width_ + 1
+
+
+# Draw a compiled glyph with its left column at x, top row at 0.
+# The glyph cell is first filled with bg_pen, then the 'O' spans
+# (and, if blink_on, the 'X' spans) are drawn with fg_pen.
+def blit_glyph(gr, glyph, x, fg_pen, bg_pen, blink_on=False):
+    gr.set_pen(bg_pen)
+    gr.rectangle(x, 0, glyph[G_WIDTH], glyph[G_ROWS])
+    gr.set_pen(fg_pen)
+    for dx, y, n in glyph[G_SPANS]:
+        gr.pixel_span(x + dx, y, n)
+    if blink_on:
+        for dx, y, n in glyph[G_BLINK_SPANS]:
+            gr.pixel_span(x + dx, y, n)
+
+
+def packed(gr, font, text, x, time_ms):
+    col_ = x
+    glyph = None
+    blink_on = (time_ms // 300) % 2
+    for c in text:
+        if c in font:
+            glyph = font[c]
+        if glyph is None:
+            return
+        blit_glyph(gr, glyph, col_, FG, BG, blink_on)
+        col_ += glyph[0] + 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--text', default="12:34:56", help="the clock text to repaint")
+    args = ap.parse_args()
+    text = args.text
+    t0 = time.perf_counter()
+    font = compile_font(img_dict)
+    t_compile = time.perf_counter() - t0
+
+    g_old = CountingGraphics()
+    t0 = time.perf_counter()
+    legacy(g_old, text, 9, 0)
+    t_old = time.perf_counter() - t0
+
+    g_new = CountingGraphics()
+    t0 = time.perf_counter()
+    packed(g_new, font, text, 9, 0)
+    t_new = time.perf_counter() - t0
+
+    print("Repaint of \"{}\"".format(text))
+    print("+------------+----------+----------+")
+    print("| op         |  legacy  |  packed  |")
+    print("+------------+----------+----------+")
+    for k in g_old.ops:
+        print("| {:10s} | {:8d} | {:8d} |".format(k, g_old.ops[k], g_new.ops[k]))
+    print("+------------+----------+----------+")
+    print("| total      | {:8d} | {:8d} |".format(g_old.total(), g_new.total()))
+    print("+------------+----------+----------+")
+    print("host time: legacy {:.1f} us, packed {:.1f} us (one-off compile {:.1f} us)".format(
+        t_old * 1e6, t_new * 1e6, t_compile * 1e6))
+    same = g_old.frame == g_new.frame
+    print("frames identical: {}".format(same))
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#
+# Host-side render benchmark for clock_mod.py (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the host simulator (package 'sim') and measures what a frame of
+# the clock costs in repeatable scenarios, for each drawing path:
+#   paths:     'classic'  classic=True: gradient background, text outlined with gr.text()
+#              'colour'   classic=False, fixed colour PINK: black background, packed glyphs
+#              'black'    classic=False, fixed colour BLACK: white background, the extra
+#                         columns left and right of the digits painted by outline_text()
+#   scenarios: 'steady'   60 seconds of ticking
+#              'minute'   10 seconds around a minute rollover (hh:mm:55 ... hh:mm+1:04)
+#              'hour'     10 seconds around an hour rollover (10:59:55 ... 11:00:04)
+#              'volume'   VOL + held during 3 seconds (the 'Vol Up' overlay), then 5 seconds of ticking
+#              'reset'    the SLEEP button pressed and released: the 'Reset...' screen
+#              'colours'  a resync() (colour change after an NTP sync) before each of 8 frames
+# A frame is one pass of the main loop at a second boundary: poll_buttons(),
+# redraw_display_if_reqd() and fb.present() (gu.update(gr) if the frame changed).
+#
+# Reported per frame: host wall time (us, including the PicoGraphics stand-in), drawing calls
+# (all PicoGraphics calls), gu.update() calls and, measured in a separate pass with tracemalloc,
+# the peak bytes allocated during the frame (including the stand-ins) and the bytes allocated
+# by the lines of Example/*.py still allocated after it.
+# Wall time is the minimum over --repeat runs of each scenario. The drawing calls and
+# allocations do not depend on the host speed: use those to compare commits.
+#
+# Usage: python3 tools/bench_render.py [--repeat 5] [--json FILE] [--compare old.json]
+#                                      [--paths classic,colour,black] [--scenarios steady,minute,...]
+#
+import argparse
+import calendar
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import sim  # noqa: E402
+
+PATHS = ('classic', 'colour', 'black')
+SCENARIOS = ('steady', 'minute', 'hour', 'volume', 'reset', 'colours')
+DATE = (2023, 11, 14)
+# the net allocations are counted for the lines of Example/*.py only, not for the simulator
+# (e.g. the frames it records) or tracemalloc itself
+IN_EXAMPLE = (tracemalloc.Filter(True, os.path.join(sim.EXAMPLE_DIR, '*')),)
+
+
+# A scenario is a list of steps: (local time (h, m, s), switch held down during the frame
+# ('tap:' + name: pressed and released before the frame) or None, resync before the frame)
+def scenario_steps(name):
+    if name == 'steady':
+        return [((10, 20, s), None, False) for s in range(60)]
+    if name == 'minute':
+        return [((10, 20 + (55 + i) // 60, (55 + i) % 60), None, False) for i in range(10)]
+    if name == 'hour':
+        return [((10 + (55 + i) // 60, (59 + (55 + i) // 60) % 60, (55 + i) % 60), None, False) for i in range(10)]
+    if name == 'volume':
+        return [((10, 20, 30 + i), 'VOLUME_UP' if i < 3 else None, False) for i in range(8)]
+    if name == 'reset':
+        return [((10, 20, 30), 'tap:SLEEP', False)]
+    if name == 'colours':
+        return [((10, 20, 30 + i), None, True) for i in range(8)]
+    raise ValueError(name)
+
+
+def load_path(path, scenario):
+    cm = sim.load()
+    cm.classic = path == 'classic'
+    cm.use_fixed_color = scenario != 'colours'
+    cm.clr_idx = cm.black_ if path == 'black' else cm.pink_
+    cm.do_sync = False  # resync() changes the colour, without starting a WiFi connection
+    cm.vol = 1000
+    return cm
+
+
+def set_local_time(cm, hms):
+    secs = cm.tz.utc(calendar.timegm(DATE + hms + (0, 0, 0)) - cm.BASE) + cm.BASE
+    t = time.gmtime(secs)
+    cm.rtc.datetime((t.tm_year, t.tm_mon, t.tm_mday, t.tm_wday, t.tm_hour, t.tm_min, t.tm_sec, 0))
+    cm.edge_clock.reset()  # the RTC was set
+
+
+def calls(gr):
+    return sum(gr.totals.values()) + sum(gr.counts.values())
+
+
+def frame(cm):
+    stop = cm.poll_buttons()
+    cm.redraw_display_if_reqd()
+    cm.fb.present(cm.gu)
+    return stop
+
+
+# Run the steps of a scenario; returns one dict per frame
+def run_scenario(cm, steps, trace):
+    gr = cm.gr
+    unit = sim.unit()
+    # start from a settled display: the second before the first step, fully drawn
+    h, m, s = steps[0][0]
+    set_local_time(cm, (h, m, s) if s == 0 else (h, m, s - 1))
+    cm.force_redraw = True
+    cm.last_second = -1
+    frame(cm)
+    out = []
+    for hms, switch, resync in steps:
+        set_local_time(cm, hms)
+        if switch and switch.startswith('tap:'):
+            pin = sim.galactic.SWITCHES[switch[4:]]
+            sim.machine.set_level(pin, 0)
+            sim.clock.advance(100000000)
+            sim.machine.set_level(pin, 1)
+            sim.clock.advance(100000000)  # longer than the debounce time
+            switch = None
+        if switch:
+            sim.machine.set_level(sim.galactic.SWITCHES[switch], 0)
+        if resync:
+            cm.resync("bench_render(): ")
+        n_calls = calls(gr)
+        n_updates = len(unit.frames)
+        if trace:
+            snap0 = tracemalloc.take_snapshot().filter_traces(IN_EXAMPLE)
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        frame(cm)
+        dt = time.perf_counter() - t0
+        f = {'us': dt * 1e6, 'calls': calls(gr) - n_calls, 'updates': len(unit.frames) - n_updates}
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            snap1 = tracemalloc.take_snapshot().filter_traces(IN_EXAMPLE)
+            f['alloc_peak'] = peak - mem0
+            f['alloc_net'] = sum(st.size_diff for st in snap1.compare_to(snap0, 'filename'))
+        if switch:
+            sim.machine.set_level(sim.galactic.SWITCHES[switch], 1)
+        out.append(f)
+        sim.clock.advance(1000000000)
+    return out
+
+
+def bench(path, scenario, repeat):
+    steps = scenario_steps(scenario)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = load_path(path, scenario)
+        best = None
+        for _ in range(repeat):
+            fr = run_scenario(cm, steps, False)
+            if best is None:
+                best = fr
+            else:
+                for b, f in zip(best, fr):
+                    b['us'] = min(b['us'], f['us'])
+        tracemalloc.start()
+        try:
+            fr = run_scenario(cm, steps, True)
+        finally:
+            tracemalloc.stop()
+    sim.uninstall()
+    for b, f in zip(best, fr):
+        b['alloc_peak'] = f['alloc_peak']
+        b['alloc_net'] = f['alloc_net']
+    n = len(best)
+    return {
+        'frames': n,
+        'us_avg': round(sum(f['us'] for f in best) / n, 1),
+        'us_max': round(max(f['us'] for f in best), 1),
+        'calls_avg': round(sum(f['calls'] for f in best) / n, 2),
+        'calls_max': max(f['calls'] for f in best),
+        'updates_avg': round(sum(f['updates'] for f in best) / n, 2),
+        'alloc_peak_max': max(f['alloc_peak'] for f in best),
+        'alloc_net_avg': round(sum(f['alloc_net'] for f in best) / n, 1),
+        'per_frame': [{k: (round(v, 1) if k == 'us' else v) for k, v in f.items()} for f in best],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def delta(new, old):
+    if not old:
+        return ''
+    return "{:+.0f}%".format((new - old) * 100 / old)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--json', help="write the results to this file")
+    ap.add_argument('--compare', help="results file of an earlier run")
+    ap.add_argument('--paths', default=','.join(PATHS))
+    ap.add_argument('--scenarios', default=','.join(SCENARIOS))
+    args = ap.parse_args()
+
+    old = {}
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)['results']
+
+    results = {}
+    print("+---------+---------+--------+----------+----------+--------+--------+---------+------------+-----------+")
+    print("| path    | scenario| frames | us/frame | us max   | calls  | calls  | updates | alloc peak | alloc net |")
+    print("|         |         |        | (host)   | (host)   | /frame | max    | /frame  | max bytes  | avg bytes |")
+    print("+---------+---------+--------+----------+----------+--------+--------+---------+------------+-----------+")
+    for path in args.paths.split(','):
+        results[path] = {}
+        for scenario in args.scenarios.split(','):
+            r = bench(path, scenario, args.repeat)
+            results[path][scenario] = r
+            print("| {:7s} | {:7s} | {:6d} | {:8.1f} | {:8.1f} | {:6.1f} | {:6d} | {:7.2f} | {:10d} | {:9.1f} |".format(
+                path, scenario, r['frames'], r['us_avg'], r['us_max'], r['calls_avg'], r['calls_max'],
+                r['updates_avg'], r['alloc_peak_max'], r['alloc_net_avg']))
+            o = old.get(path, {}).get(scenario)
+            if o:
+                print("|         |  vs old |        | {:>8s} |          | {:>6s} |        |         | {:>10s} |           |".format(
+                    delta(r['us_avg'], o['us_avg']), delta(r['calls_avg'], o['calls_avg']),
+                    delta(r['alloc_peak_max'], o['alloc_peak_max'])))
+    print("+---------+---------+--------+----------+----------+--------+--------+---------+------------+-----------+")
+
+    if args.json:
+        doc = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(doc, f, indent=1)
+        print("results written to {}".format(args.json))
+
+
+if __name__ == '__main__':
+    main()
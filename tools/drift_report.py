@@ -0,0 +1,77 @@
+#
+# Host-side report for clock_mod_drift.py (runs with CPython, not on the Pico W).
+#
+# Simulates a drifting RTC, synced from NTP with the adaptive interval of DriftModel,
+# and reports the number of syncs per day and the maximum error of the displayed
+# (drift corrected) time, sampled every 10 seconds.
+# The RTC drifts 'ppm' with a daily temperature swing of +/- 'swing' ppm.
+# By default a sync sets whole seconds only, as ntptime.settime() does.
+#
+# Usage: python3 tools/drift_report.py [--days 7] [--ppm 30] [--swing 3] [--tolerance 1000] [--subsecond] [--fixed]
+#   --fixed: sync every 600 s without drift correction, as before the drift model.
+#
+import argparse
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Example'))
+
+from clock_mod_drift import DriftModel  # noqa: E402
+
+STEP = 10  # seconds
+
+
+def simulate(days, ppm, swing, subsecond, fixed, min_interval=600, max_interval=6 * 3600, tolerance_ms=1000):
+    model = DriftModel(min_interval, max_interval, 0 if fixed else tolerance_ms)
+    true_t = 1700000000.37  # syncs do not fall on a second boundary
+    rtc = true_t
+    end = true_t + days * 86400
+    next_sync = true_t
+    syncs = 0
+    max_err = 0.0
+    interval = min_interval
+    while true_t < end:
+        if true_t >= next_sync:
+            new_rtc = true_t if subsecond else math.floor(true_t)
+            offset_ms = int(round((new_rtc - rtc) * 1000))
+            rtc = new_rtc
+            if not fixed:
+                interval = model.synced(offset_ms, int(rtc))
+            syncs += 1
+            next_sync = true_t + interval
+        if not fixed:
+            shown = rtc + model.correction_at(int(rtc)) / 1000
+        else:
+            shown = rtc
+        err_ms = abs(shown - true_t) * 1000
+        if err_ms > max_err:
+            max_err = err_ms
+        rate = (ppm + swing * math.sin(2 * math.pi * true_t / 86400)) * 1e-6
+        rtc += STEP * (1 - rate)
+        true_t += STEP
+    return syncs / days, max_err, model
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--days', type=int, default=7)
+    ap.add_argument('--ppm', type=float, default=30.0)
+    ap.add_argument('--swing', type=float, default=3.0)
+    ap.add_argument('--tolerance', type=int, default=1000, help='drift_tolerance_ms')
+    ap.add_argument('--subsecond', action='store_true')
+    ap.add_argument('--fixed', action='store_true')
+    args = ap.parse_args()
+    per_day, max_err, model = simulate(args.days, args.ppm, args.swing, args.subsecond, args.fixed,
+                                     tolerance_ms=args.tolerance)
+    print("RTC drift {} ppm +/- {} ppm, {} days, {} NTP, {}".format(
+        args.ppm, args.swing, args.days, "sub-second" if args.subsecond else "whole-second",
+        "fixed 600 s interval" if args.fixed else "adaptive interval"))
+    print("syncs per day:     {:.1f}".format(per_day))
+    print("max error:         {:.0f} ms".format(max_err))
+    if not args.fixed:
+        print(model.stats())
+
+
+if __name__ == '__main__':
+    main()
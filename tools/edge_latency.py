@@ -0,0 +1,105 @@
+#
+# Host-side check of the second edges of clock_mod_edge.py (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the simulator (package 'sim') with the host CPU time charged to the
+# virtual clock (--cpu-scale: the drawing takes time, as on the RP2040), with the main loop
+# without and with use_edge_align, with use_asyncio and with use_render_worker, for an RTC whose time.time_ns() has the
+# fraction of the second and for one that only has whole seconds (like the RTC of the rp2 port).
+# For each frame that shows the next second, the latency is the time from the start of that
+# second of the clock (epoch(): the RTC with the drift correction, in ms also when the RTC only
+# has whole seconds, see clock_mod_edge.py) to gu.update(); negative when it was shown early.
+# The first --warmup seconds (the NTP sync, finding the edges) are not counted.
+# Reported per run: the seconds shown, the latency (avg, min, max), the jitter (standard
+# deviation, max - min), the seconds shown early, the passes of the main loop (the wakeups of the
+# tasks with use_asyncio) per minute and, with use_edge_align, the seconds drawn too late to wait
+# for their edge.
+#
+# Usage: python3 tools/edge_latency.py [--seconds 120] [--warmup 20] [--cpu-scale 20]
+#
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+
+RUNS = (
+    ('fraction', 1, 'main loop', {'use_edge_align': False}),
+    ('fraction', 1, 'edge align', {'use_edge_align': True}),
+    ('fraction', 1, 'asyncio', {'use_asyncio': True}),
+    ('fraction', 1, 'worker', {'use_render_worker': True}),
+    ('whole s', NS, 'main loop', {'use_edge_align': False}),
+    ('whole s', NS, 'edge align', {'use_edge_align': True}),
+    ('whole s', NS, 'asyncio', {'use_asyncio': True}),
+    ('whole s', NS, 'worker', {'use_render_worker': True}),
+)
+
+
+def measure(res, overrides, args):
+    lat = []  # us
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(cpu_scale=args.cpu_scale, **overrides)
+        sim.clock.time_res_ns = res
+        update = cm.gu.update
+        last = [None]
+
+        def record(gr):
+            update(gr)
+            text = bytes(cm.drawn_text)
+            if text == last[0] or len(text) != 8:
+                return
+            last[0] = text
+            if sim.clock.mono_ns < args.warmup * NS:
+                return
+            rtc = sim.clock.rtc_ns()
+            corr = cm.drift.correction_at(rtc // NS - cm.BASE)
+            x = rtc + corr * 1000000  # epoch(): the ticks follow the RTC plus the correction, in ms
+            x += cm.tz.offset(x // NS - cm.BASE) * NS
+            shown = int(text[0:2]) * 3600 + int(text[3:5]) * 60 + int(text[6:8])
+            d = (shown - x // NS) % 86400
+            if d == 0:
+                lat.append(x % NS // 1000)
+            elif d == 1:
+                lat.append(x % NS // 1000 - NS // 1000)  # early
+        cm.gu.update = record
+        sim.run(cm.main, args.seconds)
+    sim.uninstall()
+    return {'lat': lat, 'passes': cm.wakeups * 60 / args.seconds,
+            'late': cm.edge.late if cm.edge else None}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=120)
+    ap.add_argument('--warmup', type=float, default=20, help="seconds not counted at the start")
+    ap.add_argument('--cpu-scale', type=float, default=20, help="host CPU time x this is charged")
+    args = ap.parse_args()
+    print("{} s simulated ({} s warm-up), CPU time x {}".format(args.seconds, args.warmup, args.cpu_scale))
+    ln = "+----------+------------+-------+-------------------------+-------------------+-------+----------+------+"
+    print(ln)
+    print("| RTC      | runtime    | secs  | latency ms              | jitter ms         | early | passes   | late |")
+    print("|          |            |       |    avg     min     max  |  stdev   max-min  |       | /min     |      |")
+    print(ln)
+    for rtc, res, runtime, overrides in RUNS:
+        r = measure(res, overrides, args)
+        lat = r['lat']
+        n = len(lat)
+        if n:
+            avg = sum(lat) / n
+            sd = (sum((x - avg) ** 2 for x in lat) / n) ** 0.5
+            lo, hi = min(lat), max(lat)
+        else:
+            avg = sd = lo = hi = 0
+        print("| {:8s} | {:10s} | {:5d} | {:7.3f} {:7.3f} {:7.3f} | {:7.3f}  {:7.3f} | {:5d} | {:8.1f} | {:>4} |".format(
+            rtc, runtime, n, avg / 1000, lo / 1000, hi / 1000, sd / 1000, (hi - lo) / 1000,
+            sum(1 for x in lat if x < 0), r['passes'], '-' if r['late'] is None else r['late']))
+    print(ln)
+
+
+if __name__ == '__main__':
+    main()
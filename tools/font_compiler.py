@@ -0,0 +1,168 @@
+#
+# Host-side font compiler for clock_mod_font.py (runs with CPython, not on the Pico W).
+#
+# Compiles a module of ASCII-art glyphs with an 'img_dict' ({char: [image, width]}, like
+# clock_mod_digits.py) into a binary font file (format: see clock_mod_font.py), to be
+# copied to the Pico W next to clock_mod.py (or into /lib). With '--py FILE' it also writes
+# a module with the font as the bytes constant FONT, for freezing into the firmware:
+# BinFont(data=module.FONT) then reads the glyphs from flash.
+#
+# '--report' checks that the glyphs read by BinFont are those of compile_font(), and
+# compares on the host the time and the memory kept (tracemalloc) of:
+# - 'module':  from clock_mod_digits import * and compile_font(img_dict), as clock_mod.py did;
+# - 'file':    BinFont() of the font file and reading the glyphs of the clock;
+# - 'frozen':  BinFont() of the bytes constant of the '--py' module and the same glyphs.
+# CPython objects are larger than MicroPython ones, so compare the ratios, not the bytes.
+#
+# Usage: python3 tools/font_compiler.py [Example/clock_mod_digits.py] [-o FILE] [--py FILE] [--report]
+#
+import argparse
+import gc
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+EXAMPLE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Example'))
+sys.path.insert(0, EXAMPLE_DIR)
+
+from clock_mod_glyphs import compile_glyph, compile_font, GLYPH_BLINK, MAX_GLYPH_WIDTH  # noqa: E402
+from clock_mod_font import BinFont, MAGIC, HDR_SIZE, ENTRY_SIZE, F_BLINK  # noqa: E402
+
+CLOCK_CHARS = '0123456789:'
+
+
+# Return the binary font of img_dict
+def compile_bin(img_dict):
+    chars = sorted(img_dict)
+    rows = None
+    blink = False
+    for c in chars:
+        img, width = img_dict[c]
+        if len(c) != 1 or ord(c) > 255:
+            raise ValueError("character {!r}: only 8-bit characters".format(c))
+        if width > MAX_GLYPH_WIDTH:
+            raise ValueError("character {!r}: width {} > {}".format(c, width, MAX_GLYPH_WIDTH))
+        if rows is None:
+            rows = len(img)
+        elif len(img) != rows:
+            raise ValueError("character {!r}: {} rows, the other glyphs have {}".format(c, len(img), rows))
+        blink = blink or any(GLYPH_BLINK in r for r in img)
+    if len(chars) > 255 or not rows or rows > 255:
+        raise ValueError("{} glyphs of {} rows".format(len(chars), rows))
+    planes = 2 if blink else 1
+    offset = HDR_SIZE + len(chars) * ENTRY_SIZE
+    hdr = bytearray(MAGIC + bytes((len(chars), rows, F_BLINK if blink else 0, 0)))
+    index = bytearray()
+    data = bytearray()
+    for c in chars:
+        img, width = img_dict[c]
+        g = compile_glyph(img, width)
+        if offset > 0xffff:
+            raise ValueError("font larger than 64 kB")
+        index += bytes((ord(c), width, offset & 0xff, offset >> 8))
+        data += g[2]
+        if blink:
+            data += g[3]
+        offset += rows * planes
+    return bytes(hdr + index + data)
+
+
+def write_py(path, font, source):
+    with open(path, 'w') as f:
+        f.write("#\n# Generated by tools/font_compiler.py from {}. Do not edit.\n".format(os.path.basename(source)))
+        f.write("# Binary font (see clock_mod_font.py): BinFont(data=FONT)\n#\n")
+        f.write("FONT = (\n")
+        for i in range(0, len(font), 16):
+            f.write("    {!r}\n".format(font[i:i + 16]))
+        f.write(")\n")
+
+
+# Run fn(); returns its time (ms), the memory it kept and its peak (bytes), and its result
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    r = fn()
+    ms = (time.perf_counter() - t0) * 1000
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ms, kept, peak, r
+
+
+def forget(name):
+    sys.modules.pop(name, None)
+
+
+def report(source, bin_path, py_path):
+    img_dict = runpy.run_path(source)['img_dict']
+    ref = compile_font(img_dict)
+    font = BinFont(bin_path)
+    same = sorted(font.keys()) == sorted(ref) and all(font[c] == ref[c] for c in ref)
+    print("glyphs of {}: {} ({} glyphs)".format(bin_path, "identical to compile_font()" if same else "DIFFERENT", len(ref)))
+
+    src_dir = os.path.dirname(os.path.abspath(source))
+    mod = os.path.splitext(os.path.basename(source))[0]
+    sys.path.insert(0, src_dir)
+
+    def module():
+        forget(mod)
+        ns = {}
+        exec("from {} import *".format(mod), ns)
+        return ns, compile_font(ns['img_dict'])
+
+    def from_file():
+        f = BinFont(os.path.basename(bin_path))
+        for c in CLOCK_CHARS:
+            f.get(c)
+        return f
+
+    def frozen():
+        forget(py_mod)
+        m = __import__(py_mod)
+        f = BinFont(data=m.FONT)
+        for c in CLOCK_CHARS:
+            f.get(c)
+        return m, f
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(bin_path)))
+    rows = [('module', measure(module))]
+    rows.append(('file', measure(from_file)))
+    if py_path:
+        py_mod = os.path.splitext(os.path.basename(py_path))[0]
+        sys.path.insert(0, os.path.dirname(os.path.abspath(py_path)))
+        rows.append(('frozen', measure(frozen)))
+    print("+--------+----------+------------+------------+")
+    print("| load   | host ms  | kept bytes | peak bytes |")
+    print("+--------+----------+------------+------------+")
+    for name, (ms, kept, peak, r) in rows:
+        print("| {:6s} | {:8.3f} | {:10d} | {:10d} |".format(name, ms, kept, peak))
+    print("+--------+----------+------------+------------+")
+    print("font file: {} bytes; source module: {} bytes".format(os.path.getsize(bin_path), os.path.getsize(source)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('source', nargs='?', default=os.path.join(EXAMPLE_DIR, 'clock_mod_digits.py'))
+    ap.add_argument('-o', '--output', help="font file (default: the source with .bin)")
+    ap.add_argument('--py', help="also write the font as a module with the bytes constant FONT")
+    ap.add_argument('--report', action='store_true', help="check the font and compare it with the source module")
+    args = ap.parse_args()
+
+    out = args.output or os.path.splitext(args.source)[0] + '.bin'
+    img_dict = runpy.run_path(args.source)['img_dict']
+    font = compile_bin(img_dict)
+    with open(out, 'wb') as f:
+        f.write(font)
+    print("{}: {} glyphs, {} bytes".format(out, len(img_dict), len(font)))
+    if args.py:
+        write_py(args.py, font, args.source)
+        print("{}: FONT = {} bytes".format(args.py, len(font)))
+    if args.report:
+        report(args.source, out, args.py)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#
+# Host-side check of the heap allocations of the main loop of clock_mod.py (runs with CPython, not on the Pico W).
+#
+# On the Pico W clock_mod_heap.py counts the bytes each pass of the main loop allocates
+# (gc.mem_alloc() at its start and at its end). CPython has no such counter, and it allocates
+# where MicroPython doesn't (every integer above 256), so this tool models the MicroPython heap:
+# it runs clock_mod.py on the simulator (package 'sim'), traces the code of Example/ with
+# sys.settrace() and counts an object on the heap for
+# - an integer outside the small integers of MicroPython (-2**30 ... 2**30-1): a long integer
+#   (but not id() or ~id() of an object seen: the address, below 2**30 on the RP2040);
+# - a float;
+# - a new (not seen before) tuple, list, dict, set, str, bytes or bytearray (not an empty one);
+# - a call of divmod(), tuple(), list(), dict(), set(), sorted(), float(), str.format(),
+#   str.join(), str.replace(), str.split(), str.encode() or bytes.decode()
+# when it is stored in a local variable, in an attribute of 'self' or in a global, or returned.
+# Not seen: a value only used inside an expression (e.g. a product divided at once: that is why
+# the arithmetic is checked on the values it stores, or a slice of a bytearray copied at once:
+# the code doesn't do that on the way), an argument built by the caller, the
+# allocations of the stand-ins of the simulator and those MicroPython makes by itself
+# (exceptions, bound methods kept in a variable, growing a list or a dict).
+# The model stands in for gc.mem_alloc() and gc.mem_free() of clock_mod_heap.py (16-byte blocks,
+# the free memory is not modelled), so the counters of the Heap (heap.stats()) measure the passes.
+# The passes are sorted out: those that read the RTC (EdgeClock.sample(): time.time_ns() is a
+# long integer), those that print (the status table every 10 s), those of an NTP sync, and the
+# steady-state passes, which should allocate nothing. The first --warmup seconds (the sync at the
+# start, finding the edge of the seconds) are not counted.
+# Reported per run: the passes of each kind, the steady-state passes that allocated, the bytes per
+# pass (avg, max) of each kind and the lines of Example/ that allocated in a steady-state pass.
+# Exits with 1 if a steady-state pass allocated.
+#
+# Usage: python3 tools/heap_check.py [--seconds 60] [--warmup 20] [--sites 10]
+#
+import argparse
+import contextlib
+import dis
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+SMALL = 1 << 30
+HEAP_BYTES = 160000  # about what clock_mod.py has free on the Pico W
+CALLS = {'divmod', 'tuple', 'list', 'dict', 'set', 'sorted', 'float', 'format', 'join', 'replace',
+         'split', 'encode', 'decode'}
+KINDS = ('steady', 'sample', 'print', 'sync')
+
+RUNS = (
+    ('fraction', 1, 'main loop', {'use_edge_align': False}),
+    ('fraction', 1, 'edge align', {'use_edge_align': True}),
+    ('whole s', NS, 'main loop', {'use_edge_align': False}),
+    ('whole s', NS, 'edge align', {'use_edge_align': True}),
+)
+
+
+# The bytes of a MicroPython object: 16-byte blocks
+def size(v):
+    t = type(v)
+    if t is int:
+        return 32   # the object and its digits
+    if t is float:
+        return 16
+    if t in (tuple, list):
+        return 16 + (4 * len(v) + 15) // 16 * 16
+    if t in (dict, set):
+        return 16 + (8 * len(v) + 15) // 16 * 16
+    return 16 + (len(v) + 16) // 16 * 16
+
+
+# The attributes and globals a code object stores (STORE_ATTR, STORE_GLOBAL)
+def stores(code, cache={}):
+    s = cache.get(code)
+    if s is None:
+        attrs = set()
+        names = set()
+        for ins in dis.get_instructions(code):
+            if ins.opname == 'STORE_ATTR':
+                attrs.add(ins.argval)
+            elif ins.opname == 'STORE_GLOBAL':
+                names.add(ins.argval)
+        s = cache[code] = (tuple(attrs), tuple(names))
+    return s
+
+
+class HeapModel:
+    def __init__(self, root):
+        self.root = root
+        self.bytes = 0       # allocated since the start
+        self.counting = False
+        self.known = {}      # id -> container seen (kept, so the ids are not used again)
+        self.sites = {}      # (file, line) -> objects allocated, this pass
+        self.state = {}      # frame -> [line, {name: id}]
+        self.heap = None     # the Heap of clock_mod.py
+
+    def mem_alloc(self):
+        return self.bytes
+
+    def mem_free(self):
+        return HEAP_BYTES - (self.bytes - (self.heap.a_gc if self.heap else 0))
+
+    def new(self, v):
+        t = type(v)
+        if t is int:
+            return not -SMALL <= v < SMALL and v not in self.known and ~v not in self.known
+        if t is float:
+            return True
+        if t in (tuple, list, dict, set, str, bytes, bytearray):
+            if id(v) in self.known:
+                return False
+            self.known[id(v)] = v
+            return len(v) > 0
+        return False
+
+    def count(self, frame, line, n):
+        if self.counting:
+            self.bytes += n
+            key = (os.path.basename(frame.f_code.co_filename), line)
+            self.sites[key] = self.sites.get(key, 0) + 1
+
+    def check(self, frame, seen, name, v, line):
+        if seen.get(name) != id(v):
+            seen[name] = id(v)
+            if self.new(v) and line:
+                self.count(frame, line, size(v))
+
+    # The values the lines of frame stored since the last event (line 0: just take them in)
+    def scan(self, frame, st):
+        line, seen = st
+        loc = frame.f_locals
+        for k, v in loc.items():
+            self.check(frame, seen, k, v, line)
+        attrs, names = stores(frame.f_code)
+        obj = loc.get('self')
+        if obj is not None and attrs:
+            d = getattr(obj, '__dict__', None)
+            if d is not None:
+                for a in attrs:
+                    if a in d:
+                        self.check(frame, seen, '.' + a, d[a], line)
+        g = frame.f_globals
+        for n in names:
+            if n in g:
+                self.check(frame, seen, ':' + n, g[n], line)
+        return loc
+
+    def trace(self, frame, event, arg):
+        if event != 'call' or not frame.f_code.co_filename.startswith(self.root):
+            return None
+        st = self.state[frame] = [0, {}]
+        self.scan(frame, st)  # the arguments, the attributes and globals it may change
+        st[0] = frame.f_lineno
+        return self.trace_lines
+
+    def trace_lines(self, frame, event, arg):
+        st = self.state.get(frame)
+        if st is None:
+            return None
+        if event == 'line':
+            self.scan(frame, st)
+            st[0] = frame.f_lineno
+        elif event == 'return':
+            loc = self.scan(frame, st)
+            if arg is not None and not any(v is arg for v in loc.values()) and self.new(arg):
+                self.count(frame, st[0], size(arg))
+            del self.state[frame]
+        return self.trace_lines
+
+    def profile(self, frame, event, arg):
+        if event == 'c_call' and arg.__name__ in CALLS and frame.f_code.co_filename.startswith(self.root):
+            self.count(frame, frame.f_lineno, 16)
+
+
+class Output(io.StringIO):
+    writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def measure(res, overrides, args):
+    model = HeapModel(sim.EXAMPLE_DIR)
+    passes = {k: [] for k in KINDS}  # bytes of each pass
+    sites = {}                       # (file, line) -> objects allocated in the steady-state passes
+    out = Output()
+    with contextlib.redirect_stdout(out):
+        cm = sim.load(**overrides)
+        sim.clock.time_res_ns = res
+        hm = sys.modules['clock_mod_heap']
+        hm.mem_alloc = model.mem_alloc
+        hm.mem_free = model.mem_free
+        heap = model.heap = cm.heap
+        heap.a_gc = 0
+        heap.low = model.mem_free()
+        tick_start = heap.tick_start
+        tick_end = heap.tick_end
+        at = [0, 0, 0]
+
+        def start():
+            at[:] = [model.bytes, cm.edge_clock.samples, out.writes]
+            model.sites.clear()
+            tick_start()
+
+        def end():
+            model.counting = sim.clock.mono_ns >= args.warmup * NS
+            if model.counting:
+                d = model.bytes - at[0]
+                if cm.sync_machine.busy():
+                    kind = 'sync'
+                elif out.writes != at[2]:
+                    kind = 'print'
+                elif cm.edge_clock.samples != at[1]:
+                    kind = 'sample'
+                else:
+                    kind = 'steady'
+                    for k, n in model.sites.items():
+                        sites[k] = sites.get(k, 0) + n
+                passes[kind].append(d)
+            tick_end()
+        heap.tick_start = start
+        heap.tick_end = end
+        sys.settrace(model.trace)
+        sys.setprofile(model.profile)
+        try:
+            sim.run(cm.main, args.seconds)
+        finally:
+            sys.settrace(None)
+            sys.setprofile(None)
+        stats = heap.stats()
+    sim.uninstall()
+    return passes, sites, stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=60)
+    ap.add_argument('--warmup', type=float, default=20, help="seconds not counted at the start")
+    ap.add_argument('--sites', type=int, default=10, help="lines listed that allocated")
+    args = ap.parse_args()
+    print("{} s simulated ({} s warm-up), MicroPython heap modelled (see the header)".format(
+        args.seconds, args.warmup))
+    ln = "+----------+------------+-------------------------------+-----------+---------------------------------------------------+"
+    print(ln)
+    print("| RTC      | runtime    | passes                        | steady    | bytes per pass, avg / max                         |")
+    print("|          |            | steady  sample   print   sync | allocated | steady      sample      print       sync          |")
+    print(ln)
+    bad = 0
+    all_sites = []
+    for rtc, res, runtime, overrides in RUNS:
+        passes, sites, stats = measure(res, overrides, args)
+        n_bad = sum(1 for d in passes['steady'] if d)
+        bad += n_bad
+        cols = []
+        for k in KINDS:
+            p = passes[k]
+            cols.append("{:>4} / {:<4}".format(sum(p) // len(p), max(p)) if p else "     -     ")
+        print("| {:8s} | {:10s} | {:6d} {:7d} {:7d} {:6d} | {:9d} | {} |".format(
+            rtc, runtime, *[len(passes[k]) for k in KINDS], n_bad, " ".join(cols) + "  "))
+        all_sites.append((rtc, runtime, sites, stats))
+    print(ln)
+    for rtc, runtime, sites, stats in all_sites:
+        print("{}, {}: {}".format(rtc, runtime, stats))
+        top = sorted(sites.items(), key=lambda kv: -kv[1])[:args.sites]
+        for (f, line), n in top:
+            print("    {}:{}: {} objects".format(f, line, n))
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
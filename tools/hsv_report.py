@@ -0,0 +1,154 @@
+#
+# Host-side report for clock_mod_hsv.py (runs with CPython, not on the Pico W).
+#
+# Compares the integer background colours of clock_mod.py (gradient_pens_int(), hsv_tab,
+# day_phases) with the float version that clock_mod.py used before (gradient_pens(),
+# from_hsv(), math.cos(), kept here as the reference):
+# - for every key 0 ... BG_STEPS: the largest difference of a colour channel of the
+#   gradient columns, and the number of columns that differ;
+# - for every second of the day: the largest difference of the percentage-to-midday
+#   and of the BG_STEPS key derived from it;
+# - the host time of both versions.
+# clock_mod.py is imported on the host simulator (package 'sim').
+#
+# Usage: python3 tools/hsv_report.py [--steps 256,512,1024]
+#
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+
+def float_phase(hour, minute, second):
+    t = (((hour * 60) + minute) * 60) + second
+    return 1.0 - ((math.cos(t / 86400 * math.pi * 2) + 1) / 2)
+
+
+def from_hsv(h, s, v):
+    i = math.floor(h * 6.0)
+    f = h * 6.0 - i
+    v *= 255.0
+    p = v * (1.0 - s)
+    q = v * (1.0 - f * s)
+    t = v * (1.0 - (1.0 - f) * s)
+
+    i = int(i) % 6
+    if i == 0:
+        return int(v), int(t), int(p)
+    if i == 1:
+        return int(q), int(v), int(p)
+    if i == 2:
+        return int(p), int(v), int(t)
+    if i == 3:
+        return int(p), int(q), int(v)
+    if i == 4:
+        return int(t), int(p), int(v)
+    return int(v), int(p), int(q)
+
+
+# The pens of the columns 0 ... width//2 of a gradient background
+def gradient_pens(cm, start_hue, start_sat, start_val, end_hue, end_sat, end_val):
+    half_width = cm.width // 2
+    pens = []
+    for x in range(0, half_width):
+        hue = ((end_hue - start_hue) * (x / half_width)) + start_hue
+        sat = ((end_sat - start_sat) * (x / half_width)) + start_sat
+        val = ((end_val - start_val) * (x / half_width)) + start_val
+        pens.append(cm.palette.rgb(*from_hsv(hue, sat, val)))
+    pens.append(cm.palette.rgb(*from_hsv(end_hue, end_sat, end_val)))
+    return pens
+
+
+def float_pens(cm, key):
+    p = key / cm.BG_STEPS
+    hue = ((cm.MIDDAY_HUE - cm.MIDNIGHT_HUE) * p) + cm.MIDNIGHT_HUE
+    sat = ((cm.MIDDAY_SATURATION - cm.MIDNIGHT_SATURATION) * p) + cm.MIDNIGHT_SATURATION
+    val = ((cm.MIDDAY_VALUE - cm.MIDNIGHT_VALUE) * p) + cm.MIDNIGHT_VALUE
+    return gradient_pens(cm, hue, sat, val, hue + cm.HUE_OFFSET, sat, val)
+
+
+def channels(pen):
+    return (pen >> 16) & 0xff, (pen >> 8) & 0xff, pen & 0xff
+
+
+def compare_gradients(cm):
+    max_d = 0
+    n_diff = 0
+    n = 0
+    for key in range(cm.BG_STEPS + 1):
+        for a, b in zip(float_pens(cm, key), cm.gradient_pens_int(key)):
+            d = max(abs(x - y) for x, y in zip(channels(a), channels(b)))
+            max_d = max(max_d, d)
+            n_diff += d > 0
+            n += 1
+    return max_d, n_diff, n
+
+
+def compare_phases(cm):
+    max_p = 0.0
+    max_key = 0
+    for s in range(86400):
+        h, m, sec = s // 3600, s // 60 % 60, s % 60
+        pf = float_phase(h, m, sec)
+        pi = cm.day_phase(cm.day_phases, h, m, sec)
+        max_p = max(max_p, abs(pf - pi / cm.DAY_PHASE_ONE))
+        max_key = max(max_key, abs(int(pf * cm.BG_STEPS) - pi * cm.BG_STEPS // cm.DAY_PHASE_ONE))
+    return max_p, max_key
+
+
+def timeit(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--steps', default='256,512,1024', help="HSV_STEPS values to compare")
+    args = ap.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load()
+    print("Accuracy of the integer background colours (channel levels 0 ... 255)")
+    print("+-----------+-------------+----------------------+")
+    print("| HSV_STEPS | max channel | columns that differ  |")
+    print("|           | difference  |                      |")
+    print("+-----------+-------------+----------------------+")
+    for n in [int(x) for x in args.steps.split(',')]:
+        cm.hsv_tab = cm.HsvTable(cm.hsv_tab.hue_lo, cm.hsv_tab.hue_hi, n)
+        cm.I_MIDNIGHT = cm.hsv_tab.index(cm.MIDNIGHT_HUE)
+        cm.I_MIDDAY = cm.hsv_tab.index(cm.MIDDAY_HUE)
+        cm.I_OFFSET = cm.hsv_tab.steps(cm.HUE_OFFSET)
+        max_d, n_diff, total = compare_gradients(cm)
+        print("| {:9d} | {:11d} | {:8d} of {:8d} |  table {} bytes".format(n, max_d, n_diff, total, 3 * n))
+    print("+-----------+-------------+----------------------+")
+
+    max_p, max_key = compare_phases(cm)
+    print("percentage-to-midday, every second of the day: max difference {:.6f} %, max BG_STEPS key difference {}".format(
+        max_p * 100, max_key))
+
+    n = 20000
+    t_cos = timeit(lambda i: float_phase(i % 24, i % 60, i % 60), n)
+    t_tab = timeit(lambda i: cm.day_phase(cm.day_phases, i % 24, i % 60, i % 60), n)
+    t_hsv = timeit(lambda i: from_hsv(0.8 + (i % 300) / 1000, 1.0, 0.5), n)
+    t_int = timeit(lambda i: cm.hsv_tab.rgb(i % 300, 255, 128), n)
+    n = 200
+    t_gf = timeit(lambda i: float_pens(cm, i * 5), n)
+    t_gi = timeit(lambda i: cm.gradient_pens_int(i * 5), n)
+    sim.uninstall()
+    print("host time (us per call):  float     integer")
+    print("  percentage-to-midday   {:6.2f}    {:6.2f}".format(t_cos, t_tab))
+    print("  HSV to RGB             {:6.2f}    {:6.2f}".format(t_hsv, t_int))
+    print("  gradient (27 columns)  {:6.1f}    {:6.1f}".format(t_gf, t_gi))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#
+# Host-side replay of button presses for clock_mod_input.py (runs with CPython, not on the Pico W).
+#
+# Replays a scripted sequence of taps of the A, B, C and D buttons, with contact bounce
+# (random extra edges within 'bounce' ms of each press and release), on the host simulator
+# (package 'sim') and reports for the polling main loop and for the asyncio tasks:
+# - the hour/minute changes detected per tap: missed taps (0) and double changes (> 1);
+# - the latency from the press to the change (virtual time), and the latency of the
+#   events from the edge to inp.get() (inp.stats());
+# - the host CPU time of poll_buttons() per call.
+# The same edges are replayed on a model of the previous button handling for comparison:
+# an IRQ on the falling edge changes the hour/minute unless time_chgd is set, and time_chgd
+# is cleared by the next redraw (the main loop runs every 10 ms, the redraw sleeps 0.1 s),
+# with the 9 gu.is_pressed() calls of the poll pass every 10 ms. Its latency is that of the
+# IRQ (0); the changed time shows at the next redraw.
+#
+# Usage: python3 tools/input_replay.py [--taps 200] [--bounce 5] [--seed 1]
+#
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+START = 10.0  # seconds, after the startup of clock_mod
+BUTTONS = ('A', 'B', 'C', 'D')
+
+
+# Taps as (button, press time, release time) in seconds
+def make_taps(n, seed):
+    rnd = random.Random(seed)
+    taps = []
+    t = START
+    for i in range(n):
+        d = rnd.uniform(0.05, 0.4)  # shorter than the auto-repeat delay
+        taps.append((rnd.choice(BUTTONS), t, t + d))
+        t += d + rnd.uniform(0.3, 0.9)
+    return taps
+
+
+# Edges as (time, button, level), with bounce_ms of contact bounce after each press and release
+def make_edges(taps, bounce_ms, seed):
+    rnd = random.Random(seed + 1)
+    edges = []
+    for b, t_on, t_off in taps:
+        for t, level in ((t_on, 0), (t_off, 1)):
+            edges.append((t, b, level))
+            if bounce_ms > 0:
+                k = rnd.randint(0, 3)  # number of bounces
+                times = sorted(rnd.uniform(0, bounce_ms / 1000) for i in range(2 * k))
+                for j, dt in enumerate(times):
+                    edges.append((t + dt, b, 1 - level if j % 2 == 0 else level))
+    edges.sort(key=lambda e: e[0])
+    return edges
+
+
+# Per tap: number of changes and latency (s) of the first change
+def score(taps, changes):
+    counts = []
+    lats = []
+    j = 0
+    for i, (b, t_on, t_off) in enumerate(taps):
+        t_end = taps[i + 1][1] if i + 1 < len(taps) else float('inf')
+        n = 0
+        while j < len(changes) and changes[j][0] < t_end:
+            if changes[j][0] >= t_on:
+                if n == 0:
+                    lats.append(changes[j][0] - t_on)
+                n += 1
+            j += 1
+        counts.append(n)
+    return counts, lats
+
+
+def summary(name, taps, counts, lats, us_per_call, extra=''):
+    missed = sum(1 for n in counts if n == 0)
+    double = sum(1 for n in counts if n > 1)
+    lats = sorted(lats) or [0.0]
+    print("| {:9s} | {:5d} | {:6d} | {:6d} | {:8.1f} | {:8.1f} | {:9.1f} | {}".format(
+        name, len(taps), missed, double, sum(lats) / len(lats) * 1000, lats[-1] * 1000, us_per_call, extra))
+
+
+# Replay the edges on clock_mod.py in the simulator
+def replay(taps, edges, asyncio_mode):
+    changes = []
+    cpu = [0.0, 0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(use_asyncio=asyncio_mode)
+        for t, b, level in edges:
+            sim.clock.at(t, sim.machine.set_level, sim.galactic.SWITCHES[b], level)
+        adjust_hour = cm.adjust_hour
+        adjust_minute = cm.adjust_minute
+        poll_buttons = cm.poll_buttons
+
+        def hour(delta):
+            changes.append((sim.clock.seconds(), 'h', delta))
+            adjust_hour(delta)
+
+        def minute(delta):
+            changes.append((sim.clock.seconds(), 'm', delta))
+            adjust_minute(delta)
+
+        def poll():
+            t0 = time.perf_counter()
+            r = poll_buttons()
+            cpu[0] += time.perf_counter() - t0
+            cpu[1] += 1
+            return r
+
+        cm.adjust_hour = hour
+        cm.adjust_minute = minute
+        cm.poll_buttons = poll
+        sim.run(cm.main, taps[-1][2] + 2.0)
+    sim.uninstall()
+    counts, lats = score(taps, changes)
+    return counts, lats, cpu[0] / max(cpu[1], 1) * 1e6, cm.inp.stats()
+
+
+# The previous button handling, on the same edges
+def legacy(taps, edges, loop_ms=10, redraw_ms=100):
+    changes = []
+    chgd_until = -1.0
+    down = {b: False for b in BUTTONS}
+    for t, b, level in edges:
+        falling = level == 0 and not down[b]
+        down[b] = level == 0
+        if falling and t >= chgd_until:
+            changes.append((t, b))
+            # time_chgd is cleared by the redraw of the next loop pass
+            t_pass = (int(t * 1000 / loop_ms) + 1) * loop_ms / 1000
+            chgd_until = t_pass + redraw_ms / 1000
+    counts, lats = score(taps, changes)
+
+    # host CPU time of a poll pass: 9 gu.is_pressed() calls
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.load()
+    gu = sim.unit()
+    switches = list(sim.galactic.SWITCHES.values())
+    n = 20000
+    t0 = time.perf_counter()
+    for i in range(n):
+        for s in switches:
+            gu.is_pressed(s)
+    us = (time.perf_counter() - t0) / n * 1e6
+    sim.uninstall()
+    return counts, lats, us
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--taps', type=int, default=200)
+    ap.add_argument('--bounce', type=float, default=5, help="ms of contact bounce after each edge, 0: none")
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args()
+
+    taps = make_taps(args.taps, args.seed)
+    edges = make_edges(taps, args.bounce, args.seed)
+    print("{} taps, {} edges, bounce up to {} ms".format(len(taps), len(edges), args.bounce))
+    print("+-----------+-------+--------+--------+----------+----------+-----------+")
+    print("| handling  | taps  | missed | double | latency  | latency  | host us   |")
+    print("|           |       |        |        | avg ms   | max ms   | per poll  |")
+    print("+-----------+-------+--------+--------+----------+----------+-----------+")
+    counts, lats, us, st = replay(taps, edges, False)
+    summary('main loop', taps, counts, lats, us, st)
+    counts, lats, us, st = replay(taps, edges, True)
+    summary('asyncio', taps, counts, lats, us, st)
+    counts, lats, us = legacy(taps, edges)
+    summary('previous', taps, counts, lats, us)
+    print("+-----------+-------+--------+--------+----------+----------+-----------+")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#
+# Host-side accuracy check of the NTP client of clock_mod_ntp.py (runs with CPython, not on the Pico W).
+#
+# 1. Over UDP on this host: NtpClient (with CPython's socket) queries NTP stand-in servers
+#    (tools/ntp_server.py) on 127.0.0.1, which inject delay and jitter; one of them serves a
+#    wrong time (--false ms). The client's clock is the host time minus --local ms, so the
+#    right offset is +local. Each round is one query (the replies picked up every --poll ms);
+#    the error is the offset found minus the right one. For comparison, the same for a single
+#    server and for what ntptime.settime() does: the whole seconds of the transmit time of
+#    one server, taken as the time at the reply.
+# 2. On the simulator (package 'sim'): clock_mod.py with the NTP client and with ntptime, an RTC
+#    drifting --ppm and starting --local ms behind, fake servers with delay and jitter (one
+#    serving a wrong time), with an RTC
+#    that has the fraction of the second and with one that counts whole seconds (time_res_ns,
+#    like the rp2 port: the fraction set is dropped too). The error of the displayed (drift
+#    corrected) time is sampled every second: after each sync, and overall.
+# Reported: the rounds/syncs, the error (avg of the absolute values, p95, max) and the delay.
+#
+# Usage: python3 tools/ntp_check.py [--rounds 20] [--local 437.5] [--false 1500] [--poll 2]
+#                                   [--sim-seconds 3600] [--ppm 30]
+#
+import argparse
+import contextlib
+import io
+import os
+import socket
+import struct
+import sys
+import time
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS, '..'))
+sys.path.insert(0, os.path.join(TOOLS, '..', 'Example'))
+
+from clock_mod_ntp import NtpClient  # noqa: E402
+from ntp_server import StandInServer  # noqa: E402
+import sim  # noqa: E402
+
+NS = 1000000000
+SERVERS = (  # delay ms, jitter ms (each way)
+    (20, 2),
+    (40, 10),
+    (60, 20),
+)
+
+
+def summary(errs):
+    if not errs:
+        return "     -        -        -"
+    s = sorted(abs(e) for e in errs)
+    p95 = s[min(len(s) - 1, len(s) * 95 // 100)]
+    return "{:7.2f}  {:7.2f}  {:7.2f}".format(sum(s) / len(s), p95, s[-1])
+
+
+def udp_rounds(servers, args):
+    local_ns = int(args.local * 1000000)
+    client = NtpClient(socket, [('127.0.0.1', s.port) for s in servers],
+                       now_ns=lambda: time.time_ns() - local_ns)
+    errs = []
+    delays = []
+    replies = rejected = 0
+    for r in range(args.rounds):
+        if client.start():
+            while client.step():
+                time.sleep(args.poll / 1000)
+        if client.ok:
+            errs.append((client.offset_ns - local_ns) / 1e6)
+            delays.append(client.delay_ns / 1e6)
+        replies += client.replies
+        rejected += client.rejected
+    return errs, delays, replies, rejected
+
+
+# ntptime.settime(): the seconds of the transmit timestamp, set when the reply is in
+def ntptime_rounds(server, args):
+    errs = []
+    for r in range(args.rounds):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.settimeout(1)
+        req = bytearray(48)
+        req[0] = 0x1b
+        try:
+            s.sendto(req, ('127.0.0.1', server.port))
+            msg = s.recv(48)
+        except OSError:
+            continue
+        finally:
+            s.close()
+        now = time.time_ns()
+        t = struct.unpack("!I", msg[40:44])[0] - 2208988800
+        errs.append((t * NS - now) / 1e6)
+    return errs
+
+
+def sim_run(client, res, args):
+    errs_sync = []   # error of the displayed time just after each sync
+    errs = []        # every second
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(drift_ppm=args.ppm, use_ntp_client=client)
+        sim.clock.time_res_ns = res
+        sim.clock.rtc_base_ns -= int(args.local * 1000000)
+        for i, (d, j) in enumerate(SERVERS):
+            name = cm.ntp_servers[i] if i < len(cm.ntp_servers) else None
+            if name:
+                sim.usocket.servers[name] = sim.usocket.Server(0.0, d / 1000, j / 1000)
+        sim.usocket.servers[cm.ntp_servers[-1]] = sim.usocket.Server(args.false / 1000, 0.03, 0.002)
+        if not client:
+            sim.ntptime.delay_s = SERVERS[0][0] / 1000
+        synced = [False]
+        sync_event = cm.sync_event
+
+        def on_event(ev, arg):
+            sync_event(ev, arg)
+            if ev == cm.SYNC_SYNCED:
+                synced[0] = True
+        cm.sync_machine.on_event = on_event
+
+        def sample():
+            rtc = sim.clock.rtc_ns()
+            shown = rtc // 1000000 + cm.drift.correction_at(rtc // NS - cm.BASE)
+            e = shown - sim.clock.true_ns() / 1e6
+            errs.append(e)
+            if synced[0]:
+                synced[0] = False
+                errs_sync.append(e)
+            sim.clock.after(1.0, sample)
+        sim.clock.at(1.0, sample)
+        sim.run(cm.main, args.sim_seconds)
+    sim.uninstall()
+    return errs_sync, errs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rounds', type=int, default=20)
+    ap.add_argument('--local', type=float, default=437.5, help="the client's clock is behind by this, ms")
+    ap.add_argument('--false', type=float, default=1500, help="error of the false server, ms")
+    ap.add_argument('--poll', type=float, default=2, help="ms between two step() calls")
+    ap.add_argument('--sim-seconds', type=float, default=3600)
+    ap.add_argument('--ppm', type=float, default=30, help="drift of the RTC on the simulator")
+    args = ap.parse_args()
+
+    servers = [StandInServer(0, d, j, 0, seed=i + 1).start() for i, (d, j) in enumerate(SERVERS)]
+    false = StandInServer(0, 20, 2, args.false, seed=9).start()
+    print("UDP on 127.0.0.1: {} servers (delay/jitter ms {}) and one {:+} ms off; client clock {} ms behind".format(
+        len(servers), ", ".join("{}/{}".format(d, j) for d, j in SERVERS), args.false, args.local))
+    ln = "+--------------------------+--------+---------+----------+---------------------------+-----------+"
+    print(ln)
+    print("| client                   | rounds | replies | rejected | error ms  avg  p95  max   | delay avg |")
+    print(ln)
+    rows = [("NtpClient, 4 servers", servers + [false]),
+            ("NtpClient, 1 server", servers[:1])]
+    for name, srvs in rows:
+        errs, delays, replies, rejected = udp_rounds(srvs, args)
+        print("| {:24s} | {:6d} | {:7d} | {:8d} | {} | {:9.2f} |".format(
+            name, len(errs), replies, rejected, summary(errs), sum(delays) / len(delays) if delays else 0))
+    errs = ntptime_rounds(servers[0], args)
+    print("| {:24s} | {:6d} | {:>7} | {:>8} | {} | {:>9} |".format(
+        "ntptime (whole seconds)", len(errs), '-', '-', summary(errs), '-'))
+    print(ln)
+    for s in servers + [false]:
+        s.stop()
+
+    print("Simulator: {} s, RTC drift {} ppm and {} ms behind at the start, one server {:+} ms off".format(
+        args.sim_seconds, args.ppm, args.local, args.false))
+    ln = "+--------------------------+----------+-------+-----------------------------+-----------------------------+"
+    print(ln)
+    print("| sync                     | RTC      | syncs | after a sync ms avg p95 max | all seconds ms  avg p95 max |")
+    print(ln)
+    for name, client, rtc, res in (("NtpClient", True, 'fraction', 1), ("NtpClient", True, 'whole s', NS),
+                                   ("ntptime", False, 'whole s', NS)):
+        errs_sync, errs = sim_run(client, res, args)
+        print("| {:24s} | {:8s} | {:5d} | {}   | {}   |".format(
+            name, rtc, len(errs_sync), summary(errs_sync), summary(errs)))
+    print(ln)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#
+# Host-side NTP stand-in server, to test clock_mod_ntp.py on Linux (runs with CPython, not on the Pico W).
+#
+# Answers SNTP client requests on a local UDP port with the time of the host plus 'error' ms.
+# It injects network delay: a request is held delay / 2 + jitter ms before it is received (T2),
+# and the reply is held another delay / 2 + jitter ms after it was sent (T3), with a random
+# jitter of 0 ... 'jitter' ms each way, so the two ways are not the same. A fraction 'drop' of
+# the requests is not answered. The replies are sent from timer threads: requests overlap.
+# Used by tools/ntp_check.py; run alone it serves until interrupted.
+#
+# Usage: python3 tools/ntp_server.py [--port 12300] [--delay 20] [--jitter 5] [--error 0] [--drop 0]
+#
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+
+NTP_DELTA = 2208988800
+
+
+def ntp_timestamp(ns):
+    return ((ns // 1000000000 + NTP_DELTA) << 32) | (((ns % 1000000000) << 32) // 1000000000)
+
+
+class StandInServer:
+    def __init__(self, port=0, delay_ms=20, jitter_ms=5, error_ms=0, drop=0.0, seed=1, stratum=2):
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.error_ms = error_ms
+        self.drop = drop
+        self.stratum = stratum
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', port))
+        self.port = self.sock.getsockname()[1]
+        self.requests = 0
+        self.thread = None
+
+    # The host time of this server, in ns
+    def now_ns(self):
+        return time.time_ns() + int(self.error_ms * 1000000)
+
+    # Duration of one way, in seconds
+    def leg(self):
+        with self.lock:
+            return (self.delay_ms / 2 + self.rnd.uniform(0, self.jitter_ms)) / 1000
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        s, self.sock = self.sock, None
+        s.close()
+
+    def serve(self):
+        while self.sock is not None:
+            try:
+                req, addr = self.sock.recvfrom(512)
+            except OSError:
+                break
+            if len(req) < 48 or req[0] & 7 != 3:
+                continue
+            self.requests += 1
+            with self.lock:
+                if self.rnd.random() < self.drop:
+                    continue
+            threading.Timer(self.leg(), self.receive, (req, addr)).start()
+
+    def receive(self, req, addr):
+        t2 = self.now_ns()
+        rep = bytearray(48)
+        rep[0] = 0x24  # leap indicator 0, version 4, mode 4 (server)
+        rep[1] = self.stratum
+        rep[3] = 0xec  # precision 2**-20 s
+        struct.pack_into("!Q", rep, 16, ntp_timestamp(t2 - 1000000000))  # reference
+        rep[24:32] = req[40:48]  # originate: the transmit timestamp of the request
+        struct.pack_into("!Q", rep, 32, ntp_timestamp(t2))  # receive
+        struct.pack_into("!Q", rep, 40, ntp_timestamp(self.now_ns()))  # transmit
+        threading.Timer(self.leg(), self.send, (bytes(rep), addr)).start()
+
+    def send(self, rep, addr):
+        s = self.sock
+        if s is not None:
+            try:
+                s.sendto(rep, addr)
+            except OSError:
+                pass
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--port', type=int, default=12300)
+    ap.add_argument('--delay', type=float, default=20, help="round trip, ms")
+    ap.add_argument('--jitter', type=float, default=5, help="random extra delay of each way, ms")
+    ap.add_argument('--error', type=float, default=0, help="error of the time served, ms")
+    ap.add_argument('--drop', type=float, default=0, help="fraction of the requests not answered")
+    args = ap.parse_args()
+    srv = StandInServer(args.port, args.delay, args.jitter, args.error, args.drop).start()
+    print("NTP stand-in on 127.0.0.1:{}, delay {} ms, jitter {} ms, error {} ms".format(
+        srv.port, args.delay, args.jitter, args.error))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        srv.stop()
+
+
+if __name__ == '__main__':
+    main()
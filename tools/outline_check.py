@@ -0,0 +1,88 @@
+#
+# Host-side check of clock_mod_outline.py (runs with CPython, not on the Pico W).
+#
+# Draws outlined texts on a background with both methods, on the PicoGraphics stand-in
+# of the simulator (package 'sim'):
+# - 'nine':   the former draw_outlined(): eight gr.text() calls in the outline pen at the
+#             neighbouring offsets, then one in the text pen;
+# - 'masks':  Outline.draw() into a copy of the background, from the cached masks.
+# for several positions, partly off the display included, and compares the frames pixel for
+# pixel. Reports the drawing calls and the host time per text, and the mismatches.
+#
+# Usage: python3 tools/outline_check.py [text ...]
+#
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Example'))
+
+from sim.picographics import PicoGraphics, WIDTH, HEIGHT  # noqa: E402
+from sim import font as sim_font  # noqa: E402
+from clock_mod_outline import Outline  # noqa: E402
+from clock_mod_fb import pen_bytes  # noqa: E402
+
+TEXTS = ("12:34:56", "00:00:00", "Vol 50%", "Vol 100%", "Reset...", "2023-11-14",
+         "Hello from the Galactic Unicorn", "?#~", ''.join(sorted(sim_font.GLYPHS)))
+POSITIONS = ((-7, 2), (-1, 2), (0, 0), (1, 2), (10, 2), (20, 4), (48, 2), (52, -1), (3, 6))
+FG = 0xffffff
+OL = 0x000000
+
+
+def background(gr):
+    # a gradient, so that pixels left untouched are checked too
+    for x in range(WIDTH):
+        gr.set_pen(((x * 4) << 16) | ((200 - x * 3) << 8) | 40)
+        gr.rectangle(x, 0, 1, HEIGHT)
+    return bytes(gr)
+
+
+def nine(gr, text, x, y):
+    gr.set_pen(OL)
+    for dx, dy in ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        gr.text(text, x + dx, y + dy, -1, 1)
+    gr.set_pen(FG)
+    gr.text(text, x, y, -1, 1)
+
+
+def main():
+    texts = sys.argv[1:] or TEXTS
+    gr = PicoGraphics()
+    bg = background(gr)
+    outline = Outline(gr, WIDTH, HEIGHT)
+    fg_b = pen_bytes(FG)
+    ol_b = pen_bytes(OL)
+    for t in texts:
+        outline.text_width(t)  # read the masks once, as on the first use
+    gr.take_counts()
+
+    bad = 0
+    t_nine = t_masks = 0.0
+    n = 0
+    for t in texts:
+        for x, y in POSITIONS:
+            gr[:] = bg
+            t0 = time.perf_counter()
+            nine(gr, t, x, y)
+            t_nine += time.perf_counter() - t0
+            a = bytes(gr)
+            layer = bytearray(bg)
+            t0 = time.perf_counter()
+            outline.draw(layer, WIDTH, t, x, y, fg_b, ol_b)
+            t_masks += time.perf_counter() - t0
+            n += 1
+            if bytes(layer) != a:
+                bad += 1
+                diff = sum(1 for i in range(0, len(a), 4) if a[i:i + 4] != layer[i:i + 4])
+                print("mismatch: {!r} at {},{}: {} pixels".format(t, x, y, diff))
+    calls = gr.take_counts()
+    print("{} texts x {} positions: {} mismatches".format(len(texts), len(POSITIONS), bad))
+    print("drawing calls per text: nine {:.1f}, masks 0 (masks of {} characters read once)".format(
+        sum(calls.values()) / n, outline.reads))
+    print("host time per text: nine {:.1f} us, masks {:.1f} us".format(t_nine / n * 1e6, t_masks / n * 1e6))
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#
+# Host-side pixel check of the partial redraws and the cached backgrounds of clock_mod.py
+# (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the simulator (package 'sim') and compares the frame buffer (fb.layer)
+# pixel for pixel:
+# 1. glyphs: each second of --seconds (a day) is drawn as the clock does it, repainting only
+#    the characters that changed (redraw_changed_glyphs()), then drawn again as a full repaint
+#    (draw_background() and outline_text(), as after force_redraw). Both must be the same.
+#    The next second goes on from the partial redraw, so a difference would add up.
+#    For each colour of clr_dict (--colours), with the caret blinking on and off.
+# 2. background: the 'classic' background of each of those seconds, copied from the row
+#    cached by bg_cache (draw_background()), against the same pens of gradient_pens_int()
+#    drawn pixel by pixel with gr.pixel(), as the old gradient background did before the cache.
+# Reported: the frames compared and the ones that differ (with the first pixels that do).
+#
+# Usage: python3 tools/redraw_check.py [--seconds 86400] [--start 00:00:00] [--colours all]
+#
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+TICK_NS = 1000000000 + 100000000  # between two seconds: the caret blink (300 ms) is on and off
+
+
+def diff(a, b, width, limit=3):
+    out = []
+    for i in range(0, len(a), 4):
+        if a[i:i + 4] != b[i:i + 4]:
+            out.append("({},{}) {:06x}/{:06x}".format(i // 4 % width, i // 4 // width,
+                                                     int.from_bytes(a[i:i + 3], 'little'),
+                                                     int.from_bytes(b[i:i + 3], 'little')))
+            if len(out) == limit:
+                break
+    return ", ".join(out)
+
+
+# The partial redraw of each second against a full repaint of it, in colour clr
+def check_glyphs(clr, args):
+    bad = []
+    partial = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load()
+        cm.classic = False
+        cm.clr_idx = clr
+        fb = cm.fb
+        changed = cm.redraw_changed_glyphs
+        used = [False]
+
+        def count(text, cells):
+            used[0] = changed(text, cells)
+            return used[0]
+        cm.redraw_changed_glyphs = count
+        for i in range(args.seconds):
+            tm = args.start + i
+            sim.clock.advance(TICK_NS)
+            cm.redraw_display_if_reqd(tm)
+            part = bytes(fb.layer)
+            partial += used[0]
+            cm.force_redraw = True
+            cm.last_second = -1
+            cm.last_tm = -1
+            cm.redraw_display_if_reqd(tm)
+            if bytes(fb.layer) != part:
+                bad.append((tm, diff(part, fb.layer, cm.width)))
+                fb.layer[:] = part  # go on from the partial redraw
+    sim.uninstall()
+    return args.seconds, partial, bad
+
+
+# The cached background rows against the pens drawn pixel by pixel
+def check_background(args):
+    bad = []
+    keys = set()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load()
+        cm.classic = True
+        fb = cm.fb
+        gr = cm.gr
+        w = cm.width
+        half = w // 2
+        ref = {}
+        for i in range(args.seconds):
+            secs = (args.start + i) % 86400
+            phase = cm.day_phase(cm.day_phases, secs // 3600, secs // 60 % 60, secs % 60)
+            key = phase * cm.BG_STEPS // cm.DAY_PHASE_ONE
+            keys.add(key)
+            cm.draw_background(phase)
+            want = ref.get(key)
+            if want is None:
+                pens = cm.gradient_pens_int(key)
+                for x in range(half):
+                    gr.set_pen(pens[x])
+                    for y in range(cm.height):
+                        gr.pixel(x, y)
+                        gr.pixel(w - x - 1, y)
+                gr.set_pen(pens[half])
+                for y in range(cm.height):
+                    gr.pixel(half, y)
+                want = ref[key] = bytes(gr)
+            if bytes(fb.layer) != want:
+                bad.append((secs, diff(want, fb.layer, w)))
+        hits, misses = cm.bg_cache.hits, cm.bg_cache.misses
+    sim.uninstall()
+    return args.seconds, len(keys), hits, misses, bad
+
+
+def hms(secs):
+    return "{:02d}:{:02d}:{:02d}".format(secs // 3600 % 24, secs // 60 % 60, secs % 60)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=int, default=86400)
+    ap.add_argument('--start', default='00:00:00', help="the first second, HH:MM:SS")
+    ap.add_argument('--colours', default='all', help="comma separated names of clr_dict, e.g. PINK,BLACK")
+    args = ap.parse_args()
+    h, m, s = (int(x) for x in args.start.split(':'))
+    args.start = h * 3600 + m * 60 + s
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load()
+    sim.uninstall()
+    names = {v: k for k, v in cm.clr_dict_rev.items()}
+    clrs = sorted(names.values()) if args.colours == 'all' else [names[c] for c in args.colours.split(',')]
+
+    failed = 0
+    print("{} seconds from {}".format(args.seconds, hms(args.start)))
+    ln = "+------------+--------+---------+-----------+-------------------------------------------------+"
+    print(ln)
+    print("| glyphs     | frames | partial | different | first pixels (x,y) partial/full                 |")
+    print(ln)
+    for clr in clrs:
+        n, partial, bad = check_glyphs(clr, args)
+        failed += len(bad)
+        print("| {:10s} | {:6d} | {:7d} | {:9d} | {:47s} |".format(
+            cm.clr_dict_rev[clr], n, partial, len(bad),
+            "{} {}".format(hms(bad[0][0]), bad[0][1])[:47] if bad else ''))
+    print(ln)
+    n, keys, hits, misses, bad = check_background(args)
+    failed += len(bad)
+    print("| background | {:6d} | {:7s} | {:9d} | {:47s} |".format(
+        n, '', len(bad), "{} {}".format(hms(bad[0][0]), bad[0][1])[:47] if bad else ''))
+    print(ln)
+    print("background: {} keys, cache {} hits, {} misses".format(keys, hits, misses))
+    print("pixel-identical: {}".format(failed == 0))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#
+# Host-side measurement of the display jitter of clock_mod.py (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the simulator (package 'sim') with an NTP sync every --every seconds
+# and a slow NTP server: each query blocks the caller for --delay seconds, as a blocking
+# ntptime.settime() does on the Pico W. It is run twice: with the main loop drawing the display
+# and with the render worker on the second core (use_render_worker, clock_mod_render.py; the
+# worker is a host thread here, in virtual time). With --whole-seconds time.time_ns() only has
+# whole seconds, like the RTC of the rp2 port.
+# Every SAMPLE_MS of virtual time the time the display should show (the time of the RTC,
+# corrected for its drift, as epoch() does) is compared with the time it shows (recorded at
+# each gu.update()). The latency of a second is the time from its start until the display
+# shows it; a second that is over before it is shown is missed. Reported per mode: the seconds,
+# the missed seconds, the frames that show a time that is not the time at all (e.g. a race
+# between the threads), the latency (avg, p99, max) of all seconds and of the seconds that
+# began while an NTP query was running, and the total time the display was behind.
+#
+# Usage: python3 tools/render_jitter.py [--seconds 120] [--every 15] [--delay 0.5] [--classic] [--whole-seconds]
+#
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+SAMPLE_MS = 1
+
+
+# The clock time in ms (see epoch() in clock_mod.py)
+def clock_ms(cm, rtc_ns):
+    return rtc_ns // 1000000 + cm.drift.correction_at(rtc_ns // NS - cm.BASE)
+
+
+def expected_text(cm, ms):
+    secs = ms // 1000
+    secs += cm.tz.offset(secs - cm.BASE)
+    return "{:02d}:{:02d}:{:02d}".format(secs // 3600 % 24, secs // 60 % 60, secs % 60).encode()
+
+
+def measure(worker, args):
+    shown = [b'', 0, 0]  # text on the display, frames, frames with a time that is not (nearly) the time
+    seconds = []         # [text, start mono_ns, shown mono_ns or None] of each second of the clock
+    queries = []         # (start, end) mono_ns of the NTP queries
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(use_render_worker=worker, classic=args.classic, use_ntp_client=False)  # a blocking query
+        if args.whole_seconds:
+            sim.clock.time_res_ns = NS
+        sim.ntptime.delay_s = args.delay
+        ntp_time = sim.ntptime.time
+
+        def slow_time():
+            t0 = sim.clock.mono_ns
+            try:
+                return ntp_time()
+            finally:
+                queries.append((t0, sim.clock.mono_ns))
+        sim.ntptime.time = slow_time
+        update = cm.gu.update
+
+        def record(gr):
+            text = bytes(cm.drawn_text)
+            ms = clock_ms(cm, sim.clock.rtc_ns())
+            shown[0] = text
+            shown[1] += 1
+            if text and text not in (expected_text(cm, ms), expected_text(cm, ms - 1000)):
+                shown[2] += 1
+            update(gr)
+        cm.gu.update = record
+
+        def sample():
+            text = expected_text(cm, clock_ms(cm, sim.clock.rtc_ns()))
+            if not seconds or seconds[-1][0] != text:
+                seconds.append([text, sim.clock.mono_ns, None])
+            sec = seconds[-1]
+            if sec[2] is None and shown[0] == text:
+                sec[2] = sim.clock.mono_ns
+            sim.clock.after(SAMPLE_MS / 1000, sample)
+        sim.clock.at(5.0, sample)  # after the start-up
+        t = 10.0
+        while t < args.seconds:
+            sim.clock.at(t, cm.sync_time)
+            t += args.every
+        t0 = time.perf_counter()
+        sim.run(cm.main, args.seconds)
+        host_s = time.perf_counter() - t0
+    sim.uninstall()
+
+    lat_all = []
+    lat_sync = []
+    missed = 0
+    behind = 0
+    for i in range(1, len(seconds) - 1):  # the first and the last one are not complete
+        text, start, t = seconds[i]
+        end = seconds[i + 1][1]
+        if t is None:
+            missed += 1
+            behind += end - start
+            continue
+        lat = (t - start) / 1e6
+        behind += t - start
+        lat_all.append(lat)
+        if any(a <= start <= b for a, b in queries):
+            lat_sync.append(lat)
+    return {'seconds': len(seconds) - 2, 'missed': missed, 'wrong': shown[2], 'all': lat_all, 'sync': lat_sync,
+            'frames': shown[1], 'behind_ms': behind / 1e6, 'queries': len(queries), 'host_s': host_s}
+
+
+def summary(lat):
+    if not lat:
+        return "      -        -        -"
+    s = sorted(lat)
+    p99 = s[min(len(s) - 1, len(s) * 99 // 100)]
+    return "{:7.1f}  {:7.1f}  {:7.1f}".format(sum(s) / len(s), p99, s[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=120)
+    ap.add_argument('--every', type=float, default=15, help="seconds between two NTP syncs")
+    ap.add_argument('--delay', type=float, default=0.5, help="seconds an NTP query blocks")
+    ap.add_argument('--classic', action='store_true')
+    ap.add_argument('--whole-seconds', action='store_true', help="time.time_ns() without the fraction (rp2)")
+    args = ap.parse_args()
+    res = [('main loop', measure(False, args)), ('worker', measure(True, args))]
+    print("NTP query every {} s, blocking {} s, {} s simulated{}".format(
+        args.every, args.delay, args.seconds, ", whole-second RTC" if args.whole_seconds else ""))
+    ln = "+-----------+-------+--------+-------+--------+--------------------------+-----------------------------+--------+"
+    print(ln)
+    print("| rendering | secs  | missed | wrong | frames | latency of all secs, ms  | secs during a query, ms     | behind |")
+    print("|           |       |        |       |        |    avg      p99      max |  n     avg      p99      max |   ms   |")
+    print(ln)
+    for name, r in res:
+        print("| {:9s} | {:5d} | {:6d} | {:5d} | {:6d} | {} | {:2d} {} | {:6.0f} |".format(
+            name, r['seconds'], r['missed'], r['wrong'], r['frames'], summary(r['all']),
+            len(r['sync']), summary(r['sync']), r['behind_ms']))
+    print(ln)
+    print("host time: " + ", ".join("{} {:.2f} s".format(n, r['host_s']) for n, r in res))
+    return 1 if any(r['wrong'] for _, r in res) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
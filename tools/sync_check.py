@@ -0,0 +1,121 @@
+#
+# Host-side check of the display during the NTP syncs of clock_mod.py (runs with CPython, not on the Pico W).
+#
+# Runs clock_mod.py on the simulator (package 'sim') with a fake WLAN (network stand-in) that
+# takes --assoc seconds to connect and fake NTP servers (the ntptime and usocket stand-ins)
+# answering after --delay ms, with an NTP sync every --interval seconds (the drift model is set
+# to that interval). Every --sample ms the second of the clock (epoch()) is noted, and whether
+# a sync is in progress (sync_machine.busy()). Each second of the clock must be shown on the
+# display (gu.update() of a frame with that time): a second never shown is missed.
+# Scenarios: ntptime.settime() and the NTP client of clock_mod_ntp.py, an access point that
+# doesn't answer (the sync times out), and the asyncio runtime. ntptime.settime() still waits
+# for its reply and then sets the RTC to whole seconds: a second of the clock that starts and
+# ends during that wait (the RTC set ahead) is not shown. It is reported, not counted as a failure.
+# Reported: the seconds of the clock, the ones during a sync, the missed ones (during a sync),
+# the syncs and the longest time between two changes of the display.
+#
+# Usage: python3 tools/sync_check.py [--seconds 130] [--interval 20] [--assoc 5] [--delay 300] [--sample 50]
+#
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sim  # noqa: E402
+
+NS = 1000000000
+
+SCENARIOS = (  # name, overrides, access point up, the query blocks
+    ('ntptime', {'use_ntp_client': False}, True, True),
+    ('NtpClient', {'use_ntp_client': True}, True, False),
+    ('no access point', {'use_ntp_client': True}, False, False),
+    ('asyncio, NtpClient', {'use_ntp_client': True, 'use_asyncio': True}, True, False),
+)
+
+
+def hms(text):
+    return int(text[0:2]) * 3600 + int(text[3:5]) * 60 + int(text[6:8])
+
+
+def run(overrides, ap_up, args):
+    expected = {}   # second of the day of the clock -> True if a sync was in progress
+    shown = set()
+    changes = []    # virtual ns of the changes of the displayed time
+    syncs = [0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        cm = sim.load(**overrides)
+        sim.network.assoc_delay_s = args.assoc
+        sim.network.ap_up = ap_up
+        sim.ntptime.delay_s = args.delay / 1000
+        for name in cm.ntp_servers:
+            sim.usocket.servers[name] = sim.usocket.Server(0.0, args.delay / 1000, 0.005)
+        cm.interval_secs = args.interval
+        cm.drift = cm.DriftModel(args.interval, args.interval, cm.drift_tolerance_ms)
+        update = cm.gu.update
+        last = [None]
+
+        def record(gr):
+            update(gr)
+            text = bytes(cm.drawn_text)
+            if len(text) == 8 and text != last[0]:
+                last[0] = text
+                shown.add(hms(text))
+                changes.append(sim.clock.mono_ns)
+        cm.gu.update = record
+        start = cm.sync_machine.start
+
+        def counted():
+            ok = start()
+            syncs[0] += ok
+            return ok
+        cm.sync_machine.start = counted
+
+        def sample():
+            if changes:  # from the first frame on
+                s = cm.epoch() % 86400
+                expected[s] = expected.get(s, False) or cm.sync_machine.busy()
+            sim.clock.after(args.sample / 1000, sample)
+        sim.clock.at(args.sample / 1000, sample)
+        sim.run(cm.main, args.seconds)
+    sim.uninstall()
+    # the last second may not be drawn yet when the run ends
+    last_s = max(expected) if expected else None
+    missed = [s for s in expected if s not in shown and s != last_s]
+    gaps = [b - a for a, b in zip(changes, changes[1:])]
+    return {'secs': len(expected), 'during': sum(expected.values()), 'missed': len(missed),
+            'missed_during': sum(1 for s in missed if expected[s]), 'syncs': syncs[0],
+            'gap_ms': max(gaps) / 1e6 if gaps else 0}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--seconds', type=float, default=130)
+    ap.add_argument('--interval', type=int, default=20, help="seconds between two syncs")
+    ap.add_argument('--assoc', type=float, default=5, help="seconds the WLAN takes to connect")
+    ap.add_argument('--delay', type=float, default=300, help="round trip of an NTP query, ms")
+    ap.add_argument('--sample', type=float, default=50, help="ms between two samples of the clock")
+    args = ap.parse_args()
+    print("{} s simulated, a sync every {} s, WLAN connects in {} s, NTP round trip {} ms".format(
+        args.seconds, args.interval, args.assoc, args.delay))
+    ln = "+--------------------+-------+--------+--------+--------+-------+----------+"
+    print(ln)
+    print("| scenario           | secs  | during | missed | missed | syncs | max gap  |")
+    print("|                    |       | a sync |        | during |       | ms       |")
+    print(ln)
+    failed = 0
+    for name, overrides, ap_up, blocking in SCENARIOS:
+        r = run(overrides, ap_up, args)
+        if not blocking:
+            failed += r['missed']
+        print("| {:18s} | {:5d} | {:6d} | {:6d} | {:6d} | {:5d} | {:8.1f} |".format(
+            name, r['secs'], r['during'], r['missed'], r['missed_during'], r['syncs'], r['gap_ms']))
+    print(ln)
+    print("no seconds missed (the non-blocking syncs): {}".format(failed == 0))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
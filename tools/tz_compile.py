@@ -0,0 +1,289 @@
+#
+# Host-side time zone compiler for clock_mod_tz.py (runs with CPython, not on the Pico W).
+#
+# Compiles the rule of a time zone, a POSIX TZ string like "CET-1CEST,M3.5.0,M10.5.0/3", into
+# a table of its changes to and from summer time for --years years from --from (format: see
+# clock_mod_tz.py), to be copied to the Pico W next to clock_mod.py (or into /lib) as
+# clock_mod_tz.bin (TZ_FILE). --zone NAME takes the rule from the zone file of the tz database
+# (its last line, the rule of the years after its table: the current rule), e.g. Europe/Lisbon.
+# Changes that follow no rule (like those of Morocco for Ramadan, listed by the zone file up to
+# 2087) are not in the rule: --check shows them as differences.
+# The rule: std offset [dst [offset] ,start[/time],end[/time]]
+# - std, dst: the names, 3 or more letters, or quoted like <+0530>;
+# - offset: [+|-]hh[:mm[:ss]], the time to add to the local time to get UTC (west of Greenwich
+#   positive: the sign of the UTC offset inverted); the summer time is one hour ahead by default;
+# - start, end: the local day of the change: Mm.w.d (day d (0: Sunday) of week w (5: the last)
+#   of month m), Jn (day n of the year, 1 ... 365, without February 29) or n (0 ... 365);
+# - time: the local time of the change, [+|-]hh[:mm[:ss]] (default 02:00, -167 ... 167 hours).
+# Prints the changes. --check compares the offsets of the table read by TimeZone (every hour
+# and a second before and at each change) with those of CPython's zoneinfo for the --zone, and
+# counts the binary searches of TimeZone.offset() called for every minute of the table.
+#
+# Usage: python3 tools/tz_compile.py RULE | --zone NAME [--from YEAR] [--years 25] [-o FILE] [--check]
+#
+import argparse
+import datetime
+import os
+import struct
+import sys
+import tempfile
+import time
+
+EXAMPLE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Example'))
+sys.path.insert(0, EXAMPLE_DIR)
+
+from clock_mod_tz import TimeZone, MAGIC, HDR, ENTRY, hm  # noqa: E402
+
+ZONEINFO = '/usr/share/zoneinfo'
+DAY = 86400
+EPOCH_ORD = datetime.date(1970, 1, 1).toordinal()
+
+
+class Rule:
+    def __init__(self, text):
+        self.text = text
+        self.s = text
+        self.std = self.name()
+        self.std_off = -self.time()  # the UTC offset
+        self.dst = ''
+        self.dst_off = self.std_off
+        self.start = self.end = None
+        if self.s:
+            self.dst = self.name()
+            self.dst_off = self.std_off + 3600
+            if self.s and self.s[0] != ',':
+                self.dst_off = -self.time()
+            if not self.s:
+                raise ValueError("{}: no start and end of {}".format(text, self.dst))
+            self.start = self.change()
+            self.end = self.change()
+        if self.s:
+            raise ValueError("{}: {!r} at the end".format(text, self.s))
+
+    def name(self):
+        s = self.s
+        if s.startswith('<'):
+            i = s.find('>')
+            if i < 0:
+                raise ValueError("{}: no '>'".format(self.text))
+            n, self.s = s[1:i], s[i + 1:]
+        else:
+            i = 0
+            while i < len(s) and s[i].isalpha():
+                i += 1
+            n, self.s = s[:i], s[i:]
+        if len(n) < 3:
+            raise ValueError("{}: a name of at least 3 characters expected".format(self.text))
+        return n
+
+    def number(self):
+        s = self.s
+        i = 0
+        while i < len(s) and s[i].isdigit():
+            i += 1
+        if not i:
+            raise ValueError("{}: a number expected at {!r}".format(self.text, s))
+        self.s = s[i:]
+        return int(s[:i])
+
+    # [+|-]hh[:mm[:ss]] in seconds
+    def time(self):
+        sign = 1
+        if self.s[:1] in ('+', '-'):
+            sign = -1 if self.s[0] == '-' else 1
+            self.s = self.s[1:]
+        t = self.number() * 3600
+        for mul in (60, 1):
+            if not self.s.startswith(':'):
+                break
+            self.s = self.s[1:]
+            t += self.number() * mul
+        return sign * t
+
+    # ,date[/time]: (kind, numbers, local time of day)
+    def change(self):
+        if not self.s.startswith(','):
+            raise ValueError("{}: ',' expected at {!r}".format(self.text, self.s))
+        self.s = self.s[1:]
+        if self.s.startswith('M'):
+            self.s = self.s[1:]
+            m = self.number()
+            self.s = self.s[1:] if self.s.startswith('.') else self.s
+            w = self.number()
+            self.s = self.s[1:] if self.s.startswith('.') else self.s
+            d = self.number()
+            if not (1 <= m <= 12 and 1 <= w <= 5 and 0 <= d <= 6):
+                raise ValueError("{}: M{}.{}.{}".format(self.text, m, w, d))
+            date = ('M', (m, w, d))
+        elif self.s.startswith('J'):
+            self.s = self.s[1:]
+            n = self.number()
+            if not 1 <= n <= 365:
+                raise ValueError("{}: J{}".format(self.text, n))
+            date = ('J', (n,))
+        else:
+            n = self.number()
+            if not 0 <= n <= 365:
+                raise ValueError("{}: day {}".format(self.text, n))
+            date = ('n', (n,))
+        t = 7200
+        if self.s.startswith('/'):
+            self.s = self.s[1:]
+            t = self.time()
+            if abs(t) > 167 * 3600:
+                raise ValueError("{}: time {}".format(self.text, t))
+        return date, t
+
+    # The day (since 1970-01-01) of a change in year y
+    @staticmethod
+    def day(date, y):
+        kind, a = date
+        jan1 = datetime.date(y, 1, 1).toordinal()
+        if kind == 'J':
+            leap = y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)
+            return jan1 + a[0] - 1 + (1 if leap and a[0] >= 60 else 0) - EPOCH_ORD
+        if kind == 'n':
+            return jan1 + a[0] - EPOCH_ORD
+        m, w, d = a
+        first = datetime.date(y, m, 1)
+        wd = (first.weekday() + 1) % 7  # 0: Sunday
+        day = 1 + (d - wd) % 7 + (w - 1) * 7
+        last = ((datetime.date(y + 1, 1, 1) if m == 12 else datetime.date(y, m + 1, 1)) - first).days
+        while day > last:
+            day -= 7
+        return first.toordinal() + day - 1 - EPOCH_ORD
+
+    # The changes of year y: [(UTC, the UTC offset from then on)]
+    def changes(self, y):
+        if self.start is None:
+            return []
+        (sd, st), (ed, et) = self.start, self.end
+        return sorted([(self.day(sd, y) * DAY + st - self.std_off, self.dst_off),  # in standard time
+                       (self.day(ed, y) * DAY + et - self.dst_off, self.std_off)])  # in summer time
+
+
+# The rule of a zone of the tz database: the last line of its TZif file
+def zone_rule(name, zoneinfo=ZONEINFO):
+    path = os.path.join(zoneinfo, name)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'TZif':
+        raise ValueError("{} is not a TZif file".format(path))
+    lines = data.rstrip(b'\n').split(b'\n')
+    if len(lines) < 2 or not lines[-1] or data[4:5] < b'2':
+        raise ValueError("{}: no POSIX TZ rule at the end".format(path))
+    return lines[-1].decode('ascii')
+
+
+# The changes of years y0 ... y1, without those that don't change the offset
+def compile_changes(rule, y0, y1):
+    out = []
+    off = None
+    for y in range(y0, y1 + 1):
+        for t, o in rule.changes(y):
+            if o != off:
+                out.append((t, o))
+                off = o
+    return out
+
+
+def pack(rule, changes, y0, y1):
+    names = []
+    for n in (rule.std, rule.dst):
+        b = n.encode('ascii')
+        if len(b) > 8:
+            raise ValueError("name {!r}: more than 8 characters".format(n))
+        names.append(b)
+    data = bytearray(struct.pack(HDR, MAGIC, len(changes), y0, y1, 0, rule.std_off, rule.dst_off, *names))
+    for t, o in changes:
+        if not 0 <= t < 1 << 32:
+            raise ValueError("change at {}: before 1970 or after 2106".format(t))
+        data += struct.pack(ENTRY, t, o)
+    return bytes(data)
+
+
+def fmt_utc(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t))
+
+
+# Compare the table read by TimeZone with zoneinfo; count the binary searches
+def check(path, zone, y0, y1):
+    tz = TimeZone()
+    tz.load(path)
+    t0 = (datetime.date(y0, 1, 1).toordinal() - EPOCH_ORD) * DAY
+    t1 = (datetime.date(y1 + 1, 1, 1).toordinal() - EPOCH_ORD) * DAY
+    if zone:
+        import zoneinfo
+        zi = zoneinfo.ZoneInfo(zone)
+        times = list(range(t0, t1, 3600))
+        for t in tz.times:
+            times += [t - 1, t]
+        diffs = []
+        for t in sorted(times):
+            want = int(datetime.datetime.fromtimestamp(t, zi).utcoffset().total_seconds())
+            got = tz.offset(t)
+            if got != want:
+                diffs.append((t, got, want))
+        print("zoneinfo {}: {} times compared, {} differences".format(zone, len(times), len(diffs)))
+        for t, got, want in diffs[:10]:
+            print("  {} UTC: UTC{} in the table, UTC{} in zoneinfo".format(fmt_utc(t), hm(got), hm(want)))
+    tz = TimeZone()
+    tz.load(path)
+    n = 0
+    c0 = time.perf_counter()
+    for t in range(t0, t1, 60):
+        tz.offset(t)
+        n += 1
+    c1 = time.perf_counter()
+    print("TimeZone.offset() every minute of {}-{}: {} calls, {} binary searches ({} changes), {:.2f} us per call".format(
+        y0, y1, n, tz.finds, len(tz.times), (c1 - c0) * 1e6 / n))
+    return 0 if not zone or not diffs else 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('rule', nargs='?', help="POSIX TZ rule, e.g. CET-1CEST,M3.5.0,M10.5.0/3")
+    ap.add_argument('--zone', help="take the rule of this zone of the tz database, e.g. Europe/Lisbon")
+    ap.add_argument('--zoneinfo', default=ZONEINFO, help="directory of the tz database")
+    ap.add_argument('--from', dest='year', type=int, default=time.gmtime()[0], help="first year")
+    ap.add_argument('--years', type=int, default=25)
+    ap.add_argument('-o', '--output', help="write the table (clock_mod_tz.bin)")
+    ap.add_argument('--check', action='store_true', help="compare with zoneinfo (with --zone), count the lookups")
+    args = ap.parse_args()
+    if bool(args.rule) == bool(args.zone):
+        ap.error("give a RULE or --zone NAME")
+    text = args.rule or zone_rule(args.zone, args.zoneinfo)
+    rule = Rule(text)
+    y0, y1 = args.year, args.year + args.years - 1
+    changes = compile_changes(rule, y0, y1)
+    data = pack(rule, changes, y0, y1)
+    print("{}{}: {} (UTC{}){}, {}-{}: {} changes, {} bytes".format(
+        args.zone + ' ' if args.zone else '', text, rule.std, hm(rule.std_off),
+        ", {} (UTC{})".format(rule.dst, hm(rule.dst_off)) if rule.dst else '', y0, y1, len(changes), len(data)))
+    if changes:
+        print("+---------------------+--------+-----------+")
+        print("| UTC of the change   | to     | offset    |")
+        print("+---------------------+--------+-----------+")
+        for t, o in changes:
+            print("| {} | {:6s} | UTC{} |".format(fmt_utc(t), rule.dst if o != rule.std_off else rule.std, hm(o)))
+        print("+---------------------+--------+-----------+")
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(data)
+        print("Written: {}".format(args.output))
+    if args.check:
+        path = args.output
+        if not path:
+            fd, path = tempfile.mkstemp(suffix='.bin')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        try:
+            return check(path, args.zone, y0, y1)
+        finally:
+            if not args.output:
+                os.remove(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())